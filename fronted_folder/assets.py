@@ -0,0 +1,239 @@
+# assets.py
+import os
+import threading
+from collections import OrderedDict
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, QSize, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader, QPixmap, QPalette, QBrush
+
+ASSETS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+# Ширина уменьшенной копии фона для первого кадра
+PREVIEW_WIDTH = 480
+
+def asset_path(name):
+    return os.path.join(ASSETS_FOLDER, name)
+
+def setup_cache_folder():
+    """Папка уменьшенных копий изображений рядом с ресурсами"""
+    folder = os.path.join(ASSETS_FOLDER, ".asset_cache")
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+_stylesheets = {}
+
+def load_stylesheet(name):
+    """Текст таблицы стилей; файл перечитывается только после изменения"""
+    path = asset_path(name)
+    mtime = os.path.getmtime(path)
+    cached = _stylesheets.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, "r", encoding="utf-8") as file:
+        text = file.read()
+    _stylesheets[path] = (mtime, text)
+    return text
+
+class ImageCache:
+    """Декодированные изображения и их масштабированные варианты
+
+    QImage можно масштабировать вне потока интерфейса, поэтому кэш
+    хранит QImage, а в QPixmap они превращаются только при показе.
+    """
+
+    def __init__(self, max_variants=12):
+        self.max_variants = max_variants
+        self._lock = threading.Lock()
+        # Отдельная блокировка декодирования: поток интерфейса не ждет, пока декодируется JPEG
+        self._decode_lock = threading.Lock()
+        self._originals = {}
+        # Уменьшенные копии: имя -> (время изменения исходника, QImage или None)
+        self._previews = {}
+        self._variants = OrderedDict()
+
+    def original(self, name):
+        """Исходное изображение; файл декодируется один раз"""
+        with self._decode_lock:
+            with self._lock:
+                image = self._originals.get(name)
+            if image is not None:
+                return image
+
+            path = asset_path(name)
+            reader = QImageReader(path)
+            reader.setAutoTransform(True)
+            image = reader.read()
+            if image.isNull():
+                print(f"Файл изображения не найден или поврежден: {path}")
+                return None
+            with self._lock:
+                self._originals[name] = image
+            return image
+
+    def preview(self, name, create=False):
+        """Маленькая копия изображения для мгновенного первого кадра
+
+        Копия читается с диска один раз и дальше берется из памяти, поэтому
+        изменение размера окна не трогает диск. Без create копия только читается:
+        при первом запуске ее создает фоновая задача (она же замечает новый исходник).
+        """
+        with self._lock:
+            known = self._previews.get(name)
+        if known is not None and not create:
+            return known[1]
+
+        path = asset_path(name)
+        if not os.path.exists(path):
+            return None
+        mtime = int(os.path.getmtime(path))
+        if known is not None and known[0] == mtime and known[1] is not None:
+            return known[1]
+
+        cached = os.path.join(setup_cache_folder(), f"{name}.{mtime}.preview.png")
+        preview = QImage(cached) if os.path.exists(cached) else None
+        if preview is not None and preview.isNull():
+            preview = None
+        if preview is None and create:
+            image = self.original(name)
+            if image is None:
+                return None
+            preview = image.scaledToWidth(PREVIEW_WIDTH, Qt.TransformationMode.SmoothTransformation)
+            # Пишем во временный файл: параллельный запуск не прочитает PNG наполовину записанным
+            temp_path = f"{cached}.{os.getpid()}.{threading.get_ident()}.tmp"
+            if preview.save(temp_path, "PNG"):
+                os.replace(temp_path, cached)
+            elif os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        # Отсутствие копии тоже запоминаем, чтобы не проверять диск на каждом изменении размера
+        with self._lock:
+            self._previews[name] = (mtime, preview)
+        return preview
+
+    def variant(self, name, size):
+        """Готовый вариант точно под размер окна или None"""
+        key = (name, size.width(), size.height())
+        with self._lock:
+            image = self._variants.get(key)
+            if image is not None:
+                self._variants.move_to_end(key)
+            return image
+
+    def nearest(self, name, size):
+        """Ближайший готовый вариант не меньше нужного размера (или самый большой)"""
+        with self._lock:
+            candidates = [(key, image) for key, image in self._variants.items() if key[0] == name]
+        if not candidates:
+            return None
+        larger = [item for item in candidates if item[0][1] >= size.width() and item[0][2] >= size.height()]
+        if larger:
+            return min(larger, key=lambda item: item[0][1] * item[0][2])[1]
+        return max(candidates, key=lambda item: item[0][1] * item[0][2])[1]
+
+    def scaled(self, name, size):
+        """Качественно масштабирует изображение под размер и запоминает вариант"""
+        image = self.variant(name, size)
+        if image is not None:
+            return image
+        original = self.original(name)
+        if original is None:
+            return None
+        image = original.scaled(
+            size,
+            Qt.AspectRatioMode.KeepAspectRatioByExpanding,
+            Qt.TransformationMode.SmoothTransformation
+        )
+        with self._lock:
+            self._variants[(name, size.width(), size.height())] = image
+            while len(self._variants) > self.max_variants:
+                self._variants.popitem(last=False)
+        return image
+
+# Общий кэш изображений приложения
+image_cache = ImageCache()
+
+class ScaleSignals(QObject):
+    done = pyqtSignal(str, QSize, QImage)
+
+class ScaleJob(QRunnable):
+    """Масштабирование изображения в пуле потоков"""
+
+    def __init__(self, cache, name, size, signals=None):
+        super().__init__()
+        self.cache = cache
+        self.name = name
+        self.size = QSize(size)
+        self.signals = signals
+
+    def run(self):
+        # Заодно готовим копию для первого кадра следующего запуска
+        self.cache.preview(self.name, create=True)
+        image = self.cache.scaled(self.name, self.size)
+        if image is not None and self.signals is not None:
+            self.signals.done.emit(self.name, self.size, image)
+
+class BackgroundRenderer(QObject):
+    """Фон окна без подвисаний при изменении размера
+
+    На каждое изменение размера сразу рисуется черновой кадр: готовый вариант
+    или быстрая растяжка ближайшего варианта либо маленькой копии. Качественное
+    масштабирование выполняется в фоне, когда размер перестал меняться debounce_ms.
+    """
+
+    def __init__(self, widget, image_name, cache=None, debounce_ms=150):
+        super().__init__(widget)
+        self.widget = widget
+        self.image_name = image_name
+        self.cache = cache or image_cache
+        self.signals = ScaleSignals()
+        self.signals.done.connect(self._on_scaled)
+        self.smooth_renders = 0
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self._render_smooth)
+
+    def set_image(self, image_name):
+        """Меняет изображение фона; показывается при следующем request()"""
+        self.image_name = image_name
+
+    def request(self):
+        """Обновляет фон под текущий размер виджета"""
+        size = self.widget.size()
+        exact = self.cache.variant(self.image_name, size)
+        if exact is not None:
+            self.timer.stop()
+            self._apply(exact)
+            return
+
+        draft = self.cache.nearest(self.image_name, size) or self.cache.preview(self.image_name)
+        if draft is not None:
+            self._apply(draft.scaled(
+                size,
+                Qt.AspectRatioMode.KeepAspectRatioByExpanding,
+                Qt.TransformationMode.FastTransformation
+            ))
+        self.timer.start()
+
+    def precompute(self, sizes, image_name=None):
+        """Заранее готовит варианты фона под ожидаемые размеры окна"""
+        for size in sizes:
+            self._start(ScaleJob(self.cache, image_name or self.image_name, size))
+
+    def _start(self, job):
+        # Сигналы принадлежат рендереру, поэтому ссылку на задачу хранить не нужно
+        QThreadPool.globalInstance().start(job)
+
+    def _render_smooth(self):
+        self._start(ScaleJob(self.cache, self.image_name, self.widget.size(), self.signals))
+
+    def _on_scaled(self, name, size, image):
+        # Результат для устаревшего размера или другого изображения не показываем
+        if name == self.image_name and size == self.widget.size():
+            self.smooth_renders += 1
+            self._apply(image)
+
+    def _apply(self, image):
+        palette = self.widget.palette()
+        palette.setBrush(QPalette.ColorRole.Window, QBrush(QPixmap.fromImage(image)))
+        self.widget.setPalette(palette)
@@ -6,14 +6,28 @@ from PyQt6.QtWidgets import (
     QSpacerItem, QSizePolicy, QCheckBox
 )
 from PyQt6.QtCore import QTimer
-from notification_manager import SmartNotificationManager, NotificationWidget
+from notification_manager import SmartNotificationManager, NotificationPool
+
+# Модули парсера (индекс контрактов и др.) лежат в соседней папке
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "parser"))
+from search_worker import SearchWorkerPool
+from results_model import ContractTableModel, create_results_view
+from keyword_completer import KeywordCompleter
 
 class SearchApp(QWidget):
     def __init__(self):
         super().__init__()
         self.notification_manager = SmartNotificationManager()
+        self.search_pool = SearchWorkerPool(max_workers=2)
+        self.results_model = ContractTableModel()
+        self.results_model.total_changed.connect(self.on_results_total)
         self.setup_ui()
+        self.keyword_completer = KeywordCompleter(self.keywords_edit)
+        self.notification_pool = NotificationPool(self)
         self.setup_notification_timer()
+        # Браузер запускается в фоне сразу после показа окна
+        QTimer.singleShot(0, self.search_pool.prelaunch)
+        QTimer.singleShot(0, self.keyword_completer.refresh)
         
     def setup_ui(self):
         self.setWindowTitle("КонтрЗакупки · Поиск")
@@ -93,7 +107,19 @@ class SearchApp(QWidget):
         self.search_button.clicked.connect(self.handle_search)
         layout.addWidget(self.search_button)
 
-        layout.addSpacerItem(QSpacerItem(20, 40, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding))
+        self.cancel_button = QPushButton("Отменить поиск")
+        self.cancel_button.clicked.connect(self.cancel_search)
+        self.cancel_button.setEnabled(False)
+        layout.addWidget(self.cancel_button)
+
+        self.status_label = QLabel("")
+        self.status_label.setWordWrap(True)
+        self.status_label.setStyleSheet("font-weight: 400; font-size: 13px; margin-top: 4px;")
+        layout.addWidget(self.status_label)
+
+        # Строки читаются из индекса страницами по мере прокрутки
+        self.results_view = create_results_view(self.results_model)
+        layout.addWidget(self.results_view, 1)
         self.setLayout(layout)
 
     def setup_notification_timer(self):
@@ -102,10 +128,18 @@ class SearchApp(QWidget):
         self.notification_timer.timeout.connect(self.show_random_notification)
         self.notification_timer.start(5000)  # 30 секунд
         
-        # Таймер для позиционирования уведомлений
-        self.position_timer = QTimer()
-        self.position_timer.timeout.connect(self.reposition_notifications)
-        self.position_timer.start(100)
+        # Данные для уведомлений пересчитываются в фоне, таймер уведомлений только читает снимок
+        self.snapshot_timer = QTimer()
+        self.snapshot_timer.timeout.connect(self.refresh_notification_data)
+        self.snapshot_timer.start(60000)
+        self.refresh_notification_data()
+
+    def refresh_notification_data(self):
+        self.search_pool.refresh_snapshot(
+            self.notification_manager.update_snapshot,
+            self.notification_manager.deadline_hours,
+            self.notification_manager.take_seen_keys()
+        )
 
     def show_random_notification(self):
         """Показ случайного умного уведомления"""
@@ -117,55 +151,65 @@ class SearchApp(QWidget):
 
     def show_notification(self, notification_data):
         """Показ уведомления в углу экрана"""
-        notification = NotificationWidget(
-            notification_data["title"],
-            notification_data["message"],
-            notification_data["type"],
-            self
-        )
-        
-        notification.closed.connect(lambda: self.remove_notification(notification))
-        self.notification_manager.active_notifications.append(notification)
-        
-        self.reposition_notifications()
-        notification.show()
-
-    def remove_notification(self, notification):
-        """Удаление уведомления из списка активных"""
-        if notification in self.notification_manager.active_notifications:
-            self.notification_manager.active_notifications.remove(notification)
-
-    def reposition_notifications(self):
-        """Позиционирование уведомлений в правом нижнем углу"""
-        screen_geometry = QApplication.primaryScreen().availableGeometry()
-        margin = 20
-        notification_height = 120
-        spacing = 10
-        
-        for i, notification in enumerate(self.notification_manager.active_notifications):
-            x = screen_geometry.width() - notification.width() - margin
-            y = screen_geometry.height() - (notification_height + spacing) * (i + 1) - margin
-            notification.move(x, y)
+        self.notification_pool.show(notification_data)
+
+    def search_filters(self):
+        """Фильтры поиска из формы"""
+        return {
+            "region": self.region_combo.currentText(),
+            "only_actual": self.only_actual_checkbox.isChecked(),
+            "with_signature": self.with_electronic_signature_checkbox.isChecked(),
+            "include_archive": self.include_archive_checkbox.isChecked(),
+        }
 
     def handle_search(self):
-        region = self.region_combo.currentText()
-        keywords = self.keywords_edit.text()
-        only_actual = self.only_actual_checkbox.isChecked()
-        with_electronic_signature = self.with_electronic_signature_checkbox.isChecked()
-        include_archive = self.include_archive_checkbox.isChecked()
-        
-        message = (f"Регион: {region}\n"
-                  f"Ключевые слова: {keywords}\n"
-                  f"Только актуальные: {'Да' if only_actual else 'Нет'}\n"
-                  f"С электронной подписью: {'Да' if with_electronic_signature else 'Нет'}\n"
-                  f"Включая архивные: {'Да' if include_archive else 'Нет'}")
-        
-        QMessageBox.information(self, "Результаты поиска", message)
+        """Сразу показывает контракты из локального индекса и ставит выгрузку с сайта в фоновую очередь"""
+        keywords = self.keywords_edit.text().strip()
+        if not keywords:
+            self.status_label.setText("Введите ключевые слова")
+            return
+
+        filters = self.search_filters()
+        self.results_model.set_query(keywords, filters)
+
+        job = self.search_pool.submit(keywords, filters)
+        job.signals.progress.connect(self.status_label.setText)
+        job.signals.finished.connect(self.on_search_finished)
+        job.signals.failed.connect(self.on_search_failed)
+
+        self.cancel_button.setEnabled(True)
+        self.status_label.setText(f"Поиск '{keywords}' поставлен в очередь (в очереди: {self.search_pool.pending()})")
+
+    def cancel_search(self):
+        self.search_pool.cancel_all()
+        self.status_label.setText("Отмена поиска...")
+
+    def on_search_failed(self, message):
+        self.status_label.setText(message)
+        self.cancel_button.setEnabled(self.search_pool.pending() > 0)
+
+    def on_search_finished(self, result):
+        self.cancel_button.setEnabled(self.search_pool.pending() > 0)
+        self.status_label.setText(f"Поиск '{result['keywords']}' завершен: {result['rows']} строк")
+        self.refresh_notification_data()
+        self.keyword_completer.refresh()
+        self.show_index_results(result["keywords"], result["filters"])
+
+    def show_index_results(self, keywords, filters):
+        """Перечитывает таблицу после выгрузки, если в ней все еще этот запрос с теми же фильтрами"""
+        if self.results_model.query == (keywords, filters):
+            self.results_model.set_query(keywords, filters)
+
+    def on_results_total(self, total, latency_ms):
+        status = self.status_label.text().split("\n")[0]
+        self.status_label.setText(f"{status}\nВ локальном индексе: {total} (за {latency_ms:.1f} мс)")
 
     def closeEvent(self, event):
         """Закрытие всех уведомлений при закрытии приложения"""
-        for notification in self.notification_manager.active_notifications[:]:
-            notification.close()
+        self.notification_pool.close_all()
+        self.search_pool.shutdown()
+        self.results_model.close()
+        self.keyword_completer.close()
         event.accept()
 
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+# gui_bench.py
+"""Замер запуска окна и перерисовки фона при изменении размера
+
+Показывает время импорта и появления окна testing.SearchApp, затем
+имитирует перетаскивание края окна и измеряет время обработки каждого
+изменения размера и загрузку процессора.
+
+Запуск: python gui_bench.py [число изменений размера] [--cold]
+--cold удаляет уменьшенные копии фона, чтобы замерить первый запуск.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+def percentile(values, share):
+    values = sorted(values)
+    return round(values[int(share * (len(values) - 1))], 3) if values else None
+
+def run_bench(resizes=300, cold=False, settle_ms=500):
+    if cold:
+        shutil.rmtree(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".asset_cache"), ignore_errors=True)
+
+    started = time.perf_counter()
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import QThreadPool
+    import testing
+    imported = time.perf_counter()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = testing.SearchApp()
+    window.resize(1280, 720)
+    window.show()
+    app.processEvents()
+    shown = time.perf_counter()
+
+    # Ждем фоновую подготовку вариантов фона, чтобы она не попала в замер перетаскивания
+    QThreadPool.globalInstance().waitForDone()
+    app.processEvents()
+
+    handler_ms = []
+    cpu_before = time.process_time()
+    drag_started = time.perf_counter()
+    for step in range(resizes):
+        width = 900 + (step * 7) % 900
+        height = 600 + (step * 5) % 400
+        tick = time.perf_counter()
+        window.resize(width, height)
+        app.processEvents()
+        handler_ms.append((time.perf_counter() - tick) * 1000)
+    drag_seconds = time.perf_counter() - drag_started
+    drag_cpu = time.process_time() - cpu_before
+
+    # После остановки должен прийти один качественный кадр
+    settle_until = time.perf_counter() + settle_ms / 1000
+    while time.perf_counter() < settle_until:
+        app.processEvents()
+        time.sleep(0.005)
+    QThreadPool.globalInstance().waitForDone()
+    app.processEvents()
+
+    result = {
+        "cold": cold,
+        "import_ms": round((imported - started) * 1000, 1),
+        "first_window_ms": round((shown - started) * 1000, 1),
+        "resizes": resizes,
+        "resize_ms_p50": percentile(handler_ms, 0.5),
+        "resize_ms_p95": percentile(handler_ms, 0.95),
+        "resize_ms_max": round(max(handler_ms), 3) if handler_ms else None,
+        "drag_cpu_share": round(drag_cpu / drag_seconds, 3) if drag_seconds else None,
+        "smooth_renders": window.background.smooth_renders,
+    }
+    window.close()
+    return result
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    resizes = int(args[0]) if args else 300
+    print(json.dumps(run_bench(resizes, cold="--cold" in sys.argv), ensure_ascii=False, indent=2))
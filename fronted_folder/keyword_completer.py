@@ -0,0 +1,83 @@
+# keyword_completer.py
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QStringListModel, Qt, pyqtSignal
+from PyQt6.QtWidgets import QCompleter
+
+from autocomplete import Autocomplete, build_autocomplete
+
+class RebuildSignals(QObject):
+    done = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+class RebuildJob(QRunnable):
+    """Собирает новый файл подсказок рядом со старым вне потока интерфейса"""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.signals = RebuildSignals()
+
+    def run(self):
+        try:
+            count = build_autocomplete(self.path + ".new")
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.done.emit(count)
+
+class KeywordCompleter(QObject):
+    """Подсказки в поле ключевых слов по мере ввода
+
+    Подсказки берутся из файла, открытого через mmap, поэтому на запуск окна
+    не влияют; устаревший файл пересобирается в фоне.
+    """
+
+    def __init__(self, line_edit, limit=8, path=None):
+        super().__init__(line_edit)
+        self.line_edit = line_edit
+        self.limit = limit
+        self.autocomplete = Autocomplete(path)
+        self.rebuilding = False
+
+        self.model = QStringListModel(self)
+        self.completer = QCompleter(self.model, self)
+        # Список уже отобран индексом подсказок, QCompleter его не фильтрует
+        self.completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.completer.setMaxVisibleItems(limit)
+        line_edit.setCompleter(self.completer)
+        line_edit.textEdited.connect(self.update_suggestions)
+
+    def update_suggestions(self, text):
+        suggestions = self.autocomplete.suggest(text, self.limit)
+        self.model.setStringList(suggestions)
+        if suggestions:
+            self.completer.complete()
+        else:
+            self.completer.popup().hide()
+
+    def refresh(self):
+        """Пересобирает подсказки, если индекс контрактов изменился после сборки"""
+        if self.rebuilding or not self.autocomplete.stale():
+            return
+        self.rebuilding = True
+        self.rebuild_job = RebuildJob(self.autocomplete.path)
+        self.rebuild_job.signals.done.connect(self._on_rebuilt)
+        self.rebuild_job.signals.failed.connect(self._on_failed)
+        QThreadPool.globalInstance().start(self.rebuild_job)
+
+    def _on_failed(self, message):
+        self.rebuilding = False
+        print(f"Не удалось собрать подсказки: {message}")
+
+    def _on_rebuilt(self, count):
+        self.rebuilding = False
+        try:
+            self.autocomplete.install(self.autocomplete.path + ".new")
+        except OSError as e:
+            print(f"Не удалось заменить файл подсказок: {e}")
+            self.autocomplete.reopen()
+            return
+        print(f"Подсказки обновлены: {count} терминов")
+
+    def close(self):
+        self.autocomplete.close()
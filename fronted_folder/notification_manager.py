@@ -1,59 +1,74 @@
 # notification_manager.py
 import random
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton
+from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel, QPushButton
 from PyQt6.QtCore import QTimer, Qt, pyqtSignal
 from PyQt6.QtGui import QFont
 
-class NotificationWidget(QWidget):
-    """Красивое всплывающее уведомление"""
-    closed = pyqtSignal()
-    
-    def __init__(self, title, message, notification_type="info", parent=None):
-        super().__init__(parent)
-        # Настройки окна уведомления
-        self.setWindowFlags(Qt.WindowType.Tool | Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowStaysOnTopHint)
-        self.setFixedSize(380, 140)
-        
-        # Цветовые схемы для разных типов уведомлений
-        color_schemes = {
-            "info": {
-                "background": "qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #e8f4fd, stop:1 #d4edda)",
-                "border": "#bee5eb",
-                "header_bg": "#17a2b8",
-                "icon": "💡"
-            },
-            "warning": {
-                "background": "qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #fff3cd, stop:1 #ffeaa7)",
-                "border": "#ffeaa7",
-                "header_bg": "#ffc107",
-                "icon": "⚠️"
-            },
-            "success": {
-                "background": "qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #d4edda, stop:1 #c3e6cb)",
-                "border": "#c3e6cb",
-                "header_bg": "#28a745",
-                "icon": "✅"
-            },
-            "error": {
-                "background": "qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #f8d7da, stop:1 #f5c6cb)",
-                "border": "#f5c6cb",
-                "header_bg": "#dc3545",
-                "icon": "❌"
-            }
-        }
-        
-        scheme = color_schemes.get(notification_type, color_schemes["info"])
-        
-        self.setStyleSheet(f"""
-            QWidget {{
+# Цветовые схемы для разных типов уведомлений
+COLOR_SCHEMES = {
+    "info": {
+        "background": "qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #e8f4fd, stop:1 #d4edda)",
+        "border": "#bee5eb",
+        "header_bg": "#17a2b8",
+        "icon": "💡"
+    },
+    "warning": {
+        "background": "qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #fff3cd, stop:1 #ffeaa7)",
+        "border": "#ffeaa7",
+        "header_bg": "#ffc107",
+        "icon": "⚠️"
+    },
+    "success": {
+        "background": "qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #d4edda, stop:1 #c3e6cb)",
+        "border": "#c3e6cb",
+        "header_bg": "#28a745",
+        "icon": "✅"
+    },
+    "error": {
+        "background": "qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #f8d7da, stop:1 #f5c6cb)",
+        "border": "#f5c6cb",
+        "header_bg": "#dc3545",
+        "icon": "❌"
+    }
+}
+
+# Готовые таблицы стилей по типам, собираются один раз на процесс
+_stylesheets = {}
+
+def notification_stylesheet(notification_type):
+    """Единая таблица стилей уведомления и всех его дочерних виджетов"""
+    if notification_type not in _stylesheets:
+        scheme = COLOR_SCHEMES[notification_type]
+        _stylesheets[notification_type] = f"""
+            QWidget#notification {{
                 background: {scheme['background']};
                 border: 2px solid {scheme['border']};
                 border-radius: 12px;
             }}
+            QWidget#notificationHeader {{
+                background: {scheme['header_bg']};
+                border-top-left-radius: 10px;
+                border-top-right-radius: 10px;
+                padding: 8px 12px;
+            }}
+            QWidget#notificationContent {{
+                background: transparent;
+                padding: 12px;
+            }}
             QLabel {{
                 background: transparent;
                 color: #2c3e50;
             }}
+            QLabel#notificationTitle {{
+                color: white;
+                font-size: 14px;
+                font-weight: 600;
+            }}
+            QLabel#notificationMessage {{
+                font-size: 13px;
+                color: #495057;
+                padding: 5px 0px;
+            }}
             QPushButton {{
                 background: rgba(255,255,255,0.9);
                 border: 1px solid rgba(0,0,0,0.1);
@@ -67,7 +82,29 @@ class NotificationWidget(QWidget):
                 background: rgba(255,255,255,1);
                 border: 1px solid rgba(0,0,0,0.2);
             }}
-        """)
+        """
+    return _stylesheets[notification_type]
+
+class NotificationWidget(QWidget):
+    """Красивое всплывающее уведомление
+    
+    Виджет создается один раз и переиспользуется: show_content меняет текст
+    и заново запускает таймер автозакрытия.
+    """
+    closed = pyqtSignal()
+    
+    def __init__(self, title="", message="", notification_type="info", parent=None):
+        super().__init__(parent)
+        # Настройки окна уведомления
+        self.setWindowFlags(Qt.WindowType.Tool | Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowStaysOnTopHint)
+        self.setFixedSize(380, 140)
+        self.setObjectName("notification")
+        
+        if notification_type not in COLOR_SCHEMES:
+            notification_type = "info"
+        self.notification_type = notification_type
+        self.icon = COLOR_SCHEMES[notification_type]["icon"]
+        self.setStyleSheet(notification_stylesheet(notification_type))
         
         layout = QVBoxLayout()
         layout.setContentsMargins(0, 0, 0, 0)
@@ -75,48 +112,29 @@ class NotificationWidget(QWidget):
         
         # Шапка уведомления с иконкой и заголовком
         header_widget = QWidget()
-        header_widget.setStyleSheet(f"""
-            background: {scheme['header_bg']};
-            border-top-left-radius: 10px;
-            border-top-right-radius: 10px;
-            padding: 8px 12px;
-        """)
+        header_widget.setObjectName("notificationHeader")
         header_layout = QVBoxLayout()
         header_layout.setContentsMargins(0, 0, 0, 0)
         
-        title_label = QLabel(f"{scheme['icon']} {title}")
-        title_label.setStyleSheet("""
-            color: white;
-            font-size: 14px;
-            font-weight: 600;
-            background: transparent;
-        """)
-        title_label.setFont(QFont("Segoe UI", 11, QFont.Weight.Bold))
-        header_layout.addWidget(title_label)
+        self.title_label = QLabel()
+        self.title_label.setObjectName("notificationTitle")
+        self.title_label.setFont(QFont("Segoe UI", 11, QFont.Weight.Bold))
+        header_layout.addWidget(self.title_label)
         header_widget.setLayout(header_layout)
         layout.addWidget(header_widget)
         
         # Основное содержимое уведомления
         content_widget = QWidget()
-        content_widget.setStyleSheet("""
-            background: transparent;
-            padding: 12px;
-        """)
+        content_widget.setObjectName("notificationContent")
         content_layout = QVBoxLayout()
         content_layout.setContentsMargins(0, 0, 0, 0)
         
         # Текст сообщения
-        message_label = QLabel(message)
-        message_label.setStyleSheet("""
-            font-size: 13px;
-            color: #495057;
-            line-height: 1.4;
-            background: transparent;
-            padding: 5px 0px;
-        """)
-        message_label.setFont(QFont("Segoe UI", 10))
-        message_label.setWordWrap(True)
-        content_layout.addWidget(message_label)
+        self.message_label = QLabel()
+        self.message_label.setObjectName("notificationMessage")
+        self.message_label.setFont(QFont("Segoe UI", 10))
+        self.message_label.setWordWrap(True)
+        content_layout.addWidget(self.message_label)
         
         # Кнопка закрытия
         close_btn = QPushButton("Понятно")
@@ -130,61 +148,180 @@ class NotificationWidget(QWidget):
         self.setLayout(layout)
         
         # Автоматическое закрытие через 10 секунд
-        self.auto_close_timer = QTimer()
+        self.auto_close_timer = QTimer(self)
+        self.auto_close_timer.setSingleShot(True)
         self.auto_close_timer.timeout.connect(self.close_notification)
-        self.auto_close_timer.start(10000)
+        
+        if title or message:
+            self.set_content(title, message)
+            self.auto_close_timer.start(10000)
+    
+    def set_content(self, title, message):
+        self.title_label.setText(f"{self.icon} {title}")
+        self.message_label.setText(message)
+    
+    def show_content(self, title, message, timeout_ms=10000):
+        """Показывает уведомление с новым текстом"""
+        self.set_content(title, message)
+        self.auto_close_timer.start(timeout_ms)
+        self.show()
     
     def close_notification(self):
         """Плавное закрытие уведомления"""
         self.auto_close_timer.stop()
+        self.hide()
         self.closed.emit()
-        self.close()
+
+class NotificationPool:
+    """Переиспользуемые уведомления с ограниченной стопкой на экране
+    
+    Для каждого типа заранее создается per_type виджетов, новые не создаются.
+    Если свободного виджета нужного типа нет, закрывается самое старое
+    уведомление этого типа. Раскладка пересчитывается только при показе,
+    закрытии и изменении геометрии экрана.
+    """
+    
+    def __init__(self, parent=None, per_type=2, max_visible=3, margin=20, spacing=10):
+        self.max_visible = max_visible
+        self.margin = margin
+        self.spacing = spacing
+        self.idle = {}
+        self.visible = []
+        
+        for notification_type in COLOR_SCHEMES:
+            self.idle[notification_type] = []
+            for _ in range(per_type):
+                widget = NotificationWidget(notification_type=notification_type, parent=parent)
+                widget.closed.connect(lambda widget=widget: self._release(widget))
+                self.idle[notification_type].append(widget)
+        
+        screen = QApplication.primaryScreen()
+        if screen is not None:
+            screen.availableGeometryChanged.connect(self.relayout)
+    
+    def show(self, notification_data):
+        """Показывает уведомление из пула"""
+        notification_type = notification_data["type"]
+        if notification_type not in self.idle:
+            notification_type = "info"
+        
+        if not self.idle[notification_type]:
+            oldest = next(w for w in self.visible if w.notification_type == notification_type)
+            oldest.close_notification()
+        
+        while len(self.visible) >= self.max_visible:
+            self.visible[0].close_notification()
+        
+        widget = self.idle[notification_type].pop()
+        self.visible.append(widget)
+        self.relayout()
+        widget.show_content(notification_data["title"], notification_data["message"])
+    
+    def _release(self, widget):
+        if widget in self.visible:
+            self.visible.remove(widget)
+            self.idle[widget.notification_type].append(widget)
+            self.relayout()
+    
+    def relayout(self, *_):
+        """Позиционирование уведомлений в правом нижнем углу"""
+        screen = QApplication.primaryScreen()
+        if screen is None:
+            return
+        geometry = screen.availableGeometry()
+        y = geometry.y() + geometry.height() - self.margin
+        for widget in self.visible:
+            y -= widget.height() + self.spacing
+            widget.move(geometry.x() + geometry.width() - widget.width() - self.margin, y)
+    
+    def close_all(self):
+        for widget in self.visible[:]:
+            widget.close_notification()
+
+def normalize_keywords(text):
+    """Регистр, ё и лишние пробелы не влияют на сопоставление запросов"""
+    return " ".join((text or "").lower().replace("ё", "е").split())
 
 class SmartNotificationManager:
-    """Менеджер умных уведомлений для системы закупок"""
+    """Менеджер умных уведомлений для системы закупок
     
-    def __init__(self):
-        self.active_notifications = []
+    Уведомления строятся по готовому снимку агрегатов из индекса контрактов
+    (update_snapshot), который пересчитывается в фоне; сам выбор уведомления
+    только читает снимок и не обращается к базе.
+    """
+    
+    def __init__(self, deadline_hours=48):
+        self.deadline_hours = deadline_hours
+        self.snapshot = {}
+        # Пары (регион, запрос), по которым пользователь уже увидел новые закупки
+        self.seen_keys = set()
         
-        # База шаблонов уведомлений с естественными формулировками
-        self.procurement_notifications = [
-            {
+        # Шаблоны уведомлений по видам агрегатов
+        self.procurement_notifications = {
+            "new": {
                 "type": "info",
                 "title": "Новые возможности",
                 "templates": [
-                    "В {region} появились новые закупки по теме '{product}'. Рекомендуем ознакомиться с актуальными тендерами.",
-                    "Обнаружены подходящие закупки в вашем регионе. Проверьте обновления по запросу '{product}'.",
-                    "Система нашла несколько интересных предложений по {product} в {region}. Возможно, вас заинтересуют эти варианты."
+                    "В {region} появилось новых закупок по запросу {product}: {count}. Рекомендуем ознакомиться.",
+                    "С прошлой проверки найдено {count} новых закупок по {product} в {region}."
                 ]
             },
-            {
+            "low_competition": {
                 "type": "success", 
                 "title": "Отличная находка",
                 "templates": [
-                    "Найдена выгодная закупка '{product}' с минимальной конкуренцией. Идеальный вариант для участия!",
-                    "Обнаружен тендер с прекрасными условиями по {product}. Шансы на победу высоки!",
-                    "Подобрана закупка, полностью соответствующая вашим критериям. Рекомендуем подать заявку."
+                    "Закупок по {product} с минимальной конкуренцией: {count}. Шансы на победу высоки!",
+                    "В {region} найдено {count} закупок по {product}, где участников почти нет."
                 ]
             },
-            {
+            "closing": {
                 "type": "warning",
                 "title": "Внимание, сроки",
                 "templates": [
-                    "Закупка по '{product}' завершается через несколько часов. Успейте подать заявку!",
-                    "Напоминаем: срок подачи предложений по тендеру '{product}' подходит к концу.",
-                    "Осталось мало времени для участия в интересной закупке. Не упустите возможность!"
+                    "По запросу {product} в {region} {count} закупок завершаются в ближайшие {hours} ч.",
+                    "Срок по {count} закупкам {product} подходит к концу. Не упустите возможность!"
                 ]
             },
-            {
+            "total": {
                 "type": "info",
                 "title": "Статистика поиска",
                 "templates": [
-                    "За последнее время в {region} появилось 15+ новых закупок по вашему запросу '{product}'.",
-                    "По вашему фильтру найдено несколько перспективных тендеров. Рекомендуем изучить детали.",
-                    "Система отслеживает 8 активных закупок, соответствующих запросу '{product}' в {region}."
+                    "Система отслеживает {count} закупок, соответствующих запросу {product} в {region}."
+                ]
+            },
+            "empty": {
+                "type": "info",
+                "title": "Нет данных",
+                "templates": [
+                    "По запросу {product} в {region} пока нет загруженных закупок. Запустите поиск, чтобы получать уведомления."
                 ]
             }
-        ]
+        }
+    
+    def update_snapshot(self, snapshot):
+        """Принимает новый снимок агрегатов: {(регион, запрос): {total, new, closing, low_competition}}"""
+        self.snapshot = snapshot
+    
+    def take_seen_keys(self):
+        """Пары, счетчик новых закупок по которым нужно обнулить при следующем пересчете"""
+        keys, self.seen_keys = self.seen_keys, set()
+        return keys
+    
+    def _collect(self, region, keywords):
+        """Суммирует агрегаты по всем запросам региона, подходящим под ключевые слова"""
+        wanted = normalize_keywords(keywords)
+        totals = {"total": 0, "new": 0, "closing": 0, "low_competition": 0}
+        keys = []
+        for (key_region, key_query), values in self.snapshot.items():
+            # Выгрузки без региона ('') относятся к любому региону
+            if key_region and key_region != region:
+                continue
+            if wanted and wanted not in normalize_keywords(key_query):
+                continue
+            keys.append((key_region, key_query))
+            for name in totals:
+                totals[name] += values[name]
+        return totals, keys
     
     def generate_smart_notification(self, region, keywords):
         """
@@ -197,23 +334,38 @@ class SmartNotificationManager:
         Returns:
             dict: Данные для формирования уведомления
         """
+        totals, keys = self._collect(region, keywords)
+        
+        # Выбираем случайный вид уведомления из тех, по которым есть данные
+        kinds = [kind for kind in ("new", "closing", "low_competition") if totals[kind] > 0]
+        if not kinds:
+            kinds = ["total"] if totals["total"] else ["empty"]
+        kind = random.choice(kinds)
+        if kind == "new":
+            self.seen_keys.update(keys)
+        
+        return self.format_notification(kind, region, keywords, totals.get(kind, 0))
+
+    def format_notification(self, kind, region, keywords, count):
+        """Данные уведомления заданного вида со случайным шаблоном"""
         if not keywords.strip():
             keywords = "различные товары и услуги"
         else:
             keywords = f"'{keywords}'"
         
-        # Выбираем случайный шаблон уведомления
-        notification_data = random.choice(self.procurement_notifications)
+        notification_data = self.procurement_notifications[kind]
         template = random.choice(notification_data["templates"])
         
         # Форматируем сообщение с реальными данными
         message = template.format(
             product=keywords,
-            region=region
+            region=region,
+            count=count,
+            hours=self.deadline_hours
         )
         
         return {
             "type": notification_data["type"],
             "title": notification_data["title"],
             "message": message
-        }
\ No newline at end of file
+        }
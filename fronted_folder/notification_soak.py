@@ -0,0 +1,93 @@
+# notification_soak.py
+"""Нагрузочный прогон уведомлений: показывает уведомления в ускоренном темпе
+и проверяет, что память и загрузка процессора в простое не растут.
+
+Запуск: python notification_soak.py [число уведомлений] [интервал, мс]
+"""
+import os
+import sys
+import json
+import time
+import itertools
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication, QWidget
+from PyQt6.QtCore import QTimer
+from notification_manager import SmartNotificationManager, NotificationPool, COLOR_SCHEMES
+
+def current_rss_kb():
+    """Текущий размер резидентной памяти процесса (только Linux)"""
+    try:
+        with open("/proc/self/statm") as file:
+            pages = int(file.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return None
+
+def soak_notifications(manager):
+    """По уведомлению каждого вида менеджера и каждого типа оформления
+
+    Без загруженного снимка менеджер выдает только вид "empty", поэтому виды
+    перебираются напрямую: прогон задействует виджеты пула всех типов.
+    """
+    notifications = [
+        manager.format_notification(kind, "Москва", "ноутбуки", count=12)
+        for kind in manager.procurement_notifications
+    ]
+    covered = {notification["type"] for notification in notifications}
+    notifications += [
+        {"type": notification_type, "title": "Проверка оформления", "message": f"Уведомление типа {notification_type}"}
+        for notification_type in COLOR_SCHEMES
+        if notification_type not in covered
+    ]
+    return notifications
+
+def run_soak(total=2000, interval_ms=5, idle_seconds=5):
+    app = QApplication.instance() or QApplication(sys.argv)
+    parent = QWidget()
+    manager = SmartNotificationManager()
+    pool = NotificationPool(parent)
+
+    samples = []
+    state = {"shown": 0}
+    notifications = itertools.cycle(soak_notifications(manager))
+
+    def tick():
+        pool.show(next(notifications))
+        state["shown"] += 1
+        if state["shown"] % max(total // 20, 1) == 0:
+            samples.append({"shown": state["shown"], "rss_kb": current_rss_kb()})
+        if state["shown"] >= total:
+            timer.stop()
+            pool.close_all()
+            QTimer.singleShot(0, measure_idle)
+
+    def measure_idle():
+        # В простое не должно работать ни одного таймера раскладки
+        cpu_before = time.process_time()
+        QTimer.singleShot(idle_seconds * 1000, lambda: finish(cpu_before))
+
+    def finish(cpu_before):
+        result["idle_cpu_seconds"] = round(time.process_time() - cpu_before, 4)
+        result["idle_seconds"] = idle_seconds
+        app.quit()
+
+    result = {"notifications": total, "interval_ms": interval_ms}
+    started = time.perf_counter()
+    timer = QTimer()
+    timer.timeout.connect(tick)
+    timer.start(interval_ms)
+    app.exec()
+
+    result["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    result["rss_samples"] = samples
+    if len(samples) >= 2:
+        result["rss_growth_kb"] = samples[-1]["rss_kb"] - samples[0]["rss_kb"]
+    result["pooled_widgets"] = sum(len(widgets) for widgets in pool.idle.values()) + len(pool.visible)
+    return result
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    interval_ms = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print(json.dumps(run_soak(total, interval_ms), ensure_ascii=False, indent=2))
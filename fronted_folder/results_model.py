@@ -0,0 +1,215 @@
+# results_model.py
+import time
+import threading
+from collections import OrderedDict
+from PyQt6.QtCore import (
+    QAbstractTableModel, QModelIndex, QObject, QRunnable, QThreadPool, Qt, pyqtSignal
+)
+from PyQt6.QtWidgets import QTableView, QHeaderView, QAbstractItemView
+
+from contract_index import ContractIndex
+
+# Колонки таблицы: (колонка индекса, заголовок, ширина)
+COLUMNS = [
+    ("registry_number", "Реестровый №", 170),
+    ("subject", "Объект закупки", 360),
+    ("customer", "Заказчик", 240),
+    ("price", "Цена, ₽", 120),
+    ("sign_date", "Заключен", 100),
+    ("update_date", "Обновлен", 100),
+    ("status", "Статус", 160),
+]
+
+class ViewSignals(QObject):
+    ready = pyqtSignal(int, int, float)
+    failed = pyqtSignal(int, str)
+
+class ViewJob(QRunnable):
+    """Фильтрует и сортирует результаты в SQLite вне потока интерфейса"""
+
+    def __init__(self, model, generation, keywords, filters, sort_key, descending):
+        super().__init__()
+        self.model = model
+        self.generation = generation
+        self.keywords = keywords
+        self.filters = filters
+        self.sort_key = sort_key
+        self.descending = descending
+        self.signals = model.signals
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            with self.model.lock:
+                # Более новый запрос уже поставлен: не перезаписываем его временную таблицу старой выборкой
+                if self.generation != self.model.generation:
+                    return
+                total = self.model.index.open_view(
+                    self.keywords,
+                    region=self.filters.get("region"),
+                    only_actual=self.filters.get("only_actual", False),
+                    with_signature=self.filters.get("with_signature", False),
+                    include_archive=self.filters.get("include_archive", False),
+                    sort_key=self.sort_key,
+                    descending=self.descending
+                )
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        self.signals.ready.emit(self.generation, total, (time.perf_counter() - started) * 1000)
+
+class ContractTableModel(QAbstractTableModel):
+    """Результаты поиска из локального индекса без загрузки всех строк в память
+
+    Порядок строк хранится во временной таблице SQLite, а в памяти лежат
+    только последние прочитанные страницы по page_size строк (не больше
+    max_pages). Представление получает строки порциями через fetchMore().
+    """
+
+    loading = pyqtSignal(bool)
+    # Число найденных контрактов и время запроса к индексу в мс
+    total_changed = pyqtSignal(int, float)
+
+    def __init__(self, index=None, page_size=200, max_pages=16, fetch_step=2000, parent=None):
+        super().__init__(parent)
+        # Отдельное соединение: временная таблица результатов живет в нем
+        self.index = index or ContractIndex()
+        self.lock = threading.Lock()
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.fetch_step = fetch_step
+        self.pages = OrderedDict()
+        self.total = 0
+        self.loaded = 0
+        self.generation = 0
+        self.query = None
+        self.sort_key = "update_date"
+        self.descending = True
+
+        self.signals = ViewSignals()
+        self.signals.ready.connect(self._on_ready)
+        self.signals.failed.connect(self._on_failed)
+
+    def set_query(self, keywords, filters=None):
+        """Показывает контракты, подходящие под запрос и фильтры формы"""
+        self.query = (keywords, dict(filters or {}))
+        self._reload()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.sort_key = COLUMNS[column][0]
+        self.descending = order == Qt.SortOrder.DescendingOrder
+        if self.query is not None:
+            self._reload()
+
+    def _reload(self):
+        self.generation += 1
+        self.beginResetModel()
+        self.pages.clear()
+        self.total = 0
+        self.loaded = 0
+        self.endResetModel()
+        self.loading.emit(True)
+        keywords, filters = self.query
+        self.job = ViewJob(self, self.generation, keywords, filters, self.sort_key, self.descending)
+        QThreadPool.globalInstance().start(self.job)
+
+    def _on_ready(self, generation, total, latency_ms):
+        # Результат устаревшего запроса или сортировки не показываем
+        if generation != self.generation:
+            return
+        self.total = total
+        self.loading.emit(False)
+        self.total_changed.emit(total, latency_ms)
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def _on_failed(self, generation, message):
+        if generation == self.generation:
+            self.loading.emit(False)
+            print(f"Не удалось получить результаты из индекса: {message}")
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self.loaded < self.total
+
+    def fetchMore(self, parent):
+        count = min(self.fetch_step, self.total - self.loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def _page(self, number):
+        page = self.pages.get(number)
+        if page is not None:
+            self.pages.move_to_end(number)
+            return page
+        with self.lock:
+            page = self.index.view_rows(number * self.page_size, self.page_size, [name for name, _, _ in COLUMNS])
+        self.pages[number] = page
+        while len(self.pages) > self.max_pages:
+            self.pages.popitem(last=False)
+        return page
+
+    def row(self, row):
+        """Значения строки по номеру или None, если строки нет"""
+        page = self._page(row // self.page_size)
+        offset = row % self.page_size
+        return page[offset] if offset < len(page) else None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= self.loaded:
+            return None
+        if role == Qt.ItemDataRole.TextAlignmentRole and COLUMNS[index.column()][0] == "price":
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        if role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return None
+
+        values = self.row(index.row())
+        if values is None:
+            return None
+        value = values[index.column()]
+        if value is None:
+            return "—"
+        if COLUMNS[index.column()][0] == "price":
+            return f"{value:,.2f}".replace(",", " ")
+        return str(value)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section][1]
+        return str(section + 1)
+
+    def close(self):
+        self.generation += 1
+        with self.lock:
+            self.index.close()
+
+def create_results_view(model, parent=None):
+    """Таблица результатов, которой не нужно измерять все строки"""
+    view = QTableView(parent)
+    view.setModel(model)
+    view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+    view.setAlternatingRowColors(True)
+    view.setWordWrap(False)
+    # Фиксированная высота и ширина: размеры не пересчитываются по содержимому строк
+    view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+    view.verticalHeader().setDefaultSectionSize(26)
+    view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+    view.horizontalHeader().setStretchLastSection(True)
+    for column, (_, _, width) in enumerate(COLUMNS):
+        view.setColumnWidth(column, width)
+    view.horizontalHeader().setSortIndicator(
+        [name for name, _, _ in COLUMNS].index(model.sort_key),
+        Qt.SortOrder.DescendingOrder if model.descending else Qt.SortOrder.AscendingOrder
+    )
+    view.setSortingEnabled(True)
+    return view
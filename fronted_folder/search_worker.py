@@ -0,0 +1,165 @@
+# search_worker.py
+import time
+import uuid
+import shutil
+import threading
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from pars import perform_optimized_search, create_browser_pool, setup_download_folder
+from http_export import HttpExporter, safe_name
+from contract_index import ContractIndex
+
+class SearchSignals(QObject):
+    """Сигналы фонового поиска; доставляются в поток интерфейса"""
+    progress = pyqtSignal(str)
+    finished = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+class SearchJob(QRunnable):
+    """Один поиск с выгрузкой, выполняемый в пуле потоков"""
+
+    def __init__(self, keywords, filters, pool, http_exporter):
+        super().__init__()
+        self.keywords = keywords
+        self.filters = filters
+        self.pool = pool
+        self.http_exporter = http_exporter
+        self.signals = SearchSignals()
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        """Просит поиск остановиться при ближайшей проверке"""
+        self.cancel_event.set()
+
+    def run(self):
+        if self.cancel_event.is_set():
+            self.signals.failed.emit("Поиск отменен")
+            return
+
+        self.signals.progress.emit(f"Поиск '{self.keywords}' запущен")
+        # Своя папка у каждого поиска: параллельные поиски не подхватывают чужие выгрузки
+        download_folder = setup_download_folder(f"gui_{safe_name(self.keywords)}_{uuid.uuid4().hex[:8]}")
+        try:
+            files = perform_optimized_search(
+                self.keywords,
+                pool=self.pool,
+                download_folder=download_folder,
+                http_exporter=self.http_exporter,
+                filters=self.filters,
+                progress=self.signals.progress.emit,
+                cancel_event=self.cancel_event
+            )
+            if self.cancel_event.is_set():
+                self.signals.failed.emit("Поиск отменен")
+                return
+            if files == []:
+                self.signals.finished.emit({"keywords": self.keywords, "filters": self.filters, "rows": 0})
+                return
+            if not files:
+                self.signals.failed.emit(f"Поиск '{self.keywords}' не дал выгрузки")
+                return
+
+            # Строки попадают в интерфейс через индекс: таблица перечитывает его после выгрузки
+            self.signals.progress.emit(f"Поиск '{self.keywords}': индексирование выгрузки")
+            # У фонового потока свое соединение с индексом
+            index = ContractIndex()
+            try:
+                total = index.add_files(files, self.keywords, self.filters.get("region"))
+            finally:
+                index.close()
+
+            self.signals.finished.emit({"keywords": self.keywords, "filters": self.filters, "rows": total})
+        except Exception as e:
+            self.signals.failed.emit(f"Ошибка поиска: {e}")
+        finally:
+            # Строки уже в индексе контрактов, выгрузки больше не нужны
+            shutil.rmtree(download_folder, ignore_errors=True)
+
+class SnapshotSignals(QObject):
+    ready = pyqtSignal(dict)
+
+class SnapshotJob(QRunnable):
+    """Пересчитывает снимок агрегатов для уведомлений вне потока интерфейса"""
+
+    def __init__(self, deadline_hours=48, reset_keys=()):
+        super().__init__()
+        self.deadline_hours = deadline_hours
+        self.reset_keys = list(reset_keys)
+        self.signals = SnapshotSignals()
+
+    def run(self):
+        index = ContractIndex()
+        try:
+            snapshot = index.notification_snapshot(self.deadline_hours, self.reset_keys)
+        except Exception as e:
+            print(f"Не удалось обновить данные для уведомлений: {e}")
+            return
+        finally:
+            index.close()
+        self.signals.ready.emit(snapshot)
+
+class PrelaunchJob(QRunnable):
+    """Запускает браузер пула и открывает страницу поиска, пока пользователь вводит запрос"""
+
+    def __init__(self, browser_pool, count=1):
+        super().__init__()
+        self.browser_pool = browser_pool
+        self.count = count
+
+    def run(self):
+        started = time.monotonic()
+        self.browser_pool.warm_up(self.count)
+        print(f"Браузер для поиска подготовлен за {time.monotonic() - started:.1f} с")
+
+class SearchWorkerPool:
+    """Очередь фоновых поисков поверх QThreadPool с общим пулом браузеров"""
+
+    def __init__(self, max_workers=2):
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(max_workers)
+        # Постоянные профили: первый поиск не скачивает заново скрипты и стили сайта
+        self.browser_pool = create_browser_pool(size=max_workers, warm_start=True)
+        self.http_exporter = HttpExporter(pool_size=max_workers)
+        self.jobs = []
+
+    def submit(self, keywords, filters):
+        """Ставит поиск в очередь и возвращает задачу для подписки на сигналы"""
+        job = SearchJob(keywords, filters, self.browser_pool, self.http_exporter)
+        job.signals.finished.connect(lambda _: self._forget(job))
+        job.signals.failed.connect(lambda _: self._forget(job))
+        self.jobs.append(job)
+        self.thread_pool.start(job)
+        return job
+
+    def _forget(self, job):
+        if job in self.jobs:
+            self.jobs.remove(job)
+
+    def cancel_all(self):
+        """Отменяет выполняющиеся и ожидающие в очереди поиски"""
+        for job in self.jobs[:]:
+            job.cancel()
+
+    def pending(self):
+        return len(self.jobs)
+
+    def prelaunch(self, count=1):
+        """Фоновый запуск браузеров, чтобы первый поиск не ждал холодного старта"""
+        self.prelaunch_job = PrelaunchJob(self.browser_pool, count)
+        QThreadPool.globalInstance().start(self.prelaunch_job)
+
+    def refresh_snapshot(self, on_ready, deadline_hours=48, reset_keys=()):
+        """Запускает фоновый пересчет агрегатов для уведомлений"""
+        job = SnapshotJob(deadline_hours, reset_keys)
+        job.signals.ready.connect(on_ready)
+        # Держим ссылку, пока сигнал не доставлен; общий пул, чтобы не ждать очереди поисков
+        self.snapshot_job = job
+        QThreadPool.globalInstance().start(job)
+
+    def shutdown(self):
+        self.cancel_all()
+        self.thread_pool.waitForDone(5000)
+        # Не закрываем пул, пока фоновый запуск браузера не завершился
+        QThreadPool.globalInstance().waitForDone(5000)
+        self.browser_pool.close()
+        self.http_exporter.close()
@@ -1,3 +1,8 @@
+import time
+
+# Время старта процесса, от которого считается появление окна
+STARTED = time.perf_counter()
+
 import sys
 import os
 from PyQt6.QtWidgets import (
@@ -5,39 +10,72 @@ from PyQt6.QtWidgets import (
     QComboBox, QLineEdit, QPushButton, QMessageBox, 
     QSpacerItem, QSizePolicy, QCheckBox
 )
-from PyQt6.QtCore import QTimer
-from PyQt6.QtGui import QPixmap, QPalette, QBrush
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
 from PyQt6.QtWidgets import QFileDialog
+from assets import BackgroundRenderer, load_stylesheet
+
+# Модули парсера (подбор контрактов по ТЗ) лежат в соседней папке
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "parser"))
+from keyword_completer import KeywordCompleter
+
+class TzMatchSignals(QObject):
+    done = pyqtSignal(object, list, float)
+    failed = pyqtSignal(str)
+
+class TzMatchJob(QRunnable):
+    """Загружает векторы контрактов и подбирает похожие на ТЗ вне потока интерфейса"""
+
+    def __init__(self, matcher, file_path):
+        super().__init__()
+        self.matcher = matcher
+        self.file_path = file_path
+        self.signals = TzMatchSignals()
+
+    def run(self):
+        try:
+            if self.matcher is None:
+                # numpy и scipy подгружаются только при первом подборе, а не при запуске окна
+                from tz_matcher import TzMatcher
+                self.matcher = TzMatcher()
+            # Векторы перечитываются, если индекс изменился после прошлого подбора
+            self.matcher.load()
+            results, elapsed_ms = self.matcher.match_file(self.file_path, top_k=10)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.done.emit(self.matcher, results, elapsed_ms)
 
 class SearchApp(QWidget):
     def __init__(self):
         super().__init__()
+        self.tz_matcher = None
+        self.tz_job = None
         self.setup_ui()
+        self.keyword_completer = KeywordCompleter(self.keywords_edit)
+        QTimer.singleShot(0, self.keyword_completer.refresh)
+        # Фон декодируется и масштабируется в фоне, окно показывается сразу
+        self.background = BackgroundRenderer(self, 'start.jpg')
         self.set_background_image('start.jpg')
+        self.precompute_backgrounds()
         
     def set_background_image(self, image_path):
         """Устанавливает изображение как фон"""
         try:
-            full_path = os.path.join(os.path.dirname(__file__), image_path)
-            
-            if os.path.exists(full_path):
-                pixmap = QPixmap(full_path)
-                
-                palette = self.palette()
-                palette.setBrush(QPalette.ColorRole.Window, QBrush(pixmap.scaled(
-                    self.size(), 
-                    Qt.AspectRatioMode.KeepAspectRatioByExpanding,
-                    Qt.TransformationMode.SmoothTransformation
-                )))
-                self.setPalette(palette)
-            else:
-                print(f"Файл изображения не найден: {full_path}")
+            self.background.set_image(image_path)
+            self.background.request()
         except Exception as e:
             print(f"Ошибка при загрузке фона: {e}")
 
+    def precompute_backgrounds(self):
+        """Заранее готовит фон под размер развернутого окна"""
+        screen = QApplication.primaryScreen()
+        if screen is None:
+            return
+        self.background.precompute([screen.availableGeometry().size(), screen.size()], 'background.jpg')
+
     def resizeEvent(self, event):
         """Переопределяем метод для обновления фона при изменении размера окна"""
+        # Черновой кадр сразу, качественный - после паузы в изменении размера
         self.set_background_image('background.jpg')
         super().resizeEvent(event)
         
@@ -94,9 +132,7 @@ class SearchApp(QWidget):
     def load_styles(self):
         """Загрузка стилей из файла CSS"""
         try:
-            css_file_path = os.path.join(os.path.dirname(__file__), 'styles.css')
-            with open(css_file_path, 'r', encoding='utf-8') as file:
-                self.setStyleSheet(file.read())
+            self.setStyleSheet(load_stylesheet('styles.css'))
         except FileNotFoundError:
             print("Файл стилей styles.css не найден. Используются стандартные стили.")
         except Exception as e:
@@ -111,10 +147,41 @@ class SearchApp(QWidget):
         )
         if file_path:
             print(f"Выбран файл: {file_path}")
+            self.match_tz(file_path)
+
+    def match_tz(self, file_path):
+        """Подбирает контракты из локального индекса, похожие на ТЗ"""
+        if self.tz_job is not None:
+            QMessageBox.information(self, "Подбор по ТЗ", "Предыдущий подбор еще выполняется.")
+            return
+        self.tz_job = TzMatchJob(self.tz_matcher, file_path)
+        self.tz_job.signals.done.connect(self._on_tz_matched)
+        self.tz_job.signals.failed.connect(self._on_tz_failed)
+        QThreadPool.globalInstance().start(self.tz_job)
+
+    def _on_tz_failed(self, message):
+        self.tz_job = None
+        QMessageBox.warning(self, "Подбор по ТЗ", f"Не удалось обработать ТЗ: {message}")
+
+    def _on_tz_matched(self, matcher, results, elapsed_ms):
+        self.tz_job = None
+        self.tz_matcher = matcher
+        if not results:
+            QMessageBox.information(self, "Подбор по ТЗ", "Похожих контрактов в локальном индексе нет.")
+            return
+
+        lines = [f"{row['score']:.2f} · № {row['registry_number']} · {row['subject'] or 'без описания'}"
+                 for row in results]
+        QMessageBox.information(
+            self,
+            "Подбор по ТЗ",
+            f"Похожие контракты (поиск занял {elapsed_ms:.0f} мс):\n\n" + "\n".join(lines)
+        )
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
     window = SearchApp()
     window.showMaximized()
+    QTimer.singleShot(0, lambda: print(f"Окно показано через {(time.perf_counter() - STARTED) * 1000:.0f} мс после запуска"))
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,340 @@
+"""Подсказки для поля ключевых слов: прошлые запросы и слова из предметов контрактов
+
+Индекс строится из локального индекса контрактов в один файл и читается через mmap,
+поэтому окно не загружает словарь при запуске. Продолжения ищутся двоичным поиском
+по отсортированным терминам, лучшие по весу берутся через разреженную таблицу
+максимумов, а опечатки исправляются по общим триграммам.
+
+Сборка и замер: python autocomplete.py [--build] [запрос ...]
+"""
+import os
+import sys
+import mmap
+import time
+import heapq
+import struct
+import bisect
+from array import array
+from collections import Counter
+
+MAGIC = b"ZKAC0002"
+# Последнее поле - счетчик изменений индекса контрактов, по которому собран файл
+HEADER = struct.Struct("<8s13Q")
+
+# Размер блока разреженной таблицы: внутри блока максимум ищется перебором
+BLOCK_SIZE = 64
+
+# Прошлые запросы с результатами всегда выше слов из предметов контрактов
+QUERY_BOOST = 1_000_000
+
+# Сколько лучших по весу терминов попадает в каждый список триграммы
+TRIGRAM_POSTINGS = 512
+
+def setup_autocomplete_path():
+    """Путь к файлу подсказок рядом с индексом контрактов"""
+    return os.path.join(os.getcwd(), "zakupki_autocomplete.idx")
+
+def normalize_query(text):
+    """Строка запроса в виде, в котором она хранится в индексе подсказок"""
+    return " ".join((text or "").lower().replace("ё", "е").split())
+
+def trigrams(text):
+    """Триграммы с меткой начала строки: опечатка в начале слова тоже находится"""
+    padded = "^^" + text
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def trigram_key(trigram):
+    """Триграмма -> одно 63-битное число (по 21 бит на символ)"""
+    key = 0
+    for char in trigram:
+        key = (key << 21) | ord(char)
+    return key
+
+def prefix_distance(query, term, limit):
+    """Наименьшее число правок, превращающих query в начало term; limit + 1, если больше"""
+    previous = list(range(len(term) + 1))
+    for i, char in enumerate(query, 1):
+        current = [i]
+        for j, other in enumerate(term, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous)
+
+def collect_terms(index, max_terms=3_000_000, min_count=2):
+    """Термины и веса из индекса контрактов
+
+    Прошлые запросы весят QUERY_BOOST плюс число найденных контрактов,
+    слова и пары соседних слов из предметов - число контрактов, где они встречаются.
+    """
+    from contract_index import WORD_RE
+
+    weights = Counter()
+    for query, total in index.conn.execute("SELECT query, SUM(total) FROM aggregates WHERE query IS NOT NULL GROUP BY query"):
+        term = normalize_query(query)
+        if term:
+            weights[term] = max(weights[term], QUERY_BOOST + total)
+
+    counts = Counter()
+    for (subject,) in index.conn.execute("SELECT subject FROM contracts WHERE subject IS NOT NULL"):
+        words = WORD_RE.findall(subject.lower().replace("ё", "е"))
+        found = {word for word in words if len(word) >= 3 and not word.isdigit()}
+        found.update(f"{first} {second}" for first, second in zip(words, words[1:])
+                     if len(first) >= 3 and len(second) >= 3)
+        counts.update(found)
+
+    for term, count in counts.items():
+        if count >= min_count and term not in weights:
+            weights[term] = count
+    return weights.most_common(max_terms)
+
+def write_index(terms, path, fuzzy_terms=200_000, index_version=0):
+    """Записывает индекс подсказок; terms - пары (термин, вес)
+
+    Файл пишется во временный и переименовывается, поэтому читатели
+    не видят наполовину записанный индекс.
+    """
+    terms = sorted(terms, key=lambda item: item[0].encode("utf-8"))
+    blob = bytearray()
+    offsets = array("I", [0])
+    weights = array("I")
+    for term, weight in terms:
+        blob += term.encode("utf-8")
+        offsets.append(len(blob))
+        weights.append(min(int(weight), 0xFFFFFFFF))
+
+    # Разреженная таблица: на уровне level позиция максимума среди 2**level блоков
+    count = len(weights)
+    blocks = (count + BLOCK_SIZE - 1) // BLOCK_SIZE
+    table = [array("I", (
+        max(range(start, min(start + BLOCK_SIZE, count)), key=weights.__getitem__)
+        for start in range(0, count, BLOCK_SIZE)
+    ))]
+    while (1 << len(table)) <= blocks:
+        lower, step = table[-1], 1 << (len(table) - 1)
+        table.append(array("I", (
+            lower[i] if i + step >= len(lower) or weights[lower[i]] >= weights[lower[i + step]] else lower[i + step]
+            for i in range(len(lower))
+        )))
+    sparse = array("I")
+    for level in table:
+        sparse.extend(level)
+
+    # Списки триграмм: по TRIGRAM_POSTINGS самых весомых терминов на триграмму
+    postings = {}
+    by_weight = sorted(range(count), key=weights.__getitem__, reverse=True)[:fuzzy_terms]
+    for term_id in by_weight:
+        for trigram in trigrams(terms[term_id][0]):
+            ids = postings.setdefault(trigram_key(trigram), array("I"))
+            if len(ids) < TRIGRAM_POSTINGS:
+                ids.append(term_id)
+    trigram_keys = array("Q", sorted(postings))
+    trigram_starts = array("I", [0])
+    posting_ids = array("I")
+    for key in trigram_keys:
+        posting_ids.extend(postings[key])
+        trigram_starts.append(len(posting_ids))
+
+    sections = [bytes(blob), offsets.tobytes(), weights.tobytes(), sparse.tobytes(),
+                trigram_keys.tobytes(), trigram_starts.tobytes(), posting_ids.tobytes()]
+    positions, position = [], HEADER.size
+    for section in sections:
+        # Выравнивание по 8 байт, чтобы срезы mmap приводились к массивам чисел
+        position += -position % 8
+        positions.append(position)
+        position += len(section)
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, count, blocks, len(table), len(trigram_keys), len(posting_ids), *positions,
+                               index_version))
+        for section, offset in zip(sections, positions):
+            file.write(b"\0" * (offset - file.tell()))
+            file.write(section)
+    os.replace(temp_path, path)
+    return count
+
+def build_autocomplete(path=None, index_path=None, max_terms=3_000_000):
+    """Перестраивает файл подсказок по индексу контрактов; возвращает число терминов"""
+    # Индекс контрактов нужен только при сборке: окну для подсказок достаточно файла
+    from contract_index import ContractIndex
+
+    index = ContractIndex(index_path)
+    try:
+        # Версия читается до сбора: изменения во время сборки пометят файл устаревшим
+        version = index.version()
+        terms = collect_terms(index, max_terms)
+    finally:
+        index.close()
+    return write_index(terms, path or setup_autocomplete_path(), index_version=version)
+
+class Autocomplete:
+    """Подсказки из файла индекса, открытого через mmap
+
+    Если файла еще нет, подсказок нет; reopen() подхватывает пересобранный файл.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or setup_autocomplete_path()
+        self.mmap = None
+        self.count = 0
+        self.index_version = None
+        self.reopen()
+
+    def reopen(self):
+        self.close()
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < HEADER.size:
+            return False
+        with open(self.path, "rb") as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.count, self.blocks, levels, trigram_count, posting_count,
+         blob_at, offsets_at, weights_at, sparse_at, keys_at, starts_at, postings_at,
+         index_version) = HEADER.unpack_from(self.mmap)
+        if magic != MAGIC:
+            print(f"Файл подсказок {self.path} другого формата, нужна пересборка")
+            self.close()
+            return False
+
+        self.index_version = index_version
+        view = memoryview(self.mmap)
+        self.offsets = view[offsets_at:offsets_at + 4 * (self.count + 1)].cast("I")
+        self.blob = view[blob_at:blob_at + self.offsets[self.count]]
+        self.weights = view[weights_at:weights_at + 4 * self.count].cast("I")
+        self.sparse = view[sparse_at:sparse_at + 4 * self.blocks * levels].cast("I")
+        self.trigram_keys = view[keys_at:keys_at + 8 * trigram_count].cast("Q")
+        self.trigram_starts = view[starts_at:starts_at + 4 * (trigram_count + 1)].cast("I")
+        self.postings = view[postings_at:postings_at + 4 * posting_count].cast("I")
+        return True
+
+    def install(self, new_path):
+        """Подменяет файл подсказок пересобранным
+
+        Windows не дает заменить файл, открытый через mmap, поэтому он сначала закрывается.
+        """
+        self.close()
+        os.replace(new_path, self.path)
+        return self.reopen()
+
+    def stale(self, index_path=None):
+        """Изменился ли индекс контрактов после сборки файла подсказок
+
+        Сравнивается счетчик изменений индекса, а не время файлов: в режиме WAL
+        новые строки лежат в -wal, и основной файл индекса может долго не меняться.
+        """
+        from contract_index import read_index_version
+
+        version = read_index_version(index_path)
+        if version is None:
+            return False
+        return self.mmap is None or self.index_version != version
+
+    def term(self, term_id):
+        return bytes(self.blob[self.offsets[term_id]:self.offsets[term_id + 1]]).decode("utf-8")
+
+    def _term_bytes(self, term_id):
+        return bytes(self.blob[self.offsets[term_id]:self.offsets[term_id + 1]])
+
+    def prefix_range(self, prefix):
+        """Диапазон номеров терминов, начинающихся с prefix"""
+        key = prefix.encode("utf-8")
+        low = bisect.bisect_left(range(self.count), key, key=self._term_bytes)
+        # Байт 0xFF не встречается в UTF-8, поэтому prefix + 0xFF больше любого продолжения
+        high = bisect.bisect_left(range(low, self.count), key + b"\xff", key=self._term_bytes) + low
+        return low, high
+
+    def _scan_max(self, start, end):
+        weights = self.weights[start:end].tolist()
+        return start + weights.index(max(weights))
+
+    def _range_max(self, start, end):
+        """Позиция термина с наибольшим весом в [start, end)"""
+        first_block, last_block = start // BLOCK_SIZE + 1, end // BLOCK_SIZE
+        if last_block - first_block < 1:
+            return self._scan_max(start, end)
+
+        candidates = [self._scan_max(start, first_block * BLOCK_SIZE)]
+        if end > last_block * BLOCK_SIZE:
+            candidates.append(self._scan_max(last_block * BLOCK_SIZE, end))
+        level = (last_block - first_block).bit_length() - 1
+        row = level * self.blocks
+        candidates.append(self.sparse[row + first_block])
+        candidates.append(self.sparse[row + last_block - (1 << level)])
+        return max(candidates, key=self.weights.__getitem__)
+
+    def top(self, start, end, limit):
+        """Номера limit самых весомых терминов в [start, end) по убыванию веса"""
+        if start >= end:
+            return []
+        result = []
+        position = self._range_max(start, end)
+        heap = [(-self.weights[position], position, start, end)]
+        while heap and len(result) < limit:
+            _, position, low, high = heapq.heappop(heap)
+            result.append(position)
+            for part_low, part_high in ((low, position), (position + 1, high)):
+                if part_low < part_high:
+                    best = self._range_max(part_low, part_high)
+                    heapq.heappush(heap, (-self.weights[best], best, part_low, part_high))
+        return result
+
+    def fuzzy(self, text, limit, exclude=(), candidates=24):
+        """Термины, начало которых отличается от text на одну-две правки"""
+        counts = Counter()
+        for trigram in trigrams(text):
+            key = trigram_key(trigram)
+            slot = bisect.bisect_left(self.trigram_keys, key)
+            if slot < len(self.trigram_keys) and self.trigram_keys[slot] == key:
+                counts.update(self.postings[self.trigram_starts[slot]:self.trigram_starts[slot + 1]])
+
+        max_distance = 1 if len(text) <= 5 else 2
+        found = []
+        for term_id, _ in counts.most_common(candidates):
+            if term_id in exclude:
+                continue
+            term = self.term(term_id)
+            distance = prefix_distance(text, term[:len(text) + max_distance], max_distance)
+            if distance <= max_distance:
+                found.append((distance, -self.weights[term_id], term_id))
+        return [term_id for _, _, term_id in sorted(found)[:limit]]
+
+    def suggest(self, text, limit=8):
+        """Подсказки для введенного текста: продолжения, а если их мало - исправления опечаток"""
+        text = normalize_query(text)
+        if not text or self.mmap is None:
+            return []
+        ids = self.top(*self.prefix_range(text), limit)
+        if len(ids) < limit and len(text) >= 3:
+            ids += self.fuzzy(text, limit - len(ids), exclude=set(ids))
+        return [self.term(term_id) for term_id in ids]
+
+    def close(self):
+        if self.mmap is None:
+            return
+        # Срезы mmap освобождаются до закрытия, иначе mmap не закрывается
+        for name in ("offsets", "blob", "weights", "sparse", "trigram_keys", "trigram_starts", "postings"):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self.mmap.close()
+        self.mmap = None
+        self.count = 0
+
+def main(args):
+    path = setup_autocomplete_path()
+    if "--build" in args or not os.path.exists(path):
+        started = time.perf_counter()
+        count = build_autocomplete(path)
+        print(f"Индекс подсказок собран: {count} терминов за {time.perf_counter() - started:.1f} с")
+
+    started = time.perf_counter()
+    autocomplete = Autocomplete(path)
+    print(f"Файл подсказок открыт за {(time.perf_counter() - started) * 1000:.2f} мс")
+    for text in [arg for arg in args if not arg.startswith("--")] or ["муж", "мужкие дж", "бумаг"]:
+        started = time.perf_counter()
+        suggestions = autocomplete.suggest(text)
+        print(f"{text!r}: {(time.perf_counter() - started) * 1000:.2f} мс -> {suggestions}")
+    autocomplete.close()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
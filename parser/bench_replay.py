@@ -0,0 +1,294 @@
+"""Офлайн-бенчмарк конвейера выгрузки на локальном сервере-заглушке
+
+Сервер отдает записанные страницы поиска (или сгенерированные, если записей нет)
+и CSV-выгрузку с настраиваемыми задержкой и размером. По нему прогоняется
+настоящий сценарий Selenium (или прямая выгрузка по HTTP), а результаты
+пишутся в JSON для сравнения между версиями.
+
+Запуск: python bench_replay.py --queries 10 --concurrency 1 2 4 --output bench_results.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, quote
+from concurrent.futures import ThreadPoolExecutor
+from pars import SEARCH_URL, setup_download_folder, create_browser_pool, perform_optimized_search
+from http_export import HttpExporter, SEARCH_PATH, EXPORT_PATH
+from waits import wait_stats
+from tracing import tracer
+from network_profile import NETWORK_PROFILES, network_stats
+
+RESULTS_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Реестр контрактов</title></head>
+<body>
+<form onsubmit="return false">
+  <input id="searchString" name="searchString" value="{search}">
+  <button class="search__btn" type="button"
+          onclick="location.href='?searchString=' + encodeURIComponent(document.getElementById('searchString').value)">Найти</button>
+</form>
+<div class="search-results__total">{total} записей</div>
+<img class="downLoad-icon" src="data:," onclick="document.getElementById('btn-primary').style.display='block'">
+<button id="btn-primary" style="display:none"
+        onclick="document.getElementById('csv').style.display='block'">Далее</button>
+<div id="csv" class="col-3 link csvDownload cursorPointer" style="display:none"
+     onclick="location.href='{export_path}?searchString=' + encodeURIComponent(document.getElementById('searchString').value)">CSV</div>
+{entries}
+{paginator}
+</body></html>
+"""
+
+# Карточка с теми же классами, что на сайте: ее разбирает и извлечение без выгрузки (page_extract)
+ENTRY = (
+    '<div class="search-registry-entry-block">'
+    '<span class="registry-entry__header-mid__number">№ {number}</span>'
+    '<div class="registry-entry__header-mid__title">Исполнение</div>'
+    '<div class="price-block__value">{price} ₽</div>'
+    '<div class="registry-entry__body-title">Заказчик</div><div class="registry-entry__body-value">ГБУ №{number}</div>'
+    '<div class="registry-entry__body-title">Объекты закупки</div><div class="registry-entry__body-value">{search} партия {number}</div>'
+    '<div class="data-block__title">Заключен</div><div class="data-block__value">01.02.2024</div>'
+    '</div>'
+)
+
+NEXT_BUTTON = '<a class="paginator-button-next{disabled}" href="#">Далее</a>'
+
+CSV_HEADER = "Реестровый номер контракта;Цена контракта;Дата заключения контракта;Заказчик;Поставщик;Объект закупки\n"
+
+def make_handler(recordings, entries, export_rows, export_latency):
+    """Обработчик запросов сервера-заглушки с заданными параметрами"""
+
+    class ReplayHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, body, content_type, extra_headers=None):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (extra_headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            search = params.get("searchString", [""])[0]
+
+            # Записанный ответ имеет приоритет над сгенерированным
+            if recordings:
+                recorded = os.path.join(recordings, url.path.strip("/").replace("/", "_"))
+                if os.path.isfile(recorded):
+                    with open(recorded, "rb") as file:
+                        content_type = "text/csv; charset=windows-1251" if recorded.endswith(".csv") else "text/html; charset=utf-8"
+                        self._send(file.read(), content_type)
+                    return
+
+            if url.path == SEARCH_PATH:
+                # Постраничный вывод как у сайта: pageNumber=2&recordsPerPage=_100
+                page = int(params.get("pageNumber", ["1"])[0])
+                per_page = int(params.get("recordsPerPage", ["_10"])[0].lstrip("_"))
+                first = (page - 1) * per_page
+                last = min(entries, first + per_page)
+                html = RESULTS_PAGE.format(
+                    search=search,
+                    total=entries,
+                    export_path=EXPORT_PATH,
+                    entries="\n".join(
+                        ENTRY.format(number=i, price=f"{1000 + i},50", search=search)
+                        for i in range(first, last)
+                    ),
+                    paginator=NEXT_BUTTON.format(disabled="" if last < entries else " disabled")
+                )
+                self._send(html.encode("utf-8"), "text/html; charset=utf-8")
+            elif url.path == EXPORT_PATH:
+                time.sleep(export_latency)
+                rows = "".join(
+                    f"{i};{1000 + i},50;01.02.2024;ГБУ №{i};ООО Поставщик;{search} партия {i}\n"
+                    for i in range(export_rows)
+                )
+                body = (CSV_HEADER + rows).encode("cp1251", errors="replace")
+                self._send(body, "text/csv; charset=windows-1251", {
+                    "Content-Disposition": f"attachment; filename*=UTF-8''{quote(search or 'export')}.csv"
+                })
+            else:
+                self.send_error(404)
+
+    return ReplayHandler
+
+def start_server(recordings=None, entries=50, export_rows=1000, export_latency=0.2):
+    """Запускает сервер-заглушку в фоновом потоке и возвращает (сервер, базовый адрес)"""
+    handler = make_handler(recordings, entries, export_rows, export_latency)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def _process_tree_rss_kb(root_pid):
+    """Суммарная резидентная память процесса и всех его потомков (Linux /proc)"""
+    children = {}
+    rss = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as file:
+                ppid = int(file.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{entry}/status") as file:
+                for line in file:
+                    if line.startswith("VmRSS:"):
+                        rss[int(entry)] = int(line.split()[1])
+                        break
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total, stack = 0, [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total
+
+class PeakRssSampler:
+    """Фоновый замер пиковой памяти Python вместе с дочерними Chrome"""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            if os.path.isdir("/proc"):
+                self.peak_kb = max(self.peak_kb, _process_tree_rss_kb(os.getpid()))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+
+def _percentile(values, share):
+    values = sorted(values)
+    return values[int(share * (len(values) - 1))] if values else None
+
+def run_level(base_url, engine, queries, concurrency, network_profile="full"):
+    """Прогоняет запросы с заданной параллельностью и возвращает сводку"""
+    download_folder = setup_download_folder(f"bench_{engine}_{network_profile}_{concurrency}")
+    shutil.rmtree(download_folder, ignore_errors=True)
+    os.makedirs(download_folder)
+
+    pool = http_exporter = None
+    if engine == "browser":
+        pool = create_browser_pool(size=concurrency, download_folder=download_folder,
+                                   search_url=base_url + SEARCH_PATH, network_profile=network_profile,
+                                   measure_network=True)
+        pool.warm_up()
+    else:
+        http_exporter = HttpExporter(base_url=base_url, pool_size=concurrency)
+
+    durations = []
+    failures = 0
+
+    def one(index):
+        folder = os.path.join(download_folder, f"q{index}")
+        os.makedirs(folder)
+        started = time.perf_counter()
+        files = perform_optimized_search(f"товар {index}", pool=pool, download_folder=folder,
+                                         http_exporter=http_exporter)
+        return time.perf_counter() - started, bool(files)
+
+    with PeakRssSampler() as sampler:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for duration, ok in executor.map(one, range(queries)):
+                durations.append(duration)
+                failures += not ok
+        elapsed = time.perf_counter() - started
+
+    if pool is not None:
+        pool.close()
+    if http_exporter is not None:
+        http_exporter.close()
+
+    # Статистика шагов и трафика общая для процесса: забираем ее, чтобы уровни не смешивались
+    spans = tracer.summary()
+    tracer.drain()
+
+    return {
+        "network_profile": network_profile,
+        "concurrency": concurrency,
+        "queries": queries,
+        "failures": failures,
+        "elapsed_seconds": round(elapsed, 3),
+        "queries_per_minute": round(queries / elapsed * 60, 2) if elapsed else None,
+        "query_seconds_p50": _percentile(durations, 0.5),
+        "query_seconds_p95": _percentile(durations, 0.95),
+        "peak_rss_kb": sampler.peak_kb,
+        "steps": wait_stats.drain(),
+        "spans": spans,
+        "network": network_stats.drain(),
+    }
+
+def _code_version():
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--engine", choices=["browser", "http"], default="browser")
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--network-profile", choices=NETWORK_PROFILES, nargs="+", default=["full"],
+                        help="профили сети браузера; full lean сравнивает трафик и скорость")
+    parser.add_argument("--recordings", help="папка с записанными ответами сайта")
+    parser.add_argument("--entries", type=int, default=50, help="результатов на странице поиска")
+    parser.add_argument("--export-rows", type=int, default=1000, help="строк в CSV-выгрузке")
+    parser.add_argument("--export-latency", type=float, default=0.2, help="задержка выгрузки, с")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args(argv)
+
+    server, base_url = start_server(args.recordings, args.entries, args.export_rows, args.export_latency)
+    try:
+        levels = [
+            run_level(base_url, args.engine, args.queries, level, network_profile)
+            for network_profile in args.network_profile
+            for level in args.concurrency
+        ]
+    finally:
+        server.shutdown()
+
+    result = {
+        "version": _code_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "engine": args.engine,
+        "settings": {
+            "entries": args.entries,
+            "export_rows": args.export_rows,
+            "export_latency": args.export_latency,
+            "live_url": SEARCH_URL,
+        },
+        "levels": levels,
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(result, file, ensure_ascii=False, indent=2)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return result
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,276 @@
+import threading
+import time
+import queue
+from collections import deque
+from contextlib import contextmanager
+from helium import start_chrome
+from network_profile import apply_network_profile
+from waits import SearchCancelled
+
+# Скрипт маскировки выполняется в каждом новом документе, поэтому
+# достаточно зарегистрировать его один раз при запуске браузера
+WEBDRIVER_MASK_SCRIPT = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+
+def mask_automation(driver):
+    """Регистрирует скрытие navigator.webdriver для всех последующих страниц"""
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": WEBDRIVER_MASK_SCRIPT})
+    except Exception:
+        pass
+    driver.execute_script(WEBDRIVER_MASK_SCRIPT)
+
+def set_download_folder(driver, download_folder):
+    """Перенаправляет загрузки уже запущенного браузера в другую папку"""
+    driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+        "behavior": "allow",
+        "downloadPath": download_folder,
+    })
+
+def wait_page_ready(driver, timeout=30):
+    """Ждет, пока документ полностью загрузится"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if driver.execute_script("return document.readyState") == "complete":
+                return True
+        except Exception:
+            pass
+        time.sleep(0.1)
+    return False
+
+class PooledDriver:
+    """Браузер из пула вместе со счетчиком выполненных запросов"""
+
+    def __init__(self, driver, profile_dir=None):
+        self.driver = driver
+        self.profile_dir = profile_dir
+        self.uses = 0
+        self.broken = False
+
+class BrowserPool:
+    """Пул прогретых headless-браузеров, которые выдаются запросам в аренду
+
+    Браузеры запускаются заранее, уже замаскированы и стоят на странице поиска.
+    Между арендами состояние сбрасывается, а после max_uses запросов
+    или после сбоя браузер перезапускается.
+    network_profile задает профиль сети (full или lean), с которым запускаются браузеры,
+    measure_network - считается ли их трафик.
+    С profiles (ProfileManager) каждый браузер получает постоянный профиль с теплым кэшем.
+    """
+
+    def __init__(self, url, options_factory, size=2, max_uses=20, page_timeout=30, network_profile="full",
+                 profiles=None, measure_network=False):
+        self.url = url
+        self.network_profile = network_profile
+        self.measure_network = measure_network
+        self.profiles = profiles
+        self.options_factory = options_factory
+        self.size = size
+        self.max_uses = max_uses
+        self.page_timeout = page_timeout
+
+        self._idle = deque()
+        self._lock = threading.Lock()
+        # Ожидающие аренды просыпаются, когда браузер вернулся или освободилось место под новый
+        self._available = threading.Condition(self._lock)
+        self._created = 0
+        self._closed = False
+
+        self.stats = {
+            "leases": 0,
+            "hits": 0,
+            "misses": 0,
+            "recycled": 0,
+            "crashed": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+        }
+
+    def _launch(self):
+        """Запускает новый браузер и открывает страницу поиска"""
+        options = self.options_factory()
+        profile_dir = None
+        if self.profiles is not None:
+            profile_dir = self.profiles.acquire()
+            self.profiles.apply(options, profile_dir)
+        try:
+            driver = start_chrome(self.url, options=options, headless=True)
+        except Exception:
+            if profile_dir is not None:
+                self.profiles.release(profile_dir, update_template=False)
+            raise
+        mask_automation(driver)
+        apply_network_profile(driver, self.network_profile)
+        wait_page_ready(driver, self.page_timeout)
+        return PooledDriver(driver, profile_dir)
+
+    def _dispose(self, item):
+        try:
+            item.driver.quit()
+        except Exception:
+            pass
+        if item.profile_dir is not None:
+            # Профиль сломанного браузера может быть поврежден, шаблоном его не делаем
+            self.profiles.release(item.profile_dir, update_template=not item.broken)
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def _put_idle(self, item):
+        with self._available:
+            if not self._closed:
+                self._idle.append(item)
+                self._available.notify()
+                return
+        self._dispose(item)
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.stats[name] += value
+
+    def _reset(self, item):
+        """Сбрасывает состояние браузера перед следующей арендой
+
+        У браузеров с постоянным профилем cookie и localStorage сохраняются:
+        ради них профиль и держится теплым. Цена - аренды одного браузера
+        делят состояние сайта, закрываются только лишние окна и sessionStorage.
+        """
+        driver = item.driver
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        if item.profile_dir is None:
+            driver.delete_all_cookies()
+            driver.execute_script("try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}")
+        else:
+            driver.execute_script("try { sessionStorage.clear(); } catch (e) {}")
+        driver.get(self.url)
+        wait_page_ready(driver, self.page_timeout)
+
+    def warm_up(self, count=None):
+        """Заранее запускает браузеры пула (все или count штук)"""
+        if self.profiles is not None:
+            self.profiles.compact()
+        target = self.size if count is None else min(self.size, count)
+        while True:
+            with self._lock:
+                if self._closed or self._created >= target:
+                    break
+                self._created += 1
+            try:
+                self._put_idle(self._launch())
+            except Exception as e:
+                with self._available:
+                    self._created -= 1
+                    self._available.notify()
+                print(f"Не удалось запустить браузер для пула: {e}")
+                break
+
+    def _acquire(self, timeout):
+        """Свободный браузер, новый браузер, если пул не заполнен, или ожидание
+
+        Пока аренда ждет, занятый браузер может быть перезапущен или сломаться;
+        тогда место освобождается и ожидающий запускает замену сам.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._available:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Пул браузеров закрыт")
+                if self._idle:
+                    self.stats["hits"] += 1
+                    return self._idle.popleft()
+                if self._created < self.size:
+                    self._created += 1
+                    self.stats["misses"] += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty()
+                self._available.wait(remaining)
+
+        try:
+            return self._launch()
+        except Exception:
+            with self._available:
+                self._created -= 1
+                self._available.notify()
+            raise
+
+    def _release(self, item):
+        item.uses += 1
+        if self._closed or item.broken:
+            if item.broken:
+                self._count("crashed")
+            self._dispose(item)
+            return
+        if item.uses >= self.max_uses:
+            self._count("recycled")
+            self._dispose(item)
+            return
+        try:
+            self._reset(item)
+        except Exception as e:
+            print(f"Не удалось сбросить состояние браузера: {e}")
+            self._count("crashed")
+            self._dispose(item)
+            return
+        self._put_idle(item)
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Выдает браузер из пула
+
+        Браузер считается сломанным при ошибке WebDriver или непредвиденном исключении;
+        отмена поиска и прерывание (Ctrl+C, закрытие генератора) браузер не портят.
+        """
+        if self._closed:
+            raise RuntimeError("Пул браузеров закрыт")
+
+        started = time.monotonic()
+        item = self._acquire(timeout)
+        waited = time.monotonic() - started
+
+        with self._lock:
+            self.stats["leases"] += 1
+            self.stats["wait_total"] += waited
+            self.stats["wait_max"] = max(self.stats["wait_max"], waited)
+
+        try:
+            yield item.driver
+        except SearchCancelled:
+            raise
+        except Exception:
+            item.broken = True
+            raise
+        finally:
+            self._release(item)
+
+    def report(self):
+        """Сводка статистики пула"""
+        with self._lock:
+            stats = dict(self.stats)
+        leases = stats["leases"]
+        return {
+            **stats,
+            "hit_ratio": stats["hits"] / leases if leases else 0.0,
+            "wait_avg": stats["wait_total"] / leases if leases else 0.0,
+        }
+
+    def close(self):
+        """Закрывает все свободные браузеры; занятые закроются при возврате"""
+        with self._available:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._available.notify_all()
+        for item in idle:
+            self._dispose(item)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
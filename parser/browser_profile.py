@@ -0,0 +1,175 @@
+import os
+import time
+import shutil
+import threading
+
+# Файлы блокировки, которые Chrome оставляет в папке профиля
+LOCK_FILES = ("SingletonLock", "SingletonCookie", "SingletonSocket", "lockfile")
+
+# Кэши, которые можно удалять без потери cookie и настроек сайта
+CACHE_DIRS = (
+    os.path.join("Default", "Cache"),
+    os.path.join("Default", "Code Cache"),
+    os.path.join("Default", "GPUCache"),
+    os.path.join("Default", "Service Worker", "CacheStorage"),
+    "GrShaderCache",
+    "ShaderCache",
+)
+
+def setup_profiles_folder():
+    """Папка постоянных профилей Chrome рядом с папкой загрузок"""
+    folder = os.path.join(os.getcwd(), "zakupki_profiles")
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+def folder_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def _lock_owner_alive(profile_dir):
+    """Жив ли процесс Chrome, заблокировавший профиль (SingletonLock -> 'хост-pid')"""
+    lock = os.path.join(profile_dir, "SingletonLock")
+    try:
+        target = os.readlink(lock)
+    except OSError:
+        return os.path.exists(lock)
+    try:
+        os.kill(int(target.rsplit("-", 1)[1]), 0)
+        return True
+    except (ValueError, IndexError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+
+class ProfileManager:
+    """Постоянные профили Chrome для теплого старта браузеров
+
+    Chrome не дает двум процессам работать с одним user-data-dir, поэтому
+    у каждого браузера свой профиль-клон. Новый клон копируется из шаблона -
+    последнего закрытого профиля, - так что скрипты, стили и cookie сайта
+    уже лежат в кэше. Размер дискового кэша ограничен, а при compact()
+    кэши свободных профилей сверх лимита удаляются.
+    """
+
+    def __init__(self, folder=None, max_cache_bytes=200 * 1024 ** 2, compact_interval=24 * 60 * 60,
+                 template_max_age=60 * 60):
+        self.folder = folder or setup_profiles_folder()
+        os.makedirs(self.folder, exist_ok=True)
+        self.template = os.path.join(self.folder, "template")
+        self.max_cache_bytes = max_cache_bytes
+        self.compact_interval = compact_interval
+        self.template_max_age = template_max_age
+        self._lock = threading.Lock()
+        self._in_use = set()
+        self._updating = False
+
+    def _worker_dirs(self):
+        return sorted(
+            os.path.join(self.folder, name) for name in os.listdir(self.folder)
+            if name.startswith("worker_") and os.path.isdir(os.path.join(self.folder, name))
+        )
+
+    def _clear_stale_locks(self, profile_dir):
+        for name in LOCK_FILES:
+            path = os.path.join(profile_dir, name)
+            if os.path.lexists(path):
+                os.remove(path)
+
+    def acquire(self):
+        """Выдает свободный профиль: существующий теплый клон или новую копию шаблона"""
+        with self._lock:
+            for profile_dir in self._worker_dirs():
+                if profile_dir in self._in_use:
+                    continue
+                if _lock_owner_alive(profile_dir):
+                    # Профиль занят браузером другого процесса
+                    continue
+                self._clear_stale_locks(profile_dir)
+                self._in_use.add(profile_dir)
+                return profile_dir
+
+            index = len(self._worker_dirs())
+            profile_dir = os.path.join(self.folder, f"worker_{index}")
+            while os.path.exists(profile_dir):
+                index += 1
+                profile_dir = os.path.join(self.folder, f"worker_{index}")
+            if os.path.isdir(self.template):
+                shutil.copytree(self.template, profile_dir, ignore=shutil.ignore_patterns(*LOCK_FILES))
+            else:
+                os.makedirs(profile_dir)
+            self._in_use.add(profile_dir)
+            return profile_dir
+
+    def release(self, profile_dir, update_template=True):
+        """Возвращает профиль после закрытия браузера
+
+        Если шаблон старше template_max_age, закрытый профиль становится новым шаблоном.
+        Профиль копируется без блокировки, чтобы другие браузеры пула могли
+        получать профили; на время копирования он остается занятым.
+        """
+        with self._lock:
+            if (not update_template or self._updating or _lock_owner_alive(profile_dir)
+                    or (os.path.isdir(self.template)
+                        and time.time() - os.path.getmtime(self.template) < self.template_max_age)):
+                self._in_use.discard(profile_dir)
+                return
+            self._updating = True
+
+        staging = self.template + ".new"
+        try:
+            shutil.rmtree(staging, ignore_errors=True)
+            shutil.copytree(profile_dir, staging, ignore=shutil.ignore_patterns(*LOCK_FILES))
+            # copytree переносит и время изменения, а возраст шаблона считаем от обновления
+            os.utime(staging)
+            with self._lock:
+                # Подмена под блокировкой: acquire не увидит наполовину замененный шаблон
+                shutil.rmtree(self.template, ignore_errors=True)
+                os.replace(staging, self.template)
+        except OSError as e:
+            shutil.rmtree(staging, ignore_errors=True)
+            print(f"Не удалось обновить шаблон профиля: {e}")
+        finally:
+            with self._lock:
+                self._updating = False
+                self._in_use.discard(profile_dir)
+
+    def apply(self, chrome_options, profile_dir):
+        """Направляет Chrome в профиль и ограничивает размер дискового кэша"""
+        chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+        chrome_options.add_argument(f"--disk-cache-size={self.max_cache_bytes}")
+        return chrome_options
+
+    def compact(self, force=False):
+        """Удаляет кэши свободных профилей, разросшихся сверх лимита
+
+        Выполняется не чаще compact_interval, если не указан force.
+        Возвращает число освобожденных байт.
+        """
+        marker = os.path.join(self.folder, ".compacted")
+        if not force and os.path.exists(marker) and time.time() - os.path.getmtime(marker) < self.compact_interval:
+            return 0
+
+        freed = 0
+        with self._lock:
+            candidates = [self.template] + self._worker_dirs()
+            for profile_dir in candidates:
+                if not os.path.isdir(profile_dir) or profile_dir in self._in_use or _lock_owner_alive(profile_dir):
+                    continue
+                cache_dirs = [os.path.join(profile_dir, name) for name in CACHE_DIRS]
+                size = sum(folder_size(path) for path in cache_dirs)
+                if size <= self.max_cache_bytes:
+                    continue
+                for path in cache_dirs:
+                    shutil.rmtree(path, ignore_errors=True)
+                freed += size
+        with open(marker, "w") as file:
+            file.write(str(time.time()))
+        if freed:
+            print(f"Кэш профилей Chrome сжат, освобождено {freed / 1024 ** 2:.0f} МБ")
+        return freed
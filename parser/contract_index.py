@@ -0,0 +1,361 @@
+import os
+import re
+import time
+import sqlite3
+from ingest import iter_contract_chunks
+
+# Окончания, которые отбрасываются при упрощенном стемминге русских слов
+# (от длинных к коротким, чтобы сначала срезалось самое длинное окончание)
+RUSSIAN_ENDINGS = sorted([
+    "ами", "ями", "ого", "его", "ому", "ему", "ыми", "ими", "ой", "ей", "ый", "ий",
+    "ая", "яя", "ое", "ее", "ые", "ие", "ых", "их", "ым", "им", "ом", "ем",
+    "ах", "ях", "ов", "ев", "ам", "ям", "ую", "юю", "а", "я", "о", "е", "ы",
+    "и", "у", "ю", "ь", "ть", "ться", "ется", "ются", "ится", "ятся",
+], key=len, reverse=True)
+
+WORD_RE = re.compile(r"[0-9a-zа-я]+")
+
+ARCHIVE_MARKERS = ("завершено", "прекращено", "аннулировано")
+
+# Закупка с таким или меньшим числом участников считается малоконкурентной
+LOW_COMPETITION_MAX = 1
+
+# Колонки, по которым можно сортировать таблицу результатов.
+# Пустые значения заменяются, чтобы сортировка шла по индексу без особых случаев для NULL
+SORT_KEYS = {
+    "registry_number": "c.registry_number",
+    "subject": "COALESCE(c.subject, '')",
+    "customer": "COALESCE(c.customer, '')",
+    "price": "COALESCE(c.price, 0)",
+    "sign_date": "COALESCE(c.sign_date, '')",
+    "update_date": "COALESCE(c.update_date, '')",
+    "region": "COALESCE(c.region, '')",
+    "status": "COALESCE(c.status, '')",
+}
+
+def stem_word(word):
+    """Отрезает окончание, оставляя основу не короче трех букв"""
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 3:
+            return word[:-len(ending)]
+    return word
+
+def stem_text(text):
+    """Нормализованный текст для полнотекстового индекса: основы слов через пробел"""
+    words = WORD_RE.findall((text or "").lower().replace("ё", "е"))
+    return " ".join(stem_word(word) for word in words)
+
+def setup_index_path():
+    """Путь к файлу индекса рядом с папкой загрузок"""
+    return os.path.join(os.getcwd(), "zakupki_index.sqlite")
+
+def read_index_version(path=None):
+    """Счетчик изменений индекса без открытия ContractIndex (только чтение, без создания схемы)"""
+    path = path or setup_index_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT value FROM index_state WHERE name = 'changes'").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] if row else 0
+
+class ContractIndex:
+    """Локальный полнотекстовый индекс выгруженных контрактов на SQLite FTS5
+
+    Флажки фильтров из интерфейса соответствуют колонкам is_actual,
+    electronic и is_archive, регион - колонке region.
+    Новые выгрузки добавляются по мере поступления, уже учтенные файлы пропускаются.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or setup_index_path()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS contracts (
+                id INTEGER PRIMARY KEY,
+                registry_number TEXT UNIQUE NOT NULL,
+                subject TEXT,
+                customer TEXT,
+                supplier TEXT,
+                price REAL,
+                sign_date TEXT,
+                update_date TEXT,
+                execution_end TEXT,
+                region TEXT,
+                status TEXT,
+                is_actual INTEGER NOT NULL DEFAULT 0,
+                is_archive INTEGER NOT NULL DEFAULT 0,
+                electronic INTEGER NOT NULL DEFAULT 0,
+                participants INTEGER,
+                query TEXT
+            );
+            CREATE INDEX IF NOT EXISTS contracts_deadlines ON contracts (region, query, execution_end);
+            CREATE TABLE IF NOT EXISTS aggregates (
+                region TEXT NOT NULL DEFAULT '',
+                query TEXT NOT NULL DEFAULT '',
+                total INTEGER NOT NULL DEFAULT 0,
+                new_since_check INTEGER NOT NULL DEFAULT 0,
+                low_competition INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (region, query)
+            );
+            CREATE INDEX IF NOT EXISTS contracts_filters ON contracts (region, is_actual, is_archive, electronic);
+            CREATE INDEX IF NOT EXISTS contracts_price ON contracts (COALESCE(price, 0), id);
+            CREATE INDEX IF NOT EXISTS contracts_sign_date ON contracts (COALESCE(sign_date, ''), id);
+            CREATE INDEX IF NOT EXISTS contracts_update_date ON contracts (COALESCE(update_date, ''), id);
+            CREATE VIRTUAL TABLE IF NOT EXISTS contracts_fts USING fts5 (body);
+            CREATE TABLE IF NOT EXISTS indexed_files (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime REAL,
+                rows INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS index_state (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        self._migrate_aggregates()
+
+    def _migrate_aggregates(self):
+        """Пересчитывает агрегаты, записанные с NULL в ключе
+
+        SQLite считает NULL в первичном ключе разными значениями, поэтому строки
+        без региона размножались, а не суммировались. Регион и запрос теперь
+        хранятся как '' и счетчики собираются заново по контрактам.
+        """
+        if not self.conn.execute(
+            "SELECT 1 FROM aggregates WHERE region IS NULL OR query IS NULL LIMIT 1"
+        ).fetchone():
+            return
+        with self.conn:
+            self.conn.execute(
+                "UPDATE contracts SET region = COALESCE(region, ''), query = COALESCE(query, '') "
+                "WHERE region IS NULL OR query IS NULL"
+            )
+            self.conn.execute("DELETE FROM aggregates")
+            self.conn.execute(
+                "INSERT INTO aggregates (region, query, total, new_since_check, low_competition) "
+                "SELECT region, query, COUNT(*), 0, "
+                "SUM(is_actual = 1 AND participants IS NOT NULL AND participants <= ?) "
+                "FROM contracts GROUP BY region, query",
+                (LOW_COMPETITION_MAX,)
+            )
+
+    @staticmethod
+    def _flags(record):
+        status = (record.get("status") or "").lower()
+        is_archive = any(marker in status for marker in ARCHIVE_MARKERS)
+        is_actual = not is_archive and ("исполнение" in status or not status)
+        electronic = (record.get("electronic") or "").strip().lower() in ("да", "yes", "1", "true")
+        return int(is_actual), int(is_archive), int(electronic)
+
+    @staticmethod
+    def _is_low_competition(participants, is_actual):
+        return int(bool(is_actual) and participants is not None and participants <= LOW_COMPETITION_MAX)
+
+    def _update_aggregates(self, previous, values):
+        """Поправляет счетчики уведомлений только для изменившейся строки"""
+        low = self._is_low_competition(values["participants"], values["is_actual"])
+        if previous is not None:
+            old_region, old_query, old_participants, old_actual = previous
+            old_low = self._is_low_competition(old_participants, old_actual)
+            self.conn.execute(
+                "UPDATE aggregates SET total = total - 1, low_competition = low_competition - ? "
+                "WHERE region = ? AND query = ?",
+                (old_low, old_region or "", old_query or "")
+            )
+        self.conn.execute(
+            "INSERT INTO aggregates (region, query, total, new_since_check, low_competition) "
+            "VALUES (?, ?, 1, ?, ?) ON CONFLICT(region, query) DO UPDATE SET "
+            "total = total + 1, new_since_check = new_since_check + excluded.new_since_check, "
+            "low_competition = low_competition + excluded.low_competition",
+            (values["region"], values["query"], int(previous is None), low)
+        )
+
+    def _upsert(self, record, query, region):
+        is_actual, is_archive, electronic = self._flags(record)
+        values = {
+            "registry_number": record["registry_number"],
+            "subject": record.get("subject"),
+            "customer": record.get("customer"),
+            "supplier": record.get("supplier"),
+            "price": record.get("price"),
+            "sign_date": record["sign_date"].isoformat() if record.get("sign_date") else None,
+            "update_date": record["update_date"].isoformat() if record.get("update_date") else None,
+            "execution_end": record["execution_end"].isoformat() if record.get("execution_end") else None,
+            # Пустая строка вместо NULL: иначе строки агрегатов без региона не сливаются
+            "region": record.get("region") or region or "",
+            "status": record.get("status"),
+            "is_actual": is_actual,
+            "is_archive": is_archive,
+            "electronic": electronic,
+            "participants": record.get("participants"),
+            "query": query or "",
+        }
+        previous = self.conn.execute(
+            "SELECT region, query, participants, is_actual FROM contracts WHERE registry_number = ?",
+            (values["registry_number"],)
+        ).fetchone()
+        self._update_aggregates(previous, values)
+
+        columns = ", ".join(values)
+        placeholders = ", ".join(f":{name}" for name in values)
+        updates = ", ".join(f"{name}=excluded.{name}" for name in values if name != "registry_number")
+        row_id = self.conn.execute(
+            f"INSERT INTO contracts ({columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT(registry_number) DO UPDATE SET {updates} RETURNING id",
+            values
+        ).fetchone()[0]
+
+        body = stem_text(" ".join(filter(None, [values["subject"], values["customer"], values["supplier"]])))
+        self.conn.execute("DELETE FROM contracts_fts WHERE rowid = ?", (row_id,))
+        self.conn.execute("INSERT INTO contracts_fts (rowid, body) VALUES (?, ?)", (row_id, body))
+
+    def add_file(self, path, query=None, region=None):
+        """Добавляет выгрузку в индекс, если этот файл еще не индексировался"""
+        stat = os.stat(path)
+        known = self.conn.execute(
+            "SELECT 1 FROM indexed_files WHERE path = ? AND size = ? AND mtime = ?",
+            (path, stat.st_size, stat.st_mtime)
+        ).fetchone()
+        if known:
+            return 0
+
+        rows = 0
+        with self.conn:
+            for chunk in iter_contract_chunks(path):
+                for record in chunk:
+                    if record.get("registry_number"):
+                        self._upsert(record, query, region)
+                        rows += 1
+            self.conn.execute(
+                "INSERT OR REPLACE INTO indexed_files (path, size, mtime, rows) VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime, rows)
+            )
+            # Счетчик изменений: обновленные строки не меняют ни число контрактов, ни последний id
+            self.conn.execute(
+                "INSERT INTO index_state (name, value) VALUES ('changes', 1) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + 1"
+            )
+        return rows
+
+    def version(self):
+        """Номер изменения индекса, растет при каждой проиндексированной выгрузке"""
+        row = self.conn.execute("SELECT value FROM index_state WHERE name = 'changes'").fetchone()
+        return row[0] if row else 0
+
+    def add_files(self, paths, query=None, region=None):
+        """Добавляет несколько выгрузок и возвращает число проиндексированных строк"""
+        return sum(self.add_file(path, query, region) for path in paths)
+
+    def _where(self, keywords, region, only_actual, with_signature, include_archive):
+        clauses, params = [], []
+        match = " ".join(f'"{word}"*' for word in stem_text(keywords).split())
+        if match:
+            clauses.append("c.id IN (SELECT rowid FROM contracts_fts WHERE contracts_fts MATCH ?)")
+            params.append(match)
+        if region:
+            clauses.append("c.region = ?")
+            params.append(region)
+        if only_actual:
+            clauses.append("c.is_actual = 1")
+        if with_signature:
+            clauses.append("c.electronic = 1")
+        if not include_archive:
+            clauses.append("c.is_archive = 0")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def search(self, keywords, region=None, only_actual=False, with_signature=False,
+               include_archive=False, limit=100):
+        """Ищет контракты по словам и фильтрам; возвращает (строки, задержка в мс)"""
+        started = time.perf_counter()
+        where, params = self._where(keywords, region, only_actual, with_signature, include_archive)
+        cursor = self.conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        rows = cursor.execute(
+            f"SELECT c.* FROM contracts c{where} ORDER BY c.update_date DESC LIMIT ?",
+            params + [limit]
+        ).fetchall()
+        latency_ms = (time.perf_counter() - started) * 1000
+        return [dict(row) for row in rows], latency_ms
+
+    def count(self, keywords, region=None, only_actual=False, with_signature=False, include_archive=False):
+        """Число контрактов, подходящих под запрос"""
+        where, params = self._where(keywords, region, only_actual, with_signature, include_archive)
+        return self.conn.execute(f"SELECT COUNT(*) FROM contracts c{where}", params).fetchone()[0]
+
+    def open_view(self, keywords, region=None, only_actual=False, with_signature=False,
+                  include_archive=False, sort_key="update_date", descending=True):
+        """Запоминает порядок подходящих контрактов во временной таблице result_view
+
+        Фильтрация и сортировка выполняются в SQLite один раз; дальше страницы
+        читаются по номеру позиции через view_rows(). Временная таблица принадлежит
+        соединению, поэтому у каждого окна результатов свой ContractIndex.
+        Возвращает число строк.
+        """
+        where, params = self._where(keywords, region, only_actual, with_signature, include_archive)
+        order = "DESC" if descending else "ASC"
+        with self.conn:
+            self.conn.execute("DROP TABLE IF EXISTS temp.result_view")
+            self.conn.execute("CREATE TEMP TABLE result_view (pos INTEGER PRIMARY KEY, id INTEGER NOT NULL)")
+            self.conn.execute(
+                f"INSERT INTO temp.result_view (id) SELECT c.id FROM contracts c{where} "
+                f"ORDER BY {SORT_KEYS[sort_key]} {order}, c.id {order}",
+                params
+            )
+        return self.conn.execute("SELECT COUNT(*) FROM temp.result_view").fetchone()[0]
+
+    def view_rows(self, offset, limit, columns):
+        """Строки result_view с позиции offset (с нуля) в виде кортежей значений columns"""
+        selected = ", ".join(f"c.{name}" for name in columns)
+        return self.conn.execute(
+            f"SELECT {selected} FROM temp.result_view v JOIN contracts c ON c.id = v.id "
+            f"WHERE v.pos > ? AND v.pos <= ? ORDER BY v.pos",
+            (offset, offset + limit)
+        ).fetchall()
+
+    def notification_snapshot(self, deadline_hours=48, reset_keys=()):
+        """Готовые цифры для уведомлений по каждой паре (регион, запрос)
+
+        Счетчики новых и малоконкурентных закупок поддерживаются при добавлении строк,
+        число закупок с близким сроком берется по индексу контрактов по датам окончания.
+        Для пар из reset_keys счетчик новых закупок обнуляется (пользователь их уже видел).
+        """
+        with self.conn:
+            for region, query in reset_keys:
+                self.conn.execute(
+                    "UPDATE aggregates SET new_since_check = 0 WHERE region = ? AND query = ?",
+                    (region or "", query or "")
+                )
+
+        today = time.strftime("%Y-%m-%d")
+        horizon = time.strftime("%Y-%m-%d", time.localtime(time.time() + deadline_hours * 3600))
+        snapshot = {}
+        for region, query, total, new, low in self.conn.execute(
+            "SELECT region, query, total, new_since_check, low_competition FROM aggregates WHERE total > 0"
+        ).fetchall():
+            closing = self.conn.execute(
+                "SELECT COUNT(*) FROM contracts WHERE region = ? AND query = ? "
+                "AND execution_end BETWEEN ? AND ? AND is_actual = 1",
+                (region, query, today, horizon)
+            ).fetchone()[0]
+            snapshot[(region, query)] = {
+                "total": total,
+                "new": new,
+                "closing": closing,
+                "low_competition": low,
+            }
+        return snapshot
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,312 @@
+"""Фоновый режим парсера: регулярные поиски по расписанию с общими прогретыми браузерами
+
+Определения поисков читаются из JSON-файла, например:
+
+[
+    {"keywords": "ноутбуки", "region": "Москва", "filters": {"only_actual": true}, "interval_minutes": 30},
+    {"keywords": "бумага", "filters": {"include_archive": true}, "interval_minutes": 1440}
+]
+
+Запуск: python daemon.py --config daemon_searches.json --workers 2 --rate 0.2 --port 8765
+"""
+import os
+import sys
+import json
+import time
+import heapq
+import signal
+import argparse
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pars import setup_download_folder, create_browser_pool, perform_optimized_search
+from http_export import HttpExporter, safe_name
+from ingest import ingest_files
+from contract_index import ContractIndex
+from download_store import DownloadStore
+from result_cache import filter_class, make_key
+
+# Очередность классов поисков: актуальные закупки раньше архивных догрузок
+PRIORITY_RANKS = {
+    "actual": 0,
+    "default": 1,
+    "archive": 2,
+}
+
+class TokenBucket:
+    """Общий лимит запросов к сайту: rate жетонов в секунду, запас не больше capacity"""
+
+    def __init__(self, rate, capacity=1):
+        if rate <= 0:
+            raise ValueError(f"Скорость запросов должна быть больше нуля, получено {rate}")
+        if capacity < 1:
+            raise ValueError(f"Запас запросов должен быть не меньше 1, получено {capacity}")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, stop_event=None):
+        """Ждет жетон; возвращает False, если за это время пришла остановка"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if stop_event is not None:
+                if stop_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self.tokens
+
+class SearchDefinition:
+    """Регулярный поиск: ключевые слова, фильтры и интервал повторения"""
+
+    def __init__(self, keywords, region=None, filters=None, interval_minutes=60, priority=None):
+        self.keywords = keywords
+        self.filters = dict(filters or {})
+        if region:
+            self.filters["region"] = region
+        self.interval = interval_minutes * 60
+        self.priority = priority or filter_class(**self.filters)
+        self.runs = 0
+        self.last_status = None
+        self.last_finished_at = None
+
+    @property
+    def name(self):
+        return f"{self.keywords} ({self.filters.get('region') or 'все регионы'})"
+
+    def rank(self):
+        return PRIORITY_RANKS.get(self.priority, PRIORITY_RANKS["default"])
+
+def load_definitions(path):
+    with open(path, encoding="utf-8") as file:
+        return [SearchDefinition(**entry) for entry in json.load(file)]
+
+class ScrapeDaemon:
+    """Планировщик регулярных поисков с очередью по приоритетам
+
+    Поиск, время которого пришло, попадает в очередь готовых; обработчики
+    берут из нее сначала более приоритетные, а внутри класса - давно ждущие.
+    Следующий запуск планируется после завершения текущего, поэтому запуски
+    одного поиска не перекрываются.
+    """
+
+    def __init__(self, definitions, workers=2, rate=0.2, burst=1, pool_max_uses=50):
+        self.definitions = definitions
+        self.workers = workers
+        self.bucket = TokenBucket(rate, burst)
+        self.pool = create_browser_pool(size=workers, max_uses=pool_max_uses)
+        self.http_exporter = HttpExporter(pool_size=workers)
+        self.store = DownloadStore()
+        self.stop_event = threading.Event()
+
+        self._lock = threading.Condition()
+        self._scheduled = []
+        self._ready = []
+        self._sequence = 0
+        self.running = 0
+        self.completed = deque()
+        self.failed = 0
+        self.started_at = time.time()
+
+        now = time.time()
+        for definition in definitions:
+            self._schedule(definition, now)
+
+    def _schedule(self, definition, at):
+        with self._lock:
+            self._sequence += 1
+            heapq.heappush(self._scheduled, (at, self._sequence, definition))
+            self._lock.notify_all()
+
+    def _promote_due(self):
+        """Переносит поиски, время которых пришло, в очередь готовых"""
+        now = time.time()
+        while self._scheduled and self._scheduled[0][0] <= now:
+            due, sequence, definition = heapq.heappop(self._scheduled)
+            heapq.heappush(self._ready, (definition.rank(), due, sequence, definition))
+
+    def _next(self):
+        with self._lock:
+            while not self.stop_event.is_set():
+                self._promote_due()
+                if self._ready:
+                    self.running += 1
+                    return heapq.heappop(self._ready)[3]
+                wait = self._scheduled[0][0] - time.time() if self._scheduled else None
+                self._lock.wait(wait if wait is None else max(0.0, min(wait, 5.0)))
+        return None
+
+    def _run(self, definition):
+        """Выполняет один запуск поиска и индексирует выгрузку"""
+        started = time.time()
+        # Папка по ключу запроса с фильтрами: поиски одних слов по разным регионам не смешивают файлы
+        key = make_key(definition.keywords, **definition.filters)
+        folder = setup_download_folder(f"daemon_{safe_name(definition.keywords)}_{key[:10]}")
+        files = perform_optimized_search(
+            definition.keywords,
+            pool=self.pool,
+            download_folder=folder,
+            http_exporter=self.http_exporter,
+            filters=definition.filters,
+            store=self.store
+        )
+        if files:
+            ingest_files(files, definition.keywords, filters=definition.filters)
+            # У каждого потока свое соединение с индексом
+            index = ContractIndex()
+            try:
+                index.add_files(files, definition.keywords, definition.filters.get("region"))
+            finally:
+                index.close()
+            self.store.enforce_retention()
+        return files, time.time() - started
+
+    def _worker(self):
+        while True:
+            definition = self._next()
+            if definition is None:
+                return
+            try:
+                if not self.bucket.acquire(self.stop_event):
+                    return
+                try:
+                    files, duration = self._run(definition)
+                except Exception as e:
+                    print(f"Поиск {definition.name} завершился с ошибкой: {e}")
+                    files, duration = False, 0.0
+
+                definition.runs += 1
+                definition.last_status = "done" if files else "empty" if files == [] else "failed"
+                definition.last_finished_at = time.time()
+                with self._lock:
+                    if files or files == []:
+                        self.completed.append(definition.last_finished_at)
+                    else:
+                        self.failed += 1
+                print(f"Поиск {definition.name}: {definition.last_status} за {duration:.1f} с")
+            finally:
+                with self._lock:
+                    self.running -= 1
+                self._schedule(definition, time.time() + definition.interval)
+
+    def status(self):
+        """Глубина очереди, выполняющиеся поиски и пропускная способность"""
+        now = time.time()
+        with self._lock:
+            self._promote_due()
+            # Пропускную способность считаем по последнему часу
+            while self.completed and self.completed[0] < now - 3600:
+                self.completed.popleft()
+            ready = [definition.name for _, _, _, definition in sorted(self._ready)]
+            next_run = self._scheduled[0][0] - now if self._scheduled else None
+            completed_last_hour = len(self.completed)
+            running = self.running
+            failed = self.failed
+        return {
+            "uptime_seconds": round(now - self.started_at),
+            "queue_depth": len(ready),
+            "ready": ready,
+            "running": running,
+            "next_run_in_seconds": round(next_run, 1) if next_run is not None else None,
+            "completed_last_hour": completed_last_hour,
+            "throughput_per_minute": round(completed_last_hour / min(60.0, max(1.0, (now - self.started_at) / 60)), 3),
+            "failed_total": failed,
+            "tokens_available": round(self.bucket.available(), 2),
+            "browser_pool": self.pool.report(),
+            "searches": [
+                {
+                    "name": definition.name,
+                    "priority": definition.priority,
+                    "runs": definition.runs,
+                    "last_status": definition.last_status,
+                    "last_finished_at": definition.last_finished_at,
+                }
+                for definition in self.definitions
+            ],
+        }
+
+    def serve_status(self, port=8765):
+        """Локальный HTTP-адрес /status с состоянием планировщика в JSON"""
+        daemon = self
+
+        class StatusHandler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.rstrip("/") != "/status":
+                    self.send_error(404)
+                    return
+                body = json.dumps(daemon.status(), ensure_ascii=False, indent=2).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), StatusHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"Состояние планировщика: http://127.0.0.1:{port}/status")
+        return server
+
+    def run(self, port=8765):
+        """Работает до остановки (Ctrl+C или SIGTERM)"""
+        self.pool.warm_up()
+        server = self.serve_status(port) if port else None
+        threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            while not self.stop_event.wait(1):
+                pass
+        finally:
+            self.stop()
+            for thread in threads:
+                thread.join(timeout=60)
+            if server is not None:
+                server.shutdown()
+            self.pool.close()
+            self.http_exporter.close()
+            self.store.close()
+
+    def stop(self):
+        self.stop_event.set()
+        with self._lock:
+            self._lock.notify_all()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default=os.path.join(os.getcwd(), "daemon_searches.json"))
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--rate", type=float, default=0.2, help="запросов к сайту в секунду")
+    parser.add_argument("--burst", type=int, default=1, help="запас запросов подряд")
+    parser.add_argument("--port", type=int, default=8765, help="порт /status, 0 - не запускать")
+    args = parser.parse_args(argv)
+
+    definitions = load_definitions(args.config)
+    print(f"Загружено регулярных поисков: {len(definitions)}")
+    daemon = ScrapeDaemon(definitions, workers=args.workers, rate=args.rate, burst=args.burst)
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+    try:
+        daemon.run(args.port)
+    except KeyboardInterrupt:
+        daemon.stop()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,192 @@
+import io
+import os
+import gzip
+import time
+import json
+import shutil
+import hashlib
+import sqlite3
+import threading
+
+CHUNK_SIZE = 1024 * 1024
+
+def setup_store_folder():
+    """Папка хранилища выгрузок рядом с папкой загрузок"""
+    folder = os.path.join(os.getcwd(), "zakupki_store")
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+def _zstandard():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+def open_stored(path):
+    """Открывает выгрузку на чтение в байтах, распаковывая .zst и .gz на лету"""
+    if path.endswith(".zst"):
+        zstandard = _zstandard()
+        if zstandard is None:
+            raise RuntimeError("Для чтения сжатых zstd выгрузок нужен пакет zstandard")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+def file_hash(path):
+    """SHA-256 содержимого файла, читается кусками"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class DownloadStore:
+    """Хранилище выгрузок по хешу содержимого
+
+    Одинаковые выгрузки хранятся один раз и в сжатом виде, а каталог
+    в SQLite связывает запрос и время загрузки с файлом. Старые записи
+    и записи сверх лимита объема удаляются в enforce_retention().
+    """
+
+    def __init__(self, folder=None, compression="zstd", max_bytes=5 * 1024 ** 3, max_age_days=90):
+        self.folder = folder or setup_store_folder()
+        os.makedirs(os.path.join(self.folder, "objects"), exist_ok=True)
+        if compression == "zstd" and _zstandard() is None:
+            print("Пакет zstandard не установлен, выгрузки сжимаются gzip")
+            compression = "gzip"
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 24 * 60 * 60
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(os.path.join(self.folder, "catalog.sqlite"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS objects (
+                hash TEXT PRIMARY KEY,
+                path TEXT,
+                size INTEGER,
+                stored_size INTEGER,
+                created_at REAL,
+                last_used REAL
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY,
+                query TEXT,
+                filters TEXT,
+                original_name TEXT,
+                hash TEXT,
+                stored_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS entries_query ON entries (query, stored_at);
+            CREATE INDEX IF NOT EXISTS entries_hash ON entries (hash);
+        """)
+
+    def _object_path(self, digest):
+        extension = ".csv.zst" if self.compression == "zstd" else ".csv.gz"
+        return os.path.join(self.folder, "objects", digest[:2], digest + extension)
+
+    def _compress(self, source, target):
+        """Сжимает файл потоково во временный файл и атомарно переименовывает"""
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp_path = target + ".tmp"
+        with open(source, "rb") as src:
+            if self.compression == "zstd":
+                with open(temp_path, "wb") as raw, _zstandard().ZstdCompressor(level=10).stream_writer(raw) as out:
+                    shutil.copyfileobj(src, out, CHUNK_SIZE)
+            else:
+                with gzip.open(temp_path, "wb", compresslevel=6) as out:
+                    shutil.copyfileobj(src, out, CHUNK_SIZE)
+        os.replace(temp_path, target)
+
+    def put(self, path, query, filters=None, stored_at=None):
+        """Переносит загруженный файл в хранилище и возвращает путь к сохраненной копии"""
+        digest = file_hash(path)
+        size = os.path.getsize(path)
+        now = stored_at or time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT path FROM objects WHERE hash = ?", (digest,)).fetchone()
+            if row and os.path.exists(row[0]):
+                stored_path = row[0]
+            else:
+                stored_path = self._object_path(digest)
+                self._compress(path, stored_path)
+            with self.conn:
+                self.conn.execute("""
+                    INSERT INTO objects VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(hash) DO UPDATE SET path = excluded.path, last_used = excluded.last_used
+                """, (digest, stored_path, size, os.path.getsize(stored_path), now, now))
+                self.conn.execute(
+                    "INSERT INTO entries (query, filters, original_name, hash, stored_at) VALUES (?, ?, ?, ?, ?)",
+                    (query, json.dumps(filters or {}, ensure_ascii=False, default=str), os.path.basename(path),
+                     digest, now)
+                )
+        os.remove(path)
+        return stored_path
+
+    def put_files(self, paths, query, filters=None):
+        """Переносит файлы одной выгрузки; у них общее время сохранения"""
+        stored_at = time.time()
+        return [self.put(path, query, filters, stored_at) for path in paths]
+
+    def latest(self, query):
+        """Пути последней сохраненной выгрузки запроса"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT MAX(stored_at) FROM entries WHERE query = ?", (query,)
+            ).fetchone()
+            if not row or row[0] is None:
+                return []
+            rows = self.conn.execute("""
+                SELECT o.path FROM entries e JOIN objects o ON o.hash = e.hash
+                WHERE e.query = ? AND e.stored_at = ?
+            """, (query, row[0])).fetchall()
+        return [path for (path,) in rows]
+
+    def _delete_object(self, digest, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        self.conn.execute("DELETE FROM objects WHERE hash = ?", (digest,))
+        self.conn.execute("DELETE FROM entries WHERE hash = ?", (digest,))
+
+    def enforce_retention(self):
+        """Удаляет записи старше max_age_days и самые давно использованные объекты сверх max_bytes"""
+        removed = 0
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM entries WHERE stored_at < ?", (time.time() - self.max_age,))
+            orphans = self.conn.execute(
+                "SELECT hash, path FROM objects WHERE hash NOT IN (SELECT hash FROM entries)"
+            ).fetchall()
+            for digest, path in orphans:
+                self._delete_object(digest, path)
+                removed += 1
+
+            total = self.conn.execute("SELECT COALESCE(SUM(stored_size), 0) FROM objects").fetchone()[0]
+            if total > self.max_bytes:
+                for digest, path, stored_size in self.conn.execute(
+                    "SELECT hash, path, stored_size FROM objects ORDER BY last_used"
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    self._delete_object(digest, path)
+                    total -= stored_size
+                    removed += 1
+        if removed:
+            print(f"Из хранилища выгрузок удалено файлов: {removed}")
+        return removed
+
+    def report(self):
+        """Число записей и объектов, исходный и сжатый объем"""
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            objects, size, stored = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM objects"
+            ).fetchone()
+        return {"entries": entries, "objects": objects, "bytes": size, "stored_bytes": stored}
+
+    def close(self):
+        self.conn.close()
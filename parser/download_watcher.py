@@ -0,0 +1,182 @@
+import os
+import sys
+import time
+import struct
+import select
+import ctypes
+import ctypes.util
+
+TEMP_EXTENSIONS = ('.crdownload', '.part', '.tmp')
+
+# Константы из <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct("iIII")
+
+def _load_inotify():
+    """Возвращает libc с функциями inotify или None, если они недоступны"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+_libc = _load_inotify()
+
+def is_complete_csv(path, min_size=100, verbose=True):
+    """Проверяет, что файл не пустой и похож на целиком записанный CSV"""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        if verbose:
+            print(f"Файл {os.path.basename(path)} не существует")
+        return False
+    if size <= min_size:
+        if verbose:
+            print(f"Файл {os.path.basename(path)} слишком мал: {size} байт")
+        return False
+    if not path.lower().endswith(".csv"):
+        return True
+    with open(path, "rb") as file:
+        header = file.readline(64 * 1024)
+    if b";" not in header and b"," not in header:
+        if verbose:
+            print(f"Файл {os.path.basename(path)} не похож на CSV")
+        return False
+    return True
+
+class DownloadWatcher:
+    """Отслеживает появление готовых файлов в папке загрузок
+
+    На Linux реагирует на события inotify: закрытие записанного файла и
+    переименование .crdownload в итоговое имя. Если inotify недоступен,
+    опрашивает папку с нарастающим интервалом и перечитывает ее содержимое
+    только после изменения времени модификации папки.
+    Наблюдение нужно начинать до нажатия кнопки выгрузки.
+    Файл, не прошедший проверку, проверяется снова только после изменения
+    его размера или времени модификации, а причина пишется в лог один раз.
+    """
+
+    def __init__(self, download_folder, min_size=100):
+        self.download_folder = download_folder
+        self.min_size = min_size
+        self._fd = None
+        self._known = None
+        self._folder_mtime = None
+        self._pending = set()
+        # Отклоненные файлы: имя -> (размер, время модификации) на момент проверки
+        self._rejected = {}
+
+        if _libc is not None:
+            fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                mask = IN_CLOSE_WRITE | IN_MOVED_TO
+                if _libc.inotify_add_watch(fd, os.fsencode(download_folder), mask) >= 0:
+                    self._fd = fd
+                else:
+                    os.close(fd)
+
+        if self._fd is None:
+            self._known = self._list_folder()
+            self._folder_mtime = os.stat(download_folder).st_mtime_ns
+
+    def _list_folder(self):
+        with os.scandir(self.download_folder) as entries:
+            return {entry.name for entry in entries if entry.is_file()}
+
+    def _is_final(self, name):
+        return not name.endswith(TEMP_EXTENSIONS) and not name.startswith(".")
+
+    def _check(self, name):
+        """Готов ли файл; неизменившийся отклоненный файл повторно не читается"""
+        path = os.path.join(self.download_folder, name)
+        try:
+            stat = os.stat(path)
+            signature = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            signature = None
+        if name in self._rejected and self._rejected[name] == signature:
+            return False
+        if is_complete_csv(path, self.min_size, verbose=name not in self._rejected):
+            self._rejected.pop(name, None)
+            return True
+        self._rejected[name] = signature
+        return False
+
+    def _read_events(self, timeout):
+        """Возвращает имена файлов из событий inotify за время ожидания"""
+        ready, _, _ = select.select([self._fd], [], [], max(timeout, 0))
+        if not ready:
+            return []
+        data = os.read(self._fd, 64 * 1024)
+        names = []
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def _poll_changes(self):
+        """Новые файлы с момента прошлой проверки (режим без inotify)
+
+        Файлы, которые еще дописываются, остаются в списке ожидающих
+        и проверяются повторно без перечитывания папки.
+        """
+        mtime = os.stat(self.download_folder).st_mtime_ns
+        if mtime != self._folder_mtime:
+            self._folder_mtime = mtime
+            current = self._list_folder()
+            self._pending |= current - self._known
+            self._known = current
+        return sorted(self._pending)
+
+    def wait(self, timeout=60, cancel_event=None):
+        """Ждет первый готовый файл и возвращает список путей (пустой при таймауте или отмене)"""
+        deadline = time.monotonic() + timeout
+        interval = 0.05
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (cancel_event is not None and cancel_event.is_set()):
+                return []
+
+            if self._fd is not None:
+                # С отменой просыпаемся регулярно, чтобы проверить флаг
+                names = self._read_events(min(remaining, 0.5) if cancel_event is not None else remaining)
+            else:
+                names = self._poll_changes()
+
+            ready = []
+            for name in names:
+                if not self._is_final(name):
+                    continue
+                if self._check(name):
+                    ready.append(os.path.join(self.download_folder, name))
+                    self._pending.discard(name)
+            if ready:
+                return ready
+
+            if self._fd is None:
+                time.sleep(min(interval, max(deadline - time.monotonic(), 0)))
+                interval = min(interval * 2, 1.0)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
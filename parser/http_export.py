@@ -0,0 +1,170 @@
+import os
+import re
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = "https://zakupki.gov.ru"
+SEARCH_PATH = "/epz/contract/search/results.html"
+# Адрес, на который уходит запрос кнопки div.csvDownload; может меняться на стороне сайта
+EXPORT_PATH = "/epz/contract/search/download/downloadCsv.html"
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Коды субъектов РФ для фильтра по месту заказчика
+REGION_CODES = {
+    "Москва": "77",
+    "Санкт-Петербург": "78",
+    "Новосибирск": "54",
+    "Красноярск": "24",
+    "Ростов-на-Дону": "61",
+    "Воронеж": "36",
+    "Нижегородская область": "52",
+}
+
+# Признаки страницы, на которой поиск штатно ничего не нашел
+NO_RESULTS_MARKERS = ("поиск не дал результатов", "ничего не найдено", "нет данных")
+TOTAL_RE = re.compile(r'search-results__total[^>]*>([^<]*)<', re.IGNORECASE)
+
+def is_empty_results(page_html):
+    """Страница результатов штатного вида, но без единого контракта"""
+    match = TOTAL_RE.search(page_html)
+    if match and re.sub(r"\D", "", match.group(1)) == "0":
+        return True
+    text = page_html.lower()
+    return any(marker in text for marker in NO_RESULTS_MARKERS)
+
+class ExportUnavailable(Exception):
+    """Прямая выгрузка не удалась: капча, смена адреса или неожиданный ответ"""
+
+def build_search_params(search_text, region=None, only_actual=False, with_signature=False, include_archive=False,
+                        update_date_from=None, update_date_to=None):
+    """Параметры поиска в том виде, в котором их отправляет форма на странице
+
+    Границы дат обновления принимаются как datetime.date.
+    """
+    params = {
+        "searchString": search_text,
+        "morphology": "on",
+        "sortBy": "UPDATE_DATE",
+        "sortDirection": "false",
+        "fz44": "on",
+        "fz94": "on",
+        "recordsPerPage": "_10",
+    }
+    if region:
+        params["customerPlace"] = REGION_CODES.get(region, region)
+    stages = []
+    if only_actual:
+        stages.append("E")
+    if include_archive:
+        stages.extend(["ET", "IN", "EC"])
+    if stages:
+        params["contractStageList"] = ",".join(stages)
+    if with_signature:
+        params["electronicContractExecution"] = "on"
+    if update_date_from:
+        params["updateDateFrom"] = update_date_from.strftime("%d.%m.%Y")
+    if update_date_to:
+        params["updateDateTo"] = update_date_to.strftime("%d.%m.%Y")
+    return params
+
+def safe_name(text):
+    """Имя файла или папки, составленное из текста запроса"""
+    return re.sub(r"[^\w\-]+", "_", text, flags=re.UNICODE).strip("_") or "query"
+
+class HttpExporter:
+    """Поиск и выгрузка CSV напрямую по HTTP, без запуска браузера
+
+    Использует одну сессию с пулом keep-alive соединений; base_url можно
+    направить на локальный сервер с записанными ответами.
+    """
+
+    def __init__(self, base_url=BASE_URL, pool_size=4, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept-Language": "ru-RU,ru;q=0.9",
+        })
+
+    def _get(self, path, params, stream=False):
+        try:
+            response = self.session.get(
+                self.base_url + path,
+                params=params,
+                timeout=self.timeout,
+                stream=stream
+            )
+        except requests.RequestException as e:
+            raise ExportUnavailable(f"Сетевая ошибка: {e}")
+        if response.status_code != 200:
+            response.close()
+            raise ExportUnavailable(f"{path} вернул код {response.status_code}")
+        return response
+
+    def fetch_results_page(self, search_text, **filters):
+        """HTML первой страницы результатов поиска"""
+        page = self._get(SEARCH_PATH, build_search_params(search_text, **filters))
+        if "captcha" in page.text.lower():
+            raise ExportUnavailable("Сайт запросил капчу")
+        return page.text
+
+    def export_csv(self, search_text, download_folder, **filters):
+        """Выполняет поиск, выгружает CSV в папку загрузок и возвращает список файлов
+
+        Если поиск штатно ничего не нашел, возвращает пустой список: браузер
+        такой запрос тоже ничего не найдет. ExportUnavailable - только при
+        неожиданном ответе.
+        """
+        params = build_search_params(search_text, **filters)
+
+        # Страница результатов выставляет сессионные cookie, без которых выгрузка не отдается
+        page = self.fetch_results_page(search_text, **filters)
+        if "search-registry-entry-block" not in page:
+            if is_empty_results(page):
+                print(f"По запросу '{search_text}' ничего не найдено")
+                return []
+            raise ExportUnavailable("На странице нет результатов поиска, возможно, изменилась разметка")
+
+        response = self._get(EXPORT_PATH, params, stream=True)
+        content_type = response.headers.get("Content-Type", "")
+        if "html" in content_type:
+            response.close()
+            raise ExportUnavailable(f"Вместо CSV получен {content_type}")
+
+        filename = f"{safe_name(search_text)}_{int(time.time() * 1000)}.csv"
+        final_path = os.path.join(download_folder, filename)
+        temp_path = final_path + ".part"
+
+        # Пишем во временный файл и переименовываем, как это делает браузер
+        size = 0
+        try:
+            with response, open(temp_path, "wb") as file:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    file.write(chunk)
+                    size += len(chunk)
+            if size <= 100:
+                raise ExportUnavailable(f"Выгрузка слишком мала: {size} байт")
+            os.replace(temp_path, final_path)
+        except (requests.RequestException, OSError) as e:
+            # Обрыв соединения посреди выгрузки или ошибка записи - переходим к браузеру
+            raise ExportUnavailable(f"Выгрузка прервана: {e}")
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        return [final_path]
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
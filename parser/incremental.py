@@ -0,0 +1,143 @@
+import os
+import json
+import hashlib
+import sqlite3
+from datetime import date
+from ingest import iter_contract_chunks, write_chunks, compact_query
+from result_cache import make_key
+from pars import perform_optimized_search
+
+def setup_state_path():
+    """Файл состояния инкрементального обхода рядом с папкой загрузок"""
+    return os.path.join(os.getcwd(), "zakupki_incremental.sqlite")
+
+def record_hash(record):
+    """Отпечаток содержимого записи для обнаружения изменений"""
+    payload = json.dumps(record, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def record_date(record):
+    """Дата, по которой двигается водяной знак: обновление, затем публикация, затем заключение"""
+    return record.get("update_date") or record.get("publish_date") or record.get("sign_date")
+
+class DeltaState:
+    """Водяные знаки запросов и отпечатки уже виденных контрактов
+
+    Водяные знаки и отпечатки хранятся по ключу запроса вместе с фильтрами
+    (make_key), поэтому обход по одному региону не сдвигает границу для другого.
+    Следующий поиск по запросу сужается до записей, обновленных начиная с
+    даты водяного знака; пересечение по границе и обновленные записи убираются
+    сжатием набора по реестровому номеру (побеждает последняя версия записи).
+    """
+
+    def __init__(self, path=None):
+        self.conn = sqlite3.connect(path or setup_state_path())
+        self.conn.executescript("""
+            -- query хранит ключ make_key(запрос, фильтры), а не сам текст запроса
+            CREATE TABLE IF NOT EXISTS watermarks (
+                query TEXT PRIMARY KEY,
+                last_date TEXT
+            );
+            CREATE TABLE IF NOT EXISTS seen (
+                query TEXT,
+                registry_number TEXT,
+                row_hash TEXT,
+                PRIMARY KEY (query, registry_number)
+            );
+        """)
+
+    def watermark(self, query, filters=None):
+        key = make_key(query, **(filters or {}))
+        row = self.conn.execute("SELECT last_date FROM watermarks WHERE query = ?", (key,)).fetchone()
+        return date.fromisoformat(row[0]) if row and row[0] else None
+
+    def narrow_filters(self, query, filters=None):
+        """Добавляет к фильтрам нижнюю границу даты обновления по водяному знаку"""
+        filters = dict(filters or {})
+        mark = self.watermark(query, filters)
+        if mark is not None:
+            filters["update_date_from"] = mark
+        return filters
+
+    def _classify(self, chunks, key, counts, latest):
+        """Отдает только новые и измененные записи, обновляя отпечатки"""
+        for chunk in chunks:
+            changed = []
+            for record in chunk:
+                number = record.get("registry_number")
+                if not number:
+                    continue
+                current = record_date(record)
+                if current and (latest[0] is None or current > latest[0]):
+                    latest[0] = current
+
+                digest = record_hash(record)
+                row = self.conn.execute(
+                    "SELECT row_hash FROM seen WHERE query = ? AND registry_number = ?", (key, number)
+                ).fetchone()
+                if row is None:
+                    counts["new"] += 1
+                elif row[0] != digest:
+                    counts["updated"] += 1
+                else:
+                    counts["unchanged"] += 1
+                    continue
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO seen (query, registry_number, row_hash) VALUES (?, ?, ?)",
+                    (key, number, digest)
+                )
+                changed.append(record)
+            yield changed
+
+    def merge_files(self, paths, query, filters=None, dataset_folder=None):
+        """Дописывает в набор данных только новые и измененные записи выгрузок
+
+        Записи пишутся в раздел набора того же запроса с фильтрами, что и у ingest_files,
+        а прежние версии записей удаляются сжатием раздела.
+        Возвращает число новых, обновленных и неизменившихся строк.
+        """
+        key = make_key(query, **(filters or {}))
+        counts = {"new": 0, "updated": 0, "unchanged": 0}
+        latest = [self.watermark(query, filters)]
+
+        def chunks():
+            for path in paths:
+                yield from iter_contract_chunks(path)
+
+        with self.conn:
+            target, _ = write_chunks(
+                self._classify(chunks(), key, counts, latest), query, dataset_folder, filters=filters
+            )
+            if latest[0] is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO watermarks (query, last_date) VALUES (?, ?)",
+                    (key, latest[0].isoformat())
+                )
+        # Обновленные записи оставляют в наборе прежнюю версию, а "новые" для водяного знака
+        # могли уже попасть в тот же раздел через ingest_files
+        counts["compacted"] = compact_query(query, dataset_folder, filters=filters) if target else 0
+
+        counts["target"] = target
+        counts["watermark"] = latest[0].isoformat() if latest[0] else None
+        return counts
+
+    def close(self):
+        self.conn.close()
+
+def perform_incremental_search(search_text, state, pool=None, http_exporter=None, filters=None, dataset_folder=None):
+    """Выгружает только записи, изменившиеся с прошлого запуска, и сливает их в набор данных"""
+    narrowed = state.narrow_filters(search_text, filters)
+    files = perform_optimized_search(
+        search_text,
+        pool=pool,
+        http_exporter=http_exporter,
+        filters=narrowed
+    )
+    if not files:
+        return None
+
+    counts = state.merge_files(files, search_text, filters, dataset_folder)
+    counts["files"] = files
+    print(f"Запрос '{search_text}': новых {counts['new']}, обновленных {counts['updated']}, "
+          f"без изменений {counts['unchanged']}")
+    return counts
@@ -0,0 +1,294 @@
+import io
+import os
+import csv
+import time
+from datetime import datetime
+from http_export import safe_name
+from download_store import open_stored
+
+SAMPLE_SIZE = 64 * 1024
+
+# Поля, к которым приводятся выгрузки, и фрагменты заголовков CSV, по которым они находятся
+COLUMN_ALIASES = {
+    "registry_number": ["реестровый номер", "номер контракта"],
+    "price": ["цена контракта", "цена"],
+    "sign_date": ["дата заключения"],
+    "publish_date": ["дата размещения", "дата публикации"],
+    "update_date": ["дата обновления", "дата последнего изменения"],
+    "execution_end": ["дата окончания исполнения", "срок исполнения"],
+    "customer": ["заказчик"],
+    "supplier": ["поставщик", "исполнитель"],
+    "subject": ["объект закупки", "предмет контракта", "наименование объекта"],
+    "region": ["регион", "субъект"],
+    "status": ["статус", "стадия"],
+    "electronic": ["электронное исполнение", "электронн"],
+    "participants": ["количество участников", "количество заявок", "число участников"],
+}
+
+DATE_FIELDS = ("sign_date", "publish_date", "update_date", "execution_end")
+TEXT_FIELDS = ("registry_number", "customer", "supplier", "subject", "region", "status", "electronic")
+
+def detect_format(path):
+    """Определяет кодировку и разделитель CSV по началу файла
+
+    Кодировка определяется по первому куску файла, где есть не-ASCII байты:
+    если начало файла (заголовок, номера, цены) чисто ASCII, по нему нельзя
+    отличить utf-8 от cp1251.
+    """
+    with open_stored(path) as file:
+        sample = file.read(SAMPLE_SIZE)
+        probe = sample
+        while probe.isascii():
+            # Предыдущий кусок целиком ASCII, поэтому символ не может начинаться в нем
+            chunk = file.read(SAMPLE_SIZE)
+            if not chunk:
+                break
+            probe = chunk
+
+    encoding = "cp1251"
+    for candidate in ("utf-8-sig", "utf-8"):
+        try:
+            # Обрезанный на границе образца многобайтный символ не считается ошибкой
+            probe.decode(candidate).encode()
+            encoding = candidate
+            break
+        except UnicodeDecodeError as e:
+            if e.start >= len(probe) - 3:
+                encoding = candidate
+                break
+
+    text = sample.decode(encoding, errors="ignore")
+    try:
+        delimiter = csv.Sniffer().sniff(text.split("\n", 1)[0], delimiters=";,\t|").delimiter
+    except csv.Error:
+        delimiter = ";"
+    return encoding, delimiter
+
+def map_columns(header):
+    """Сопоставляет номера колонок заголовка с нормализованными полями"""
+    mapping = {}
+    lowered = [name.strip().lower() for name in header]
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            index = next((i for i, name in enumerate(lowered) if alias in name and i not in mapping.values()), None)
+            if index is not None:
+                mapping[field] = index
+                break
+    return mapping
+
+def parse_price(value):
+    """'1 234 567,89' -> 1234567.89"""
+    value = value.replace("\xa0", "").replace(" ", "").replace(",", ".")
+    value = "".join(ch for ch in value if ch.isdigit() or ch in ".-")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+def parse_int(value):
+    """'12' -> 12, пустое или нечисловое значение -> None"""
+    digits = "".join(ch for ch in value if ch.isdigit())
+    return int(digits) if digits else None
+
+def parse_date(value):
+    """'31.12.2024' или '2024-12-31' -> date"""
+    value = value.strip()[:10]
+    for pattern in ("%d.%m.%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, pattern).date()
+        except ValueError:
+            continue
+    return None
+
+def normalize_row(row, mapping):
+    """Приводит строку CSV к словарю с типизированными полями"""
+    def raw(field):
+        index = mapping.get(field)
+        return row[index].strip() if index is not None and index < len(row) else ""
+
+    record = {field: raw(field) or None for field in TEXT_FIELDS}
+    record["price"] = parse_price(raw("price"))
+    record["participants"] = parse_int(raw("participants"))
+    for field in DATE_FIELDS:
+        record[field] = parse_date(raw(field))
+    return record
+
+def iter_contract_chunks(path, chunk_size=20000):
+    """Построчно читает выгрузку и отдает нормализованные записи пачками по chunk_size
+
+    Сжатые выгрузки из хранилища (.zst, .gz) распаковываются на лету.
+    """
+    encoding, delimiter = detect_format(path)
+    with io.TextIOWrapper(open_stored(path), encoding=encoding, errors="replace", newline="") as file:
+        reader = csv.reader(file, delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
+            return
+        mapping = map_columns(header)
+        if "registry_number" not in mapping:
+            print(f"В файле {os.path.basename(path)} не найден номер контракта")
+
+        chunk = []
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            chunk.append(normalize_row(row, mapping))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def iter_contract_rows(path, chunk_size=20000):
+    """Нормализованные записи выгрузки по одной"""
+    for chunk in iter_contract_chunks(path, chunk_size):
+        yield from chunk
+
+def _arrow_schema():
+    import pyarrow as pa
+    fields = [pa.field(name, pa.string()) for name in TEXT_FIELDS]
+    fields.append(pa.field("price", pa.float64()))
+    fields.append(pa.field("participants", pa.int32()))
+    fields.extend(pa.field(name, pa.date32()) for name in DATE_FIELDS)
+    fields.append(pa.field("ingested_at", pa.timestamp("s")))
+    return pa.schema(fields)
+
+def setup_dataset_folder():
+    """Папка колоночного набора данных рядом с папкой загрузок"""
+    dataset_folder = os.path.join(os.getcwd(), "zakupki_dataset")
+    os.makedirs(dataset_folder, exist_ok=True)
+    return dataset_folder
+
+def query_folder(query, filters=None, dataset_folder=None):
+    """Папка запроса в наборе Parquet: по тексту запроса и фильтрам, как ключи кэша и водяных знаков"""
+    # result_cache сам импортирует ingest, поэтому ключ берется только при вызове
+    from result_cache import make_key
+    key = make_key(query, **(filters or {}))
+    return os.path.join(dataset_folder or setup_dataset_folder(), f"query={safe_name(query)}_{key[:10]}")
+
+def write_chunks(chunks, query, dataset_folder=None, compression="zstd", filters=None):
+    """Дописывает пачки нормализованных записей в раздел набора Parquet для запроса с фильтрами и даты
+
+    Каждая пачка записывается отдельной группой строк, поэтому расход памяти
+    ограничен размером пачки. Возвращает (путь к файлу или None, число строк).
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("Для загрузки в колоночное хранилище нужен пакет pyarrow")
+        return None, 0
+
+    ingested_at = datetime.now().replace(microsecond=0)
+    partition = os.path.join(
+        query_folder(query, filters, dataset_folder),
+        f"date={ingested_at.date().isoformat()}"
+    )
+    os.makedirs(partition, exist_ok=True)
+    target = os.path.join(partition, f"part-{int(time.time() * 1000)}.parquet")
+
+    schema = _arrow_schema()
+    rows = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            for record in chunk:
+                record["ingested_at"] = ingested_at
+            table = pa.Table.from_pylist(chunk, schema=schema)
+            if writer is None:
+                writer = pq.ParquetWriter(target + ".tmp", schema, compression=compression)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        return None, 0
+    os.replace(target + ".tmp", target)
+    return target, rows
+
+def compact_query(query, dataset_folder=None, compression="zstd", filters=None):
+    """Оставляет в наборе Parquet запроса с фильтрами только последнюю версию каждого контракта
+
+    Разделы обходятся от новых к старым, внутри раздела строки тоже читаются
+    с конца, поэтому побеждает последняя записанная версия. Каждый раздел
+    переписывается в один файл; в памяти одновременно лежат строки одного раздела
+    и множество уже встреченных реестровых номеров. Возвращает число удаленных строк.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("Для сжатия колоночного хранилища нужен пакет pyarrow")
+        return 0
+
+    folder = query_folder(query, filters, dataset_folder)
+    if not os.path.isdir(folder):
+        return 0
+
+    schema = _arrow_schema()
+    seen = set()
+    removed = 0
+    for partition in sorted(os.listdir(folder), reverse=True):
+        partition = os.path.join(folder, partition)
+        parts = sorted((name for name in os.listdir(partition) if name.endswith(".parquet")), reverse=True)
+        kept, total = [], 0
+        for name in parts:
+            table = pq.read_table(os.path.join(partition, name), schema=schema)
+            total += table.num_rows
+            numbers = table.column("registry_number").to_pylist()
+            rows = []
+            for index in range(len(numbers) - 1, -1, -1):
+                if numbers[index] is not None and numbers[index] in seen:
+                    continue
+                seen.add(numbers[index])
+                rows.append(index)
+            if rows:
+                kept.append(table.take(pa.array(rows[::-1])))
+        if total == sum(table.num_rows for table in kept) and len(parts) <= 1:
+            continue
+
+        removed += total - sum(table.num_rows for table in kept)
+        target = os.path.join(partition, f"part-{int(time.time() * 1000)}.parquet")
+        if kept:
+            # Новые части шли первыми, возвращаем исходный порядок записи
+            pq.write_table(pa.concat_tables(kept[::-1]), target + ".tmp", compression=compression)
+            os.replace(target + ".tmp", target)
+        for name in parts:
+            if os.path.join(partition, name) != target:
+                os.remove(os.path.join(partition, name))
+    return removed
+
+def ingest_csv(path, query, dataset_folder=None, chunk_size=20000, compression="zstd", filters=None):
+    """Загружает выгрузку в набор Parquet, разбитый по запросу с фильтрами и дате загрузки
+
+    Файл читается пачками, поэтому расход памяти не зависит от размера выгрузки.
+    Возвращает статистику: число строк, время и скорость в строках в секунду.
+    """
+    started = time.monotonic()
+    target, rows = write_chunks(iter_contract_chunks(path, chunk_size), query, dataset_folder, compression, filters)
+    elapsed = time.monotonic() - started
+
+    stats = {
+        "file": path,
+        "target": target,
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed) if elapsed > 0 else rows,
+    }
+    print(f"Загружено {rows} строк из {os.path.basename(path)} ({stats['rows_per_second']} строк/с)")
+    return stats
+
+def ingest_files(paths, query, dataset_folder=None, filters=None):
+    """Загружает несколько выгрузок одного запроса
+
+    Повторная выгрузка того же запроса снова содержит уже загруженные контракты,
+    поэтому после записи набор запроса сжимается по реестровому номеру.
+    """
+    stats = [ingest_csv(path, query, dataset_folder, filters=filters) for path in paths]
+    if any(entry["rows"] for entry in stats):
+        compact_query(query, dataset_folder, filters=filters)
+    return stats
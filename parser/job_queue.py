@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import random
+import sqlite3
+from pars import perform_optimized_search
+
+# Состояния задачи: ждет запуска, выполняется, выполнена, исчерпала попытки
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+def setup_queue_path():
+    """Файл очереди задач рядом с папкой загрузок"""
+    return os.path.join(os.getcwd(), "zakupki_jobs.sqlite")
+
+def backoff_delay(attempt, base_delay=30, max_delay=1800):
+    """Экспоненциальная пауза перед повтором со случайным разбросом (full jitter)
+
+    Разброс не дает повторам нескольких упавших запросов прийти на сайт одновременно.
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+class CircuitBreaker:
+    """Приостанавливает пакет, когда сайт отвечает ошибками подряд
+
+    После threshold неудач подряд запуск новых запросов запрещается на cooldown секунд,
+    затем пропускается один пробный запрос: успех закрывает размыкатель,
+    неудача снова размыкает его.
+    """
+
+    def __init__(self, threshold=5, cooldown=300):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+
+    def allow(self):
+        return self.opened_at is None or self.remaining() == 0
+
+    def remaining(self):
+        """Сколько секунд осталось до пробного запроса"""
+        if self.opened_at is None:
+            return 0
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+class JobQueue:
+    """Очередь запросов пакета в SQLite с сохранением состояния после каждого шага
+
+    Каждый запрос хранит состояние, число попыток, время следующей попытки
+    и загруженные файлы, поэтому после сбоя пакет продолжается с того же места.
+    """
+
+    def __init__(self, path=None, max_attempts=5, base_delay=30, max_delay=1800):
+        self.conn = sqlite3.connect(path or setup_queue_path())
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS batches (
+                id TEXT PRIMARY KEY,
+                name TEXT,
+                created_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                batch TEXT,
+                query TEXT,
+                filters TEXT,
+                state TEXT,
+                attempts INTEGER DEFAULT 0,
+                next_attempt_at REAL DEFAULT 0,
+                last_error TEXT,
+                files TEXT,
+                updated_at REAL,
+                UNIQUE (batch, query)
+            );
+            CREATE INDEX IF NOT EXISTS jobs_state ON jobs (batch, state, next_attempt_at);
+        """)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def open_batch(self, name, queries, filters=None):
+        """Продолжает незавершенный пакет с этим именем или создает новый
+
+        Задачи, которые были в работе при сбое, возвращаются в очередь.
+        Запросы, которых в продолжаемом пакете еще нет, добавляются в него;
+        запросы пакета, которых нет в новом списке, остаются в очереди.
+        """
+        row = self.conn.execute("""
+            SELECT b.id FROM batches b
+            WHERE b.name = ? AND EXISTS (
+                SELECT 1 FROM jobs j WHERE j.batch = b.id AND j.state IN (?, ?)
+            )
+            ORDER BY b.created_at DESC LIMIT 1
+        """, (name, PENDING, RUNNING)).fetchone()
+
+        with self.conn:
+            if row:
+                batch = row[0]
+                recovered = self.conn.execute(
+                    "UPDATE jobs SET state = ?, updated_at = ? WHERE batch = ? AND state = ?",
+                    (PENDING, time.time(), batch, RUNNING)
+                ).rowcount
+                added = self._add_jobs(batch, queries, filters)
+                print(f"Продолжаем пакет {batch}: {self.counts(batch)}, возвращено в очередь {recovered}, "
+                      f"добавлено новых запросов {added}")
+                known = {query for query, in self.conn.execute("SELECT query FROM jobs WHERE batch = ?", (batch,))}
+                missing = known - set(queries)
+                if missing:
+                    print(f"Запросы пакета {batch}, которых нет в новом списке, остаются в очереди: "
+                          f"{', '.join(sorted(missing))}")
+                return batch
+
+            batch = f"{name}_{int(time.time() * 1000)}"
+            self.conn.execute("INSERT INTO batches VALUES (?, ?, ?)", (batch, name, time.time()))
+            self._add_jobs(batch, queries, filters)
+        return batch
+
+    def _add_jobs(self, batch, queries, filters):
+        """Добавляет задачи пакета; уже известные запросы не трогает. Возвращает число добавленных"""
+        return self.conn.executemany(
+            "INSERT OR IGNORE INTO jobs (batch, query, filters, state, updated_at) VALUES (?, ?, ?, ?, ?)",
+            [(batch, query, json.dumps(filters or {}, ensure_ascii=False, default=str), PENDING, time.time())
+             for query in queries]
+        ).rowcount
+
+    def claim(self, batch):
+        """Берет следующую готовую к запуску задачу и отмечает ее выполняемой"""
+        now = time.time()
+        with self.conn:
+            row = self.conn.execute("""
+                UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ?
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE batch = ? AND state = ? AND next_attempt_at <= ?
+                    ORDER BY next_attempt_at, id LIMIT 1
+                )
+                RETURNING id, query, filters, attempts
+            """, (RUNNING, now, batch, PENDING, now)).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "query": row[1], "filters": json.loads(row[2] or "{}"), "attempts": row[3]}
+
+    def complete(self, job, files):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, files = ?, last_error = NULL, updated_at = ? WHERE id = ?",
+                (DONE, json.dumps(list(files), ensure_ascii=False), time.time(), job["id"])
+            )
+
+    def fail(self, job, error):
+        """Планирует повтор с паузой или окончательно отмечает задачу неудачной"""
+        if job["attempts"] >= self.max_attempts:
+            state, next_attempt_at = FAILED, 0
+        else:
+            state = PENDING
+            next_attempt_at = time.time() + backoff_delay(job["attempts"], self.base_delay, self.max_delay)
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, next_attempt_at = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                (state, next_attempt_at, str(error), time.time(), job["id"])
+            )
+        return state
+
+    def next_wake(self, batch):
+        """Время ближайшей отложенной попытки или None, если ждать нечего"""
+        row = self.conn.execute(
+            "SELECT MIN(next_attempt_at) FROM jobs WHERE batch = ? AND state = ?", (batch, PENDING)
+        ).fetchone()
+        return row[0]
+
+    def counts(self, batch):
+        rows = self.conn.execute("SELECT state, COUNT(*) FROM jobs WHERE batch = ? GROUP BY state", (batch,))
+        return dict(rows.fetchall())
+
+    def results(self, batch):
+        """Запрос -> (состояние, попытки, файлы, последняя ошибка)"""
+        rows = self.conn.execute(
+            "SELECT query, state, attempts, files, last_error FROM jobs WHERE batch = ? ORDER BY id", (batch,)
+        )
+        return {
+            query: (state, attempts, json.loads(files) if files else [], error)
+            for query, state, attempts, files, error in rows
+        }
+
+    def retry_failed(self, batch):
+        """Возвращает в очередь задачи, исчерпавшие попытки"""
+        with self.conn:
+            return self.conn.execute(
+                "UPDATE jobs SET state = ?, attempts = 0, next_attempt_at = 0, updated_at = ? WHERE batch = ? AND state = ?",
+                (PENDING, time.time(), batch, FAILED)
+            ).rowcount
+
+    def close(self):
+        self.conn.close()
+
+def run_batch(queue, batch, fetch=None, breaker=None, pause=5):
+    """Выполняет задачи пакета до опустошения очереди
+
+    fetch(query, filters) возвращает список файлов или False; по умолчанию
+    это perform_optimized_search. Задача отмечается выполненной только после
+    возврата fetch, поэтому обработку файлов (ingest, индекс) стоит делать внутри fetch.
+    """
+    if fetch is None:
+        fetch = lambda query, filters: perform_optimized_search(query, filters=filters)
+    breaker = breaker or CircuitBreaker()
+
+    while True:
+        if not breaker.allow():
+            wait = breaker.remaining()
+            print(f"Сайт отвечает ошибками подряд, пакет приостановлен на {wait:.0f} с")
+            time.sleep(wait)
+
+        job = queue.claim(batch)
+        if job is None:
+            wake = queue.next_wake(batch)
+            if wake is None:
+                break
+            time.sleep(max(0.0, wake - time.time()))
+            continue
+
+        print(f"Запрос '{job['query']}', попытка {job['attempts']}")
+        try:
+            files = fetch(job["query"], job["filters"])
+            # Пустой список - запрос выполнен, но ничего не нашел; повторять его незачем
+            error = None if files or files == [] else "выгрузка не получена"
+        except Exception as e:
+            files, error = False, e
+
+        if error is None:
+            queue.complete(job, files)
+            breaker.record_success()
+        else:
+            state = queue.fail(job, error)
+            breaker.record_failure()
+            if state == FAILED:
+                print(f"Запрос '{job['query']}' не выполнен после {job['attempts']} попыток: {error}")
+
+        if pause:
+            time.sleep(pause)
+
+    counts = queue.counts(batch)
+    print(f"Пакет {batch} завершен: {counts}")
+    return counts
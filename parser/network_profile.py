@@ -0,0 +1,167 @@
+import json
+import threading
+
+# Профили сети браузера: full - страница грузится целиком,
+# lean - без картинок, шрифтов, медиа и сторонних счетчиков
+NETWORK_PROFILES = ("full", "lean")
+
+# Настройки содержимого Chrome для экономного профиля (2 - запретить)
+LEAN_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.media_stream": 2,
+    "profile.managed_default_content_settings.notifications": 2,
+    "profile.managed_default_content_settings.geolocation": 2,
+    "profile.managed_default_content_settings.plugins": 2,
+}
+
+# Запросы, блокируемые через DevTools. Скрипты и стили сайта не трогаем:
+# от них зависят кнопки и окно выгрузки
+BLOCKED_URL_PATTERNS = [
+    # Картинки, шрифты и медиа
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3",
+    # Счетчики и сторонние виджеты
+    "*mc.yandex.ru*",
+    "*an.yandex.ru*",
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*top-fwz1.mail.ru*",
+    "*counter.yadro.ru*",
+    "*sputnik.ru*",
+    "*vk.com/js*",
+]
+
+# Без загруженной картинки иконка выгрузки может получить нулевой размер
+# и перестать считаться видимой, поэтому задаем ей размер стилем
+KEEP_VISIBLE_SCRIPT = """
+document.addEventListener('DOMContentLoaded', function () {
+    var style = document.createElement('style');
+    style.textContent = 'img.downLoad-icon { display: inline-block !important; min-width: 16px; min-height: 16px; }';
+    document.head.appendChild(style);
+});
+"""
+
+def configure_options(chrome_options, prefs, network_profile="full", measure=False):
+    """Дополняет опции Chrome настройками профиля сети
+
+    measure=True включает журнал сетевых событий DevTools для подсчета запросов
+    и байт; в обычной работе он не нужен и только нагружает браузер.
+    """
+    if network_profile not in NETWORK_PROFILES:
+        raise ValueError(f"Неизвестный профиль сети: {network_profile}")
+    if network_profile == "lean":
+        prefs.update(LEAN_PREFS)
+    if measure:
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return prefs
+
+def apply_network_profile(driver, network_profile="full"):
+    """Включает блокировку запросов в запущенном браузере (для профиля lean)"""
+    if network_profile != "lean":
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": KEEP_VISIBLE_SCRIPT})
+    except Exception as e:
+        print(f"Не удалось включить блокировку запросов: {e}")
+
+def collect_usage(driver):
+    """Считает запросы, байты и заблокированные запросы с прошлого вызова
+
+    Журнал performance при чтении очищается, поэтому каждый вызов
+    возвращает трафик только текущего запроса.
+    """
+    usage = {"requests": 0, "bytes": 0, "blocked": 0, "bytes_by_type": {}, "blocked_by_type": {}}
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return usage
+
+    types = {}
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        method = message.get("method")
+        params = message.get("params", {})
+        if method == "Network.requestWillBeSent":
+            usage["requests"] += 1
+            types[params.get("requestId")] = params.get("type", "Other")
+        elif method == "Network.loadingFinished":
+            size = int(params.get("encodedDataLength", 0))
+            resource_type = types.get(params.get("requestId"), "Other")
+            usage["bytes"] += size
+            usage["bytes_by_type"][resource_type] = usage["bytes_by_type"].get(resource_type, 0) + size
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            resource_type = params.get("type") or types.get(params.get("requestId"), "Other")
+            usage["blocked"] += 1
+            usage["blocked_by_type"][resource_type] = usage["blocked_by_type"].get(resource_type, 0) + 1
+    return usage
+
+class NetworkStats:
+    """Трафик сессий браузера по профилям сети
+
+    Экономия профиля lean оценивается по среднему размеру ресурса каждого типа,
+    измеренному в сессиях full того же прогона.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.profiles = {}
+        self._type_sizes = {}
+
+    def record(self, network_profile, usage):
+        with self._lock:
+            total = self.profiles.setdefault(network_profile, {
+                "sessions": 0, "requests": 0, "bytes": 0, "blocked": 0, "blocked_by_type": {}
+            })
+            total["sessions"] += 1
+            for key in ("requests", "bytes", "blocked"):
+                total[key] += usage[key]
+            for resource_type, count in usage["blocked_by_type"].items():
+                total["blocked_by_type"][resource_type] = total["blocked_by_type"].get(resource_type, 0) + count
+            if network_profile == "full":
+                for resource_type, size in usage["bytes_by_type"].items():
+                    sizes = self._type_sizes.setdefault(resource_type, [0, 0])
+                    sizes[0] += size
+                    sizes[1] += 1
+
+    def report(self):
+        """Средние запросы и байты на сессию и оценка сэкономленного трафика"""
+        result = {}
+        with self._lock:
+            for network_profile, total in self.profiles.items():
+                sessions = total["sessions"]
+                entry = {
+                    **total,
+                    "requests_per_session": total["requests"] / sessions,
+                    "bytes_per_session": total["bytes"] / sessions,
+                }
+                if network_profile == "lean" and self._type_sizes:
+                    saved = sum(
+                        count * self._type_sizes[t][0] / self._type_sizes[t][1]
+                        for t, count in total["blocked_by_type"].items()
+                        if t in self._type_sizes
+                    )
+                    entry["bytes_saved_per_session"] = saved / sessions
+                    entry["requests_saved_per_session"] = total["blocked"] / sessions
+                result[network_profile] = entry
+        return result
+
+    def drain(self):
+        """Возвращает отчет и обнуляет счетчики сессий
+
+        Средние размеры ресурсов из сессий full сохраняются: по ним оценивается
+        экономия lean в следующих прогонах.
+        """
+        report = self.report()
+        with self._lock:
+            self.profiles = {}
+        return report
+
+# Общая статистика трафика процесса
+network_stats = NetworkStats()
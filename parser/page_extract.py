@@ -0,0 +1,106 @@
+from urllib.parse import urlencode
+from http_export import build_search_params
+from ingest import map_columns, normalize_row
+from pars import SEARCH_URL
+from tracing import tracer
+
+# Подписи на карточке результата, которые не совпадают с заголовками CSV
+PAGE_LABELS = {
+    "заключен": "дата заключения",
+    "размещен": "дата размещения",
+    "обновлен": "дата обновления",
+    "объекты закупки": "объект закупки",
+    "объект закупки": "объект закупки",
+}
+
+# Один вызов на страницу: ждет загрузки документа прямо в браузере
+# и возвращает пары (подпись, значение) всех карточек и признак следующей страницы
+EXTRACT_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var timeout = arguments[0];
+var started = Date.now();
+var text = function (el) { return el ? el.textContent.replace(/\\s+/g, ' ').trim() : ''; };
+
+function extract() {
+    var blocks = document.querySelectorAll('div.search-registry-entry-block');
+    var entries = [];
+    for (var i = 0; i < blocks.length; i++) {
+        var block = blocks[i];
+        var pairs = [
+            ['реестровый номер', text(block.querySelector('.registry-entry__header-mid__number')).replace(/^№\\s*/, '')],
+            ['статус', text(block.querySelector('.registry-entry__header-mid__title'))],
+            ['цена контракта', text(block.querySelector('.price-block__value'))]
+        ];
+        var titles = block.querySelectorAll('.registry-entry__body-title, .data-block__title');
+        for (var j = 0; j < titles.length; j++) {
+            pairs.push([text(titles[j]), text(titles[j].nextElementSibling)]);
+        }
+        entries.push(pairs);
+    }
+    var next = document.querySelector('a.paginator-button-next, .paginator-button-next');
+    return {
+        entries: entries,
+        has_next: !!next && !next.classList.contains('disabled'),
+        total: text(document.querySelector('.search-results__total'))
+    };
+}
+
+(function poll() {
+    if (document.readyState === 'complete') {
+        done(extract());
+    } else if (Date.now() - started > timeout * 1000) {
+        done(null);
+    } else {
+        setTimeout(poll, 100);
+    }
+})();
+"""
+
+def entry_to_record(pairs):
+    """Пары (подпись, значение) карточки -> запись с теми же полями, что и у строк CSV"""
+    header = [PAGE_LABELS.get(label.strip().lower().rstrip(":"), label) for label, _ in pairs]
+    return normalize_row([value for _, value in pairs], map_columns(header))
+
+def search_page_url(search_text, filters=None, page=1, records_per_page=100, base_url=SEARCH_URL):
+    params = build_search_params(search_text, **(filters or {}))
+    params["pageNumber"] = page
+    params["recordsPerPage"] = f"_{records_per_page}"
+    return f"{base_url}?{urlencode(params)}"
+
+def iter_search_entries(driver, search_text, filters=None, records_per_page=100, max_pages=None,
+                        base_url=SEARCH_URL, timeout=30):
+    """Постранично отдает записи результатов поиска без выгрузки CSV
+
+    На каждую страницу уходят два обращения к браузеру: переход по адресу
+    и один скрипт, который собирает все карточки сразу. Записи отдаются
+    по одной, поэтому большой результат не собирается в памяти целиком.
+    """
+    driver.set_script_timeout(timeout + 5)
+    page = 1
+    while max_pages is None or page <= max_pages:
+        with tracer.span("извлечение страницы", page=page) as span:
+            driver.get(search_page_url(search_text, filters, page, records_per_page, base_url))
+            result = driver.execute_async_script(EXTRACT_SCRIPT, timeout)
+            if result is None:
+                span.fail("timeout")
+                print(f"Страница {page} не загрузилась за {timeout} с")
+                return
+            span.attrs["entries"] = len(result["entries"])
+
+        for pairs in result["entries"]:
+            yield entry_to_record(pairs)
+
+        if not result["entries"] or not result["has_next"]:
+            return
+        page += 1
+
+def extract_search(search_text, pool, filters=None, records_per_page=100, max_pages=None):
+    """Записи результатов поиска в браузере из пула; браузер возвращается в пул по окончании обхода"""
+    with pool.lease() as driver:
+        try:
+            yield from iter_search_entries(
+                driver, search_text, filters, records_per_page, max_pages, base_url=pool.url
+            )
+        except GeneratorExit:
+            # Обход остановлен потребителем - браузер исправен, не отмечаем его сломанным
+            return
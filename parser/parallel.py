@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import multiprocessing
+from multiprocessing.util import Finalize
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pars import setup_download_folder, create_browser_pool, perform_optimized_search
+from tracing import tracer
+
+class RateLimiter:
+    """Общий для всех процессов лимит: не больше rate запусков запросов в секунду"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = multiprocessing.Lock()
+        self._next_slot = multiprocessing.Value("d", 0.0, lock=False)
+
+    def acquire(self):
+        """Блокирует, пока не наступит очередной разрешенный момент запуска"""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.time()
+            slot = max(now, self._next_slot.value)
+            self._next_slot.value = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+# Состояние процесса-обработчика, заполняется в _init_worker
+_worker = {}
+
+def _init_worker(rate_limiter, pool_max_uses):
+    """Готовит отдельную папку загрузок и прогретый браузер для процесса"""
+    worker_id = f"worker_{os.getpid()}"
+    download_folder = setup_download_folder(worker_id)
+    pool = create_browser_pool(size=1, max_uses=pool_max_uses, download_folder=download_folder)
+    pool.warm_up()
+    # atexit в дочерних процессах multiprocessing не вызывается
+    Finalize(pool, pool.close, exitpriority=10)
+
+    _worker.update({
+        "id": worker_id,
+        "download_folder": download_folder,
+        "pool": pool,
+        "rate_limiter": rate_limiter,
+    })
+
+def _run_query(query):
+    """Выполняет один запрос в процессе-обработчике и возвращает запись манифеста"""
+    _worker["rate_limiter"].acquire()
+
+    started = time.time()
+    files = perform_optimized_search(
+        query,
+        pool=_worker["pool"],
+        download_folder=_worker["download_folder"]
+    )
+    finished = time.time()
+
+    return {
+        "query": query,
+        "status": "done" if files else "failed",
+        "files": list(files) if files else [],
+        "worker": _worker["id"],
+        "started_at": started,
+        "duration": round(finished - started, 3),
+        # Шаги передаются в основной процесс для общей сводки по пакету
+        "spans": tracer.drain(),
+    }
+
+def load_manifest(manifest_path):
+    """Записи запросов из манифеста прошлого запуска; пустой словарь, если его нет"""
+    try:
+        with open(manifest_path, encoding="utf-8") as file:
+            return json.load(file).get("queries", {})
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+def _write_manifest(manifest_path, result):
+    # Через временный файл: прерванная запись не портит манифест для продолжения
+    part_path = manifest_path + ".part"
+    with open(part_path, "w", encoding="utf-8") as file:
+        json.dump(result, file, ensure_ascii=False, indent=2)
+    os.replace(part_path, manifest_path)
+
+def run_parallel(queries, max_workers=2, requests_per_second=0.5, pool_max_uses=20, manifest_path=None):
+    """Выполняет запросы параллельно в нескольких процессах с headless-браузерами
+
+    У каждого процесса своя папка загрузок и свой default_directory в Chrome,
+    поэтому определение новых файлов в wait_for_download_complete не пересекается.
+    Результаты собираются в манифест: запрос -> файлы, статус и время выполнения,
+    а сводка шагов всех процессов по перцентилям - в поле steps. Манифест
+    переписывается после каждого запроса, а повторный запуск с тем же манифестом
+    пропускает уже выполненные запросы.
+    """
+    if manifest_path is None:
+        manifest_path = os.path.join(setup_download_folder(), "manifest.json")
+
+    previous = load_manifest(manifest_path)
+    manifest = {
+        query: previous[query]
+        for query in queries
+        if previous.get(query, {}).get("status") == "done"
+    }
+    pending = [query for query in queries if query not in manifest]
+    if manifest:
+        print(f"Продолжение пакета: выполнено {len(manifest)}, осталось {len(pending)}")
+
+    rate_limiter = RateLimiter(requests_per_second)
+    batch_started = time.time()
+
+    def result():
+        return {
+            "started_at": batch_started,
+            "duration": round(time.time() - batch_started, 3),
+            "queries": manifest,
+            "steps": tracer.summary(),
+        }
+
+    if pending:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(rate_limiter, pool_max_uses)
+        ) as executor:
+            futures = {executor.submit(_run_query, query): query for query in pending}
+
+            for future in as_completed(futures):
+                query = futures[future]
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    print(f"Обработчик запроса '{query}' завершился с ошибкой: {e}")
+                    entry = {"query": query, "status": "failed", "files": [], "error": str(e)}
+                tracer.extend(entry.pop("spans", []))
+                manifest[query] = entry
+                _write_manifest(manifest_path, result())
+                print(f"[{len(manifest)}/{len(queries)}] {query}: {entry['status']}")
+
+    batch = result()
+    _write_manifest(manifest_path, batch)
+    return batch
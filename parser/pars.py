@@ -5,15 +5,42 @@ import time
 import os
 import glob
 import shutil
+from urllib.parse import urlencode
+from browser_pool import BrowserPool, mask_automation, set_download_folder
+from browser_profile import ProfileManager
+from download_watcher import DownloadWatcher
+from http_export import HttpExporter, ExportUnavailable, build_search_params
+from ingest import ingest_files
+from contract_index import ContractIndex
+from result_cache import ResultCache
+from download_store import DownloadStore
+from tracing import tracer, files_size
+from network_profile import configure_options, apply_network_profile, collect_usage, network_stats
+from waits import (
+    StepWaiter, element_present, element_clickable, element_stale,
+    input_has_value, new_window, any_of, results_stable, network_idle,
+    wait_stats, SearchCancelled
+)
 
-def setup_download_folder():
-    """Создает папку для загрузок без удаления существующих файлов"""
+SEARCH_URL = "https://zakupki.gov.ru/epz/contract/search/results.html"
+
+def setup_download_folder(subfolder=None):
+    """Создает папку для загрузок без удаления существующих файлов
+    
+    subfolder позволяет выделить отдельную папку, например, для каждого параллельного обработчика.
+    """
     download_folder = os.path.join(os.getcwd(), "zakupki_downloads")
+    if subfolder:
+        download_folder = os.path.join(download_folder, subfolder)
     os.makedirs(download_folder, exist_ok=True)
     return download_folder
 
-def get_chrome_options(download_folder):
-    """Настройка опций Chrome с указанием папки для загрузок"""
+def get_chrome_options(download_folder, network_profile="full", measure_network=False):
+    """Настройка опций Chrome с указанием папки для загрузок
+    
+    network_profile="lean" отключает картинки, шрифты, медиа и сторонние счетчики.
+    measure_network=True включает журнал сетевых событий для замера трафика.
+    """
     chrome_options = ChromeOptions()
     
     # ВКЛЮЧАЕМ HEADLESS РЕЖИМ
@@ -45,64 +72,52 @@ def get_chrome_options(download_folder):
         "profile.default_content_settings.popups": 0,
         "download.extensions_to_open": ""
     }
+    configure_options(chrome_options, prefs, network_profile, measure_network)
     chrome_options.add_experimental_option("prefs", prefs)
     
     return chrome_options
 
-def wait_for_download_complete(download_folder, timeout=10):
-    """Ожидает завершения загрузки файла с улучшенным детектированием"""
+def wait_for_download_complete(download_folder, timeout=10, watcher=None, cancel_event=None):
+    """Ожидает завершения загрузки файла с улучшенным детектированием
     
-    # Запоминаем файлы, которые уже были в папке до начала загрузки
-    existing_files = set()
-    for file in glob.glob(os.path.join(download_folder, "*")):
-        if os.path.isfile(file):
-            existing_files.add(os.path.basename(file))
+    Если наблюдатель не передан, новые файлы отслеживаются с момента вызова.
+    Чтобы не пропустить быструю загрузку, наблюдатель лучше создать до нажатия кнопки выгрузки.
+    """
     
-    downloaded_files = []
-    
-    for i in range(timeout):
-        time.sleep(1)
-        
-        # Получаем текущий список файлов
-        current_files = []
-        for file in glob.glob(os.path.join(download_folder, "*")):
-            if os.path.isfile(file):
-                current_files.append(file)
-        
-        # Проверяем временные файлы загрузки
-        temp_files = [f for f in current_files if any(f.endswith(ext) for ext in ['.crdownload', '.part', '.tmp'])]
-        
-        # Постоянные файлы (не временные), исключая уже существовавшие
-        permanent_files = [f for f in current_files if 
-                         not any(f.endswith(ext) for ext in ['.crdownload', '.part', '.tmp']) and
-                         os.path.basename(f) not in existing_files]
-        
-        # Если есть временные файлы - загрузка в процессе
-        if temp_files:
-            continue
-        
-        # Если есть постоянные файлы и нет временных - загрузка завершена
-        if permanent_files and not temp_files:
-            downloaded_files = permanent_files
-            break
-    
-    # Проверяем размер файлов (чтобы убедиться, что они не пустые)
-    valid_files = []
-    for file in downloaded_files:
-        if os.path.exists(file):
-            file_size = os.path.getsize(file)
-            if file_size > 100:  # Минимальный размер файла (100 байт)
-                valid_files.append(file)
-            else:
-                print(f"Файл {os.path.basename(file)} слишком мал: {file_size} байт")
+    with tracer.span("ожидание загрузки") as span:
+        if watcher is not None:
+            files = watcher.wait(timeout, cancel_event)
         else:
-            print(f"Файл {os.path.basename(file)} не существует")
+            with DownloadWatcher(download_folder) as watcher:
+                files = watcher.wait(timeout, cancel_event)
+        if files:
+            span.bytes = files_size(files)
+        else:
+            span.fail("timeout")
+        return files
+
+def click_element_safe(driver, selector, by=By.CSS_SELECTOR, description="элемент", wait_time=3, waiter=None, timeout=None):
+    """Безопасное нажатие на элемент с обработкой ошибок
     
-    return valid_files
+    С waiter нажатие выполняется, как только элемент станет доступен (не дольше timeout),
+    без него - сразу с фиксированной паузой wait_time после нажатия.
+    """
+    with tracer.span(f"нажатие: {description}") as span:
+        success = _click_element(driver, selector, by, description, wait_time, waiter, timeout)
+        if not success:
+            span.fail()
+        return success
 
-def click_element_safe(driver, selector, by=By.CSS_SELECTOR, description="элемент", wait_time=3):
-    """Безопасное нажатие на элемент с обработкой ошибок"""
+def _click_element(driver, selector, by, description, wait_time, waiter, timeout):
     try:
+        if waiter is not None:
+            element = waiter.until(description, element_clickable(by, selector), timeout)
+            if element is None:
+                print(f"Не удалось дождаться {description}")
+                return False
+            driver.execute_script("arguments[0].click();", element)
+            return True
+        
         element = driver.find_element(by, selector)
         driver.execute_script("arguments[0].click();", element)
         time.sleep(wait_time)
@@ -113,19 +128,29 @@ def click_element_safe(driver, selector, by=By.CSS_SELECTOR, description="эле
 
 def check_download_links(driver):
     """Проверяет наличие ссылок для скачивания"""
+    with tracer.span("проверка ссылок скачивания") as span:
+        found = _find_download_links(driver)
+        if not found:
+            span.fail()
+        return found
+
+# Признаки кнопки выгрузки на странице результатов
+DOWNLOAD_LINK_SELECTORS = [
+    "img.downLoad-icon",
+    ".download-icon",
+    "[data-download]",
+    "a[href*='download']",
+    "button[onclick*='download']"
+]
+
+def _find_download_links(driver):
     try:
-        selectors = [
-            "img.downLoad-icon",
-            ".download-icon",
-            "[data-download]",
-            "a[href*='download']",
-            "button[onclick*='download']"
-        ]
-        
-        for selector in selectors:
-            elements = driver.find_elements(By.CSS_SELECTOR, selector)
-            if elements:
-                return True
+        # Все селекторы проверяются одним обращением к браузеру
+        if driver.execute_script(
+            "return document.querySelector(arguments[0]) !== null",
+            ", ".join(DOWNLOAD_LINK_SELECTORS)
+        ):
+            return True
         
         print("Не найдены элементы для скачивания")
         return False
@@ -133,78 +158,124 @@ def check_download_links(driver):
         print(f"Ошибка при поиске ссылок скачивания: {e}")
         return False
 
-def perform_optimized_search(search_text):
-    """Оптимизированная функция поиска и выгрузки данных в фоновом режиме"""
+def open_search(driver, search_text, waiter):
+    """Вводит запрос в форму и нажимает кнопку поиска"""
     
-    download_folder = setup_download_folder()
-    chrome_options = get_chrome_options(download_folder)
+    # Вводим текст поиска
+    with tracer.span("ввод запроса") as span:
+        if not _type_search_text(driver, search_text, waiter):
+            span.fail()
+            return False
+    
+    # Запоминаем текущий блок результатов, чтобы заметить перерисовку страницы
+    previous_results = driver.find_elements(By.CSS_SELECTOR, "div.search-registry-entry-block")
+    
+    # Кнопка поиска
+    if not click_element_safe(driver, "button.search__btn", description="кнопку поиска", waiter=waiter, timeout=10):
+        print("Не удалось выполнить поиск")
+        return False
     
+    if previous_results:
+        waiter.until("обновление результатов", element_stale(previous_results[0]), timeout=15)
+    return True
+
+def _type_search_text(driver, search_text, waiter):
     try:
-        driver = start_chrome(
-            "https://zakupki.gov.ru/epz/contract/search/results.html",
-            options=chrome_options,
-            headless=True
-        )
-        
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        time.sleep(8)
-        
-        # Вводим текст поиска
-        try:
-            search_input = driver.find_element(By.ID, "searchString")
-            search_input.clear()
-            search_input.send_keys(search_text)
-            time.sleep(2)
-        except Exception as e:
-            print(f"Ошибка при вводе поискового запроса: {e}")
-            return False
-        
-        # Кнопка поиска
-        if not click_element_safe(driver, "button.search__btn", description="кнопку поиска", wait_time=8):
-            print("Не удалось выполнить поиск")
+        search_input = waiter.until("поле поиска", element_clickable(By.ID, "searchString"), timeout=20)
+        if search_input is None:
+            print("Поле поиска не появилось")
             return False
-        
-        time.sleep(10)
-        
-        # Проверяем результаты
-        try:
-            results = driver.find_elements(By.CSS_SELECTOR, "div.search-registry-entry-block")
-            if len(results) == 0:
-                print("Не найдено ни одного результата")
-                return False
-        except Exception as e:
-            print(f"Не удалось определить количество результатов: {e}")
-        
-        # Проверяем наличие ссылок для скачивания
-        if not check_download_links(driver):
-            print("Ссылки для скачивания не найдены")
+        search_input.clear()
+        search_input.send_keys(search_text)
+        waiter.until("ввод запроса", input_has_value(By.ID, "searchString", search_text), timeout=5)
+    except Exception as e:
+        print(f"Ошибка при вводе поискового запроса: {e}")
+        return False
+    return True
+
+def report_progress(progress, message):
+    """Сообщает о пройденном шаге, если передан обработчик прогресса"""
+    if progress is not None:
+        progress(message)
+
+def run_search_export(driver, search_text, download_folder, waiter=None, filters=None, progress=None, cancel_event=None):
+    """Выполняет поиск и выгрузку CSV в уже открытом браузере
+    
+    Каждый шаг ждет своего условия (элемент доступен, результаты перестали меняться,
+    открылось новое окно) с отдельным таймаутом; длительности шагов попадают в статистику waiter.
+    Фильтры (регион, даты и т.д.) передаются в адресе страницы результатов вместо заполнения формы.
+    progress получает описание каждого пройденного шага, cancel_event прерывает ожидания.
+    """
+    
+    if waiter is None:
+        waiter = StepWaiter(driver, cancel_event=cancel_event)
+    
+    report_progress(progress, "Страница поиска загружена")
+    
+    if filters:
+        driver.get(f"{SEARCH_URL}?{urlencode(build_search_params(search_text, **filters))}")
+    elif not open_search(driver, search_text, waiter):
+        return False
+    
+    waiter.until("загрузка результатов", network_idle(), timeout=30)
+    waiter.until("стабилизация результатов", results_stable(By.CSS_SELECTOR, "div.search-registry-entry-block"), timeout=30)
+    
+    # Проверяем результаты
+    try:
+        results = driver.find_elements(By.CSS_SELECTOR, "div.search-registry-entry-block")
+        if len(results) == 0:
+            print("Не найдено ни одного результата")
+            report_progress(progress, "Не найдено ни одного результата")
             return False
-        
-        # Последовательность действий для выгрузки
-        actions = [
-            {
-                "name": "меню выгрузки",
-                "selector": "img.downLoad-icon",
-                "wait": 8
-            },
-            {
-                "name": "кнопку далее", 
-                "selector": "#btn-primary",
-                "wait": 10
-            },
-            {
-                "name": "выгрузку CSV",
-                "selector": "div.col-3.link.csvDownload.cursorPointer",
-                "wait": 15
-            }
-        ]
-        
+        report_progress(progress, f"Найдено результатов на странице: {len(results)}")
+    except Exception as e:
+        print(f"Не удалось определить количество результатов: {e}")
+    
+    # Проверяем наличие ссылок для скачивания
+    if not check_download_links(driver):
+        print("Ссылки для скачивания не найдены")
+        return False
+    
+    # Последовательность действий для выгрузки
+    actions = [
+        {
+            "name": "меню выгрузки",
+            "selector": "img.downLoad-icon",
+            "timeout": 15
+        },
+        {
+            "name": "кнопку далее", 
+            "selector": "#btn-primary",
+            "timeout": 20
+        },
+        {
+            "name": "выгрузку CSV",
+            "selector": "div.col-3.link.csvDownload.cursorPointer",
+            "timeout": 30
+        }
+    ]
+    
+    # Начинаем следить за папкой до нажатий, чтобы не пропустить быструю загрузку
+    with DownloadWatcher(download_folder) as watcher:
         for action in actions:
+            # Нужный элемент может появиться как в текущем, так и в новом окне
+            handle = waiter.until(
+                f"{action['name']}: готовность",
+                any_of(
+                    element_present(By.CSS_SELECTOR, action["selector"]),
+                    new_window(driver.window_handles)
+                ),
+                timeout=action["timeout"]
+            )
+            if isinstance(handle, str):
+                driver.switch_to.window(handle)
+            
             success = click_element_safe(
                 driver, 
                 action["selector"], 
                 description=action["name"],
-                wait_time=action["wait"]
+                waiter=waiter,
+                timeout=action["timeout"]
             )
             
             if not success:
@@ -214,15 +285,152 @@ def perform_optimized_search(search_text):
             if len(driver.window_handles) > 1:
                 driver.switch_to.window(driver.window_handles[-1])
         
-        # Ждем завершения загрузки файла
-        downloaded_files = wait_for_download_complete(download_folder, timeout=60)
+        report_progress(progress, "CSV загружается")
         
-        if downloaded_files:
-            return True
+        # Ждем завершения загрузки файла
+        downloaded_files = wait_for_download_complete(download_folder, timeout=60, watcher=watcher, cancel_event=cancel_event)
+    
+    if downloaded_files:
+        report_progress(progress, "CSV загружен")
+        return downloaded_files
+    else:
+        print("Файлы не были загружены")
+        return False
+
+def create_browser_pool(size=2, max_uses=20, download_folder=None, search_url=SEARCH_URL, network_profile="full",
+                        warm_start=False, measure_network=False):
+    """Создает пул прогретых браузеров, настроенных на папку загрузок
+    
+    search_url можно направить на локальный сервер с записанными страницами.
+    warm_start=True запускает браузеры с постоянными профилями, в которых уже
+    есть кэш скриптов и стилей сайта и cookie сессии.
+    measure_network=True считает трафик каждого запроса (для бенчмарка).
+    """
+    if download_folder is None:
+        download_folder = setup_download_folder()
+    return BrowserPool(
+        search_url,
+        lambda: get_chrome_options(download_folder, network_profile, measure_network),
+        size=size,
+        max_uses=max_uses,
+        network_profile=network_profile,
+        profiles=ProfileManager() if warm_start else None,
+        measure_network=measure_network
+    )
+
+def record_network_usage(driver, network_profile):
+    """Учитывает трафик браузера за запрос в общей статистике и в текущем шаге трассировки"""
+    usage = collect_usage(driver)
+    network_stats.record(network_profile, usage)
+    span = tracer.current()
+    if span is not None:
+        span.attrs["network"] = {key: usage[key] for key in ("requests", "bytes", "blocked")}
+    return usage
+
+def perform_optimized_search(search_text, pool=None, download_folder=None, http_exporter=None, filters=None,
+                             progress=None, cancel_event=None, network_profile="full", store=None,
+                             measure_network=False):
+    """Оптимизированная функция поиска и выгрузки данных в фоновом режиме
+    
+    Если передан http_exporter, сначала пробуется прямая выгрузка по HTTP (с фильтрами filters),
+    а браузер запускается только при ее неудаче.
+    Если передан пул браузеров, запрос выполняется в прогретом браузере из пула,
+    иначе браузер запускается и закрывается специально для этого запроса.
+    progress и cancel_event позволяют показывать ход поиска и отменять его из другого потока.
+    network_profile и measure_network задают профиль сети и замер трафика браузера без пула
+    (у пула они заданы при создании).
+    С store (DownloadStore) загруженные файлы переносятся в хранилище и возвращаются пути сжатых копий.
+    Возвращает список загруженных файлов (пустой, если поиск ничего не нашел) или False при ошибке или отмене.
+    Запрос и каждый его шаг замеряются в tracer.
+    """
+    
+    with tracer.span("запрос", query=search_text, pooled=pool is not None) as span:
+        files = _perform_search(
+            search_text, pool, download_folder, http_exporter, filters, progress, cancel_event, network_profile,
+            measure_network
+        )
+        if files:
+            span.bytes = files_size(files)
+            if store is not None:
+                files = store.put_files(files, search_text, filters)
+        elif files == []:
+            span.attrs["empty"] = True
+        elif cancel_event is not None and cancel_event.is_set():
+            span.fail("cancelled")
         else:
-            print("Файлы не были загружены")
+            span.fail()
+        return files
+
+def _perform_search(search_text, pool, download_folder, http_exporter, filters, progress, cancel_event,
+                    network_profile, measure_network):
+    if download_folder is None:
+        download_folder = setup_download_folder()
+    
+    if http_exporter is not None:
+        try:
+            report_progress(progress, "Прямая выгрузка CSV")
+            with tracer.span("прямая выгрузка") as span:
+                files = http_exporter.export_csv(search_text, download_folder, **(filters or {}))
+                span.bytes = files_size(files)
+            report_progress(progress, "CSV загружен")
+            return files
+        except ExportUnavailable as e:
+            print(f"Прямая выгрузка недоступна, используем браузер: {e}")
+    
+    if cancel_event is not None and cancel_event.is_set():
+        return False
+    
+    if pool is not None:
+        try:
+            with pool.lease() as driver:
+                # Браузеры пула делят одну папку загрузок, поэтому для каждого запроса задаем ее явно
+                set_download_folder(driver, download_folder)
+                try:
+                    return run_search_export(
+                        driver, search_text, download_folder,
+                        filters=filters, progress=progress, cancel_event=cancel_event
+                    )
+                finally:
+                    if pool.measure_network:
+                        record_network_usage(driver, pool.network_profile)
+        except SearchCancelled:
+            print(f"Поиск '{search_text}' отменен")
             return False
-            
+        except Exception as e:
+            print(f"Критическая ошибка: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+    
+    chrome_options = get_chrome_options(download_folder, network_profile, measure_network)
+    
+    try:
+        with tracer.span("запуск браузера"):
+            driver = start_chrome(
+                SEARCH_URL,
+                options=chrome_options,
+                headless=True
+            )
+            mask_automation(driver)
+            apply_network_profile(driver, network_profile)
+        
+        waiter = StepWaiter(driver, cancel_event=cancel_event)
+        with tracer.span("загрузка страницы") as span:
+            if waiter.until("загрузка страницы", element_present(By.ID, "searchString"), timeout=30) is None:
+                span.fail("timeout")
+        
+        try:
+            return run_search_export(
+                driver, search_text, download_folder,
+                waiter=waiter, filters=filters, progress=progress, cancel_event=cancel_event
+            )
+        finally:
+            if measure_network:
+                record_network_usage(driver, network_profile)
+    
+    except SearchCancelled:
+        print(f"Поиск '{search_text}' отменен")
+        return False
     except Exception as e:
         print(f"Критическая ошибка: {e}")
         import traceback
@@ -235,21 +443,59 @@ def perform_optimized_search(search_text):
             pass
 
 def main():
-    """Основная функция"""
+    """Основная функция
+    
+    Запросы выполняются через сохраняемую очередь: после сбоя повторный запуск
+    продолжает тот же пакет и не выгружает уже выполненные запросы заново.
+    """
+    from job_queue import JobQueue, CircuitBreaker, run_batch
+    
     search_queries = ["ноутбуки"]
     
-    success_count = 0
+    contract_index = ContractIndex()
+    result_cache = ResultCache()
+    job_queue = JobQueue()
+    store = DownloadStore()
+    batch = job_queue.open_batch("main", search_queries)
     
-    for query in search_queries:
-        success = perform_optimized_search(query)
+    # Браузер из пула запускается только если прямая выгрузка по HTTP не сработала
+    with create_browser_pool(size=1) as pool, HttpExporter() as http_exporter:
+        def fetch(query, filters):
+            def download_and_ingest():
+                # Разбор и индексация до записи в кэш: если они упадут, повтор задачи
+                # не получит готовую запись из кэша и не пропустит индексацию
+                files = perform_optimized_search(
+                    query, pool=pool, http_exporter=http_exporter, filters=filters, store=store
+                )
+                if files:
+                    ingest_files(files, query, filters=filters)
+                    # Регион запроса сохраняется с контрактами, иначе фильтр по региону в окне их не найдет
+                    contract_index.add_files(files, query, filters.get("region"))
+                return files
+
+            files, _ = result_cache.get_or_fetch(query, download_and_ingest, **filters)
+            return files
         
-        if success:
-            success_count += 1
-        else:
-            print(f"Запрос '{query}' завершился с ошибками")
+        run_batch(job_queue, batch, fetch, CircuitBreaker(), pause=5 if len(search_queries) > 1 else 0)
         
-        if len(search_queries) > 1:
-            time.sleep(5)
+        print(f"Статистика пула браузеров: {pool.report()}")
+    
+    print(f"Статистика кэша результатов: {result_cache.report()}")
+    print(f"Сетевой трафик браузеров: {network_stats.report()}")
+    result_cache.close()
+    contract_index.close()
+    job_queue.close()
+    store.enforce_retention()
+    print(f"Хранилище выгрузок: {store.report()}")
+    store.close()
+    wait_stats.save(os.path.join(os.getcwd(), "wait_stats.json"))
+    
+    # Шаги запросов для разбора медленных прогонов и метрики для Prometheus
+    tracer.export_jsonl(os.path.join(os.getcwd(), "traces.jsonl"))
+    tracer.export_prometheus(os.path.join(os.getcwd(), "parser_metrics.prom"))
+    for step, entry in tracer.summary().items():
+        print(f"{step}: {entry['count']} раз, p50 {entry['p50']:.2f} с, p90 {entry['p90']:.2f} с, "
+              f"p99 {entry['p99']:.2f} с, итоги {entry['outcomes']}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,231 @@
+import os
+import gzip
+import json
+import time
+import shutil
+import hashlib
+import sqlite3
+import threading
+from ingest import iter_contract_rows
+
+# Время жизни записей по классам фильтров, в секундах:
+# актуальные закупки устаревают быстрее архивных
+DEFAULT_TTL = {
+    "actual": 60 * 60,
+    "default": 6 * 60 * 60,
+    "archive": 7 * 24 * 60 * 60,
+}
+
+def normalize_search_text(search_text):
+    """Регистр, ё и лишние пробелы не влияют на ключ кэша"""
+    return " ".join(search_text.lower().replace("ё", "е").split())
+
+def filter_class(only_actual=False, include_archive=False, **_):
+    """Класс фильтров, от которого зависит время жизни записи"""
+    if only_actual:
+        return "actual"
+    if include_archive:
+        return "archive"
+    return "default"
+
+def make_key(search_text, **filters):
+    """Ключ кэша по нормализованному запросу и любым фильтрам
+
+    Пустые фильтры (None, '', False) отбрасываются, поэтому не указанный
+    фильтр и фильтр по умолчанию дают один ключ.
+    """
+    used = {name: value for name, value in filters.items() if value not in (None, "", False)}
+    parts = [
+        normalize_search_text(search_text),
+        json.dumps(used, sort_keys=True, ensure_ascii=False, default=str),
+    ]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+class _Flight:
+    """Выполняющийся запрос, результата которого ждут одинаковые запросы"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+class ResultCache:
+    """Постоянный кэш результатов поиска перед парсером
+
+    Хранит выгрузку и разобранные строки, следит за временем жизни записей
+    по классу фильтров и за общим объемом на диске (вытесняются давно
+    не использованные записи). Одинаковые одновременные запросы ждут
+    один общий парсинг.
+    """
+
+    def __init__(self, folder=None, max_bytes=2 * 1024 ** 3, ttl=None):
+        self.folder = folder or os.path.join(os.getcwd(), "zakupki_cache")
+        os.makedirs(self.folder, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = {**DEFAULT_TTL, **(ttl or {})}
+
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.conn = sqlite3.connect(os.path.join(self.folder, "cache.sqlite"), check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                filter_class TEXT,
+                files TEXT,
+                size INTEGER,
+                created REAL,
+                last_access REAL
+            )
+        """)
+        self.conn.commit()
+
+        self.stats = {"hits": 0, "misses": 0, "shared": 0, "bytes_saved": 0, "evicted": 0}
+
+    def _entry_folder(self, key):
+        return os.path.join(self.folder, key[:2], key)
+
+    def _lookup(self, key):
+        """Пути к файлам записи, если она есть и не устарела"""
+        row = self.conn.execute(
+            "SELECT filter_class, files, size, created FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        klass, files, size, created = row
+        files = json.loads(files)
+        if time.time() - created > self.ttl.get(klass, DEFAULT_TTL["default"]) or not all(map(os.path.exists, files)):
+            self._remove(key)
+            return None
+        self.conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        self.conn.commit()
+        self.stats["hits"] += 1
+        self.stats["bytes_saved"] += size
+        return files
+
+    def _remove(self, key):
+        shutil.rmtree(self._entry_folder(key), ignore_errors=True)
+        self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self.conn.commit()
+
+    def _prepare(self, key, files):
+        """Связывает выгрузку с временной папкой и сохраняет рядом разобранные строки
+
+        Файлы добавляются жесткими ссылками: выгрузка из DownloadStore не хранится
+        дважды, а запись кэша переживает удаление файла из хранилища. Копия
+        делается, только если ссылку создать нельзя (другой диск). В объем записи
+        входят только скопированные файлы и разобранные строки.
+        Выполняется без блокировки: разбор большой выгрузки не задерживает другие ключи.
+        Возвращает (временная папка, имена файлов, объем).
+        """
+        staging = os.path.join(self.folder, "staging", f"{key}_{threading.get_ident()}_{time.time_ns()}")
+        os.makedirs(staging)
+        names, size = [], 0
+        try:
+            for path in files:
+                target = os.path.join(staging, os.path.basename(path))
+                try:
+                    os.link(path, target)
+                except OSError:
+                    shutil.copy2(path, target)
+                    size += os.path.getsize(target)
+                rows_path = target + ".rows.jsonl.gz"
+                with gzip.open(rows_path, "wt", encoding="utf-8") as out:
+                    for record in iter_contract_rows(target):
+                        out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                names.append(os.path.basename(path))
+                size += os.path.getsize(rows_path)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return staging, names, size
+
+    def _publish(self, key, klass, staging, names, size):
+        """Переносит подготовленную запись на место и регистрирует ее; вызывается под блокировкой"""
+        folder = self._entry_folder(key)
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(os.path.dirname(folder), exist_ok=True)
+        os.replace(staging, folder)
+        stored = [os.path.join(folder, name) for name in names]
+
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO entries (key, filter_class, files, size, created, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, klass, json.dumps(stored, ensure_ascii=False), size, now, now)
+        )
+        self.conn.commit()
+        self._evict()
+        return stored
+
+    def _evict(self):
+        """Удаляет давно не использованные записи, пока кэш не уложится в max_bytes"""
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._remove(key)
+            total -= size
+            self.stats["evicted"] += 1
+
+    def get(self, search_text, **filters):
+        """Файлы из кэша для запроса или None"""
+        with self._lock:
+            return self._lookup(make_key(search_text, **filters))
+
+    def get_or_fetch(self, search_text, fetch, **filters):
+        """Возвращает (файлы, из_кэша); при промахе вызывает fetch() ровно один раз на ключ
+
+        fetch должен вернуть список загруженных файлов или пустое значение при ошибке.
+        """
+        key = make_key(search_text, **filters)
+        with self._lock:
+            files = self._lookup(key)
+            if files:
+                return files, True
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self.stats["misses"] += 1
+
+        if not leader:
+            flight.done.wait()
+            # Неудача ведущего запроса - это промах, а не попадание в кэш
+            with self._lock:
+                self.stats["shared" if flight.result else "misses"] += 1
+            return flight.result, bool(flight.result)
+
+        try:
+            files = fetch()
+            if files:
+                staging, names, size = self._prepare(key, files)
+                with self._lock:
+                    self._publish(key, filter_class(**filters), staging, names, size)
+            flight.result = files
+            return files, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def iter_rows(self, search_text, **filters):
+        """Разобранные строки закэшированной выгрузки без повторного чтения CSV"""
+        files = self.get(search_text, **filters) or []
+        for path in files:
+            with gzip.open(path + ".rows.jsonl.gz", "rt", encoding="utf-8") as rows:
+                for line in rows:
+                    yield json.loads(line)
+
+    def report(self):
+        """Доля попаданий и сэкономленный объем"""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"] + stats["shared"]
+        return {
+            **stats,
+            "hit_ratio": (stats["hits"] + stats["shared"]) / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,185 @@
+import os
+import re
+import csv
+import time
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from ingest import COLUMN_ALIASES, iter_contract_chunks
+from http_export import ExportUnavailable, safe_name
+from pars import setup_download_folder, perform_optimized_search
+
+# Максимум строк в одной CSV-выгрузке сайта
+EXPORT_ROW_LIMIT = 500
+
+# Самая ранняя дата, с которой ищутся контракты по умолчанию
+EARLIEST_DATE = date(2014, 1, 1)
+
+# Диапазон без счетчика результатов делится, только пока он длиннее этого числа дней
+UNKNOWN_SPAN_DAYS = 365
+
+TOTAL_RE = re.compile(r'search-results__total[^>]*>([^<]*)<', re.IGNORECASE)
+
+def estimate_count(page_html):
+    """Оценивает число результатов по счетчику страницы
+
+    Если счетчика нет, число неизвестно (None): на странице видна только
+    первая десятка результатов. Страница без единого результата дает 0.
+    """
+    match = TOTAL_RE.search(page_html)
+    if match:
+        digits = re.sub(r"\D", "", match.group(1))
+        if digits:
+            return int(digits)
+    if "search-registry-entry-block" not in page_html:
+        return 0
+    return None
+
+class ShardPlanner:
+    """Делит запрос на диапазоны дат обновления, каждый из которых влезает в одну выгрузку"""
+
+    def __init__(self, http_exporter, limit=EXPORT_ROW_LIMIT, unknown_span_days=UNKNOWN_SPAN_DAYS):
+        self.http_exporter = http_exporter
+        self.limit = limit
+        self.unknown_span_days = unknown_span_days
+        # Шарды, которые могут не влезть в одну выгрузку: однодневные сверх лимита и неоцененные
+        self.oversized = []
+
+    def count(self, search_text, filters, start, end):
+        html = self.http_exporter.fetch_results_page(
+            search_text,
+            **{**filters, "update_date_from": start, "update_date_to": end}
+        )
+        return estimate_count(html)
+
+    def plan(self, search_text, filters=None, start=EARLIEST_DATE, end=None):
+        """Рекурсивно делит диапазон пополам, пока оценка не станет меньше лимита
+
+        Диапазон без счетчика результатов (оценка None) делится только до
+        unknown_span_days дней: иначе один запрос без счетчика превращается
+        в тысячи однодневных выгрузок. Такие шарды попадают в oversized.
+        Возвращает список (начало, конец, оценка); однодневный диапазон дальше
+        не делится, и если он больше лимита, он тоже попадает в oversized.
+        """
+        filters = dict(filters or {})
+        end = end or date.today()
+        shards = []
+        pending = [(start, end)]
+        while pending:
+            shard_start, shard_end = pending.pop()
+            estimate = self.count(search_text, filters, shard_start, shard_end)
+            if estimate == 0:
+                continue
+            if estimate is not None and estimate <= self.limit:
+                shards.append((shard_start, shard_end, estimate))
+                continue
+            if estimate is None and (shard_end - shard_start).days + 1 <= self.unknown_span_days:
+                shard = (shard_start, shard_end, None)
+                shards.append(shard)
+                self.oversized.append(shard)
+                print(f"Шард {shard_start}..{shard_end} без счетчика результатов, "
+                      f"выгрузка за этот период может быть неполной")
+                continue
+            if shard_start >= shard_end:
+                shard = (shard_start, shard_end, estimate)
+                shards.append(shard)
+                self.oversized.append(shard)
+                print(f"Шард {shard_start} больше лимита выгрузки ({estimate or 'число неизвестно'}), "
+                      f"выгрузка за этот день может быть неполной")
+                continue
+            middle = shard_start + (shard_end - shard_start) // 2
+            pending.append((middle + timedelta(days=1), shard_end))
+            pending.append((shard_start, middle))
+        return sorted(shards)
+
+def _run_shard(search_text, filters, shard, download_folder, pool, http_exporter):
+    start, end, _ = shard
+    folder = os.path.join(download_folder, f"{start.isoformat()}_{end.isoformat()}")
+    os.makedirs(folder, exist_ok=True)
+    return perform_optimized_search(
+        search_text,
+        pool=pool,
+        download_folder=folder,
+        http_exporter=http_exporter,
+        filters={**filters, "update_date_from": start, "update_date_to": end}
+    )
+
+def stitch(paths, target):
+    """Склеивает выгрузки шардов в один CSV без повторов по реестровому номеру"""
+    fields = list(COLUMN_ALIASES)
+    seen = set()
+    rows = 0
+    with open(target, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file, delimiter=";")
+        # Заголовки совпадают с синонимами, поэтому склеенный файл читается тем же ingest
+        writer.writerow([COLUMN_ALIASES[field][0] for field in fields])
+        for path in paths:
+            for chunk in iter_contract_chunks(path):
+                for record in chunk:
+                    number = record.get("registry_number")
+                    if not number or number in seen:
+                        continue
+                    seen.add(number)
+                    writer.writerow(["" if record.get(field) is None else record[field] for field in fields])
+                    rows += 1
+    return rows
+
+def perform_sharded_search(search_text, http_exporter, pool=None, filters=None, max_workers=4,
+                           retries=2, limit=EXPORT_ROW_LIMIT):
+    """Выгружает полный результат широкого запроса по шардам и склеивает его
+
+    Шарды выполняются параллельно, неудачный шард повторяется отдельно до retries раз.
+    Без пула браузеров шарды идут по одному: запасной путь через helium управляет
+    одним браузером на весь процесс, и параллельные шарды закрывали бы браузеры друг друга.
+    Возвращает список из одного склеенного файла или False, если какой-то шард так и не выгрузился.
+    """
+    filters = dict(filters or {})
+    if pool is None:
+        max_workers = 1
+    planner = ShardPlanner(http_exporter, limit)
+    try:
+        shards = planner.plan(search_text, filters)
+    except ExportUnavailable as e:
+        print(f"Не удалось оценить число результатов: {e}")
+        return False
+    if not shards:
+        print("Не найдено ни одного результата")
+        return False
+    print(f"Запрос '{search_text}' разбит на {len(shards)} шардов")
+
+    download_folder = setup_download_folder(f"shards_{safe_name(search_text)}_{int(time.time())}")
+    files = {}
+    attempts = {shard: 0 for shard in shards}
+    pending = list(shards)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending:
+            futures = {
+                executor.submit(_run_shard, search_text, filters, shard, download_folder, pool, http_exporter): shard
+                for shard in pending
+            }
+            pending = []
+            for future in as_completed(futures):
+                shard = futures[future]
+                attempts[shard] += 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Шард {shard[0]}..{shard[1]} завершился с ошибкой: {e}")
+                    result = False
+                if result or result == []:
+                    files[shard] = result
+                elif attempts[shard] <= retries:
+                    pending.append(shard)
+                else:
+                    print(f"Шард {shard[0]}..{shard[1]} не выгружен после {attempts[shard]} попыток")
+
+    if len(files) != len(shards):
+        return False
+
+    target = os.path.join(download_folder, f"{safe_name(search_text)}_merged.csv")
+    paths = [path for shard in sorted(files) for path in files[shard]]
+    rows = stitch(paths, target)
+    print(f"Склеено {rows} уникальных строк из {len(paths)} выгрузок")
+    if planner.oversized:
+        print(f"Внимание: {len(planner.oversized)} шардов могли быть обрезаны лимитом в {limit} строк")
+    return [target]
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import uuid
+import threading
+from collections import deque
+from contextlib import contextmanager
+from waits import SearchCancelled
+
+# Перцентили длительности шагов в сводке и в метриках Prometheus
+QUANTILES = (0.5, 0.9, 0.99)
+
+class Span:
+    """Один шаг сценария: длительность, итог и число загруженных байт"""
+
+    def __init__(self, name, trace_id, parent_id=None, attrs=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attrs = dict(attrs or {})
+        self.started_at = time.time()
+        self.duration = None
+        self.outcome = "ok"
+        self.error = None
+        self.bytes = 0
+
+    def fail(self, outcome="failed", error=None):
+        """Отмечает шаг неуспешным без исключения (функция вернула False)"""
+        self.outcome = outcome
+        if error is not None:
+            self.error = str(error)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "outcome": self.outcome,
+            "error": self.error,
+            "bytes": self.bytes,
+            "attrs": self.attrs,
+        }
+
+def _quantile(values, share):
+    return values[int(share * (len(values) - 1))]
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+class Tracer:
+    """Сбор шагов сценария выгрузки с экспортом в JSONL и текстовый формат Prometheus
+
+    Вложенные шаги одного потока связываются через parent_id и общий trace_id,
+    поэтому по JSONL можно восстановить, на каком шаге застрял конкретный запрос.
+    Память ограничена: в spans хранятся последние max_spans шагов (до выгрузки
+    в JSONL), а перцентили считаются по последним max_durations длительностям шага.
+    Число, сумма, итоги и байты копятся целиком.
+    """
+
+    def __init__(self, max_spans=10000, max_durations=2048):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.max_durations = max_durations
+        self.spans = deque(maxlen=max_spans)
+        self.steps = {}
+
+    def _record(self, span):
+        """Сохраняет шаг и обновляет сводку по нему; вызывается под блокировкой"""
+        self.spans.append(span)
+        entry = self.steps.get(span["name"])
+        if entry is None:
+            entry = self.steps[span["name"]] = {
+                "count": 0, "sum": 0.0, "max": 0.0, "outcomes": {}, "bytes": 0,
+                "durations": deque(maxlen=self.max_durations),
+            }
+        entry["count"] += 1
+        entry["sum"] += span["duration"]
+        entry["max"] = max(entry["max"], span["duration"])
+        entry["outcomes"][span["outcome"]] = entry["outcomes"].get(span["outcome"], 0) + 1
+        entry["bytes"] += span["bytes"]
+        entry["durations"].append(span["duration"])
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Замеряет шаг; исключение отмечается как error и пробрасывается дальше"""
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        span = Span(
+            name,
+            parent.trace_id if parent else uuid.uuid4().hex,
+            parent.span_id if parent else None,
+            attrs
+        )
+        stack.append(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            # Отмена поиска - не сбой шага, считаем ее отдельно
+            span.fail("cancelled" if isinstance(e, SearchCancelled) else "error", e)
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            stack.pop()
+            with self._lock:
+                self._record(span.to_dict())
+
+    def current(self):
+        """Текущий незавершенный шаг потока или None"""
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def drain(self):
+        """Забирает накопленные шаги и сбрасывает сводку (например, чтобы передать их из процесса-обработчика)"""
+        with self._lock:
+            spans = list(self.spans)
+            self.spans.clear()
+            self.steps = {}
+        return spans
+
+    def extend(self, spans):
+        """Добавляет шаги, собранные в другом процессе"""
+        with self._lock:
+            for span in spans:
+                self._record(span)
+
+    def summary(self):
+        """Число, итоги, перцентили длительности и байты по каждому шагу"""
+        result = {}
+        with self._lock:
+            for name, entry in self.steps.items():
+                durations = sorted(entry["durations"])
+                result[name] = {
+                    "count": entry["count"],
+                    "sum": entry["sum"],
+                    "max": entry["max"],
+                    "outcomes": dict(entry["outcomes"]),
+                    "bytes": entry["bytes"],
+                    **{f"p{int(share * 100)}": _quantile(durations, share) for share in QUANTILES},
+                }
+        return result
+
+    def export_jsonl(self, path):
+        """Дописывает шаги в JSONL, по строке на шаг; записанные шаги убираются из памяти"""
+        with self._lock:
+            spans = list(self.spans)
+            self.spans.clear()
+        with open(path, "a", encoding="utf-8") as file:
+            for span in spans:
+                file.write(json.dumps(span, ensure_ascii=False) + "\n")
+        return len(spans)
+
+    def export_prometheus(self, path, prefix="zakupki_parser"):
+        """Пишет сводку в текстовом формате Prometheus (для textfile collector)
+
+        Файл заменяется атомарно, чтобы сборщик не прочитал его наполовину записанным.
+        """
+        summary = self.summary()
+        lines = [
+            f"# HELP {prefix}_step_duration_seconds Длительность шага сценария выгрузки",
+            f"# TYPE {prefix}_step_duration_seconds summary",
+        ]
+        for name, entry in summary.items():
+            step = _label(name)
+            for share in QUANTILES:
+                lines.append(
+                    f'{prefix}_step_duration_seconds{{step="{step}",quantile="{share}"}} '
+                    f'{entry[f"p{int(share * 100)}"]:.6f}'
+                )
+            lines.append(f'{prefix}_step_duration_seconds_sum{{step="{step}"}} {entry["sum"]:.6f}')
+            lines.append(f'{prefix}_step_duration_seconds_count{{step="{step}"}} {entry["count"]}')
+
+        lines.append(f"# HELP {prefix}_step_total Число шагов по итогу")
+        lines.append(f"# TYPE {prefix}_step_total counter")
+        for name, entry in summary.items():
+            for outcome, count in sorted(entry["outcomes"].items()):
+                lines.append(f'{prefix}_step_total{{step="{_label(name)}",outcome="{outcome}"}} {count}')
+
+        lines.append(f"# HELP {prefix}_downloaded_bytes_total Загружено байт на шаге")
+        lines.append(f"# TYPE {prefix}_downloaded_bytes_total counter")
+        for name, entry in summary.items():
+            if entry["bytes"]:
+                lines.append(f'{prefix}_downloaded_bytes_total{{step="{_label(name)}"}} {entry["bytes"]}')
+
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+        os.replace(temp_path, path)
+
+def files_size(paths):
+    """Суммарный размер загруженных файлов в байтах"""
+    total = 0
+    for path in paths or ():
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            pass
+    return total
+
+# Общий трассировщик процесса
+tracer = Tracer()
@@ -0,0 +1,197 @@
+import os
+import re
+import time
+import zlib
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import scipy.sparse as sp
+from contract_index import ContractIndex, stem_text
+
+# Размерность пространства хешированных признаков
+N_FEATURES = 2 ** 18
+
+def extract_text(path):
+    """Извлекает текст ТЗ из txt, docx или pdf"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".docx":
+        with zipfile.ZipFile(path) as archive:
+            xml = archive.read("word/document.xml").decode("utf-8", errors="ignore")
+        # Абзацы превращаем в переводы строк, остальные теги убираем
+        xml = re.sub(r"</w:p>", "\n", xml)
+        return re.sub(r"<[^>]+>", "", xml)
+    if extension == ".pdf":
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            raise RuntimeError("Для чтения PDF нужен пакет pypdf")
+        return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+
+    with open(path, "rb") as file:
+        data = file.read()
+    for encoding in ("utf-8-sig", "cp1251"):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode("utf-8", errors="ignore")
+
+def text_features(text):
+    """Основы слов и символьные триграммы основ (устойчивы к опечаткам и словоформам)"""
+    features = []
+    for stem in stem_text(text).split():
+        features.append("w:" + stem)
+        padded = f"#{stem}#"
+        features.extend("c:" + padded[i:i + 3] for i in range(len(padded) - 2))
+    return features
+
+def hash_counts(text):
+    """Счетчики признаков текста в хешированном пространстве (стабильный crc32)"""
+    counts = {}
+    for feature in text_features(text):
+        index = zlib.crc32(feature.encode("utf-8")) % N_FEATURES
+        counts[index] = counts.get(index, 0) + 1
+    return counts
+
+def vectorize(texts):
+    """Разреженная матрица частот признаков, по строке на текст"""
+    indptr, indices, data = [0], [], []
+    for text in texts:
+        counts = hash_counts(text)
+        indices.extend(counts.keys())
+        data.extend(counts.values())
+        indptr.append(len(indices))
+    return sp.csr_matrix(
+        (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(indptr) - 1, N_FEATURES)
+    )
+
+def l2_normalize(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sp.diags(1.0 / norms).dot(matrix).tocsr().astype(np.float32)
+
+def setup_vectors_folder():
+    """Папка кэша векторов контрактов рядом с индексом"""
+    folder = os.path.join(os.getcwd(), "zakupki_vectors")
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+class TzMatcher:
+    """Подбор контрактов, похожих на загруженное ТЗ, по косинусной близости TF-IDF
+
+    Векторы контрактов строятся один раз по локальному индексу и хранятся
+    на диске; кэш перестраивается, когда меняется число контрактов, последний
+    идентификатор или счетчик изменений индекса (обновленные контракты).
+    """
+
+    def __init__(self, index=None, folder=None, workers=None, batch_rows=250000):
+        self.index = index or ContractIndex()
+        self.folder = folder or setup_vectors_folder()
+        os.makedirs(self.folder, exist_ok=True)
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_rows = batch_rows
+        self.matrix = None
+        self.ids = None
+        self.idf = None
+        self.version = None
+        # Блоки строк матрицы для параллельного подсчета; режутся один раз при загрузке
+        self.blocks = []
+
+    def _index_version(self):
+        count, max_id = self.index.conn.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM contracts").fetchone()
+        return f"{count}_{max_id}_{self.index.version()}"
+
+    def _paths(self, version):
+        base = os.path.join(self.folder, f"contracts_{version}")
+        return base + ".npz", base + "_ids.npy", base + "_idf.npy"
+
+    def load(self):
+        """Загружает векторы из кэша или строит их заново; без изменений индекса ничего не делает"""
+        version = self._index_version()
+        if version == self.version and self.matrix is not None:
+            return
+        self.version = version
+        matrix_path, ids_path, idf_path = self._paths(version)
+        if os.path.exists(matrix_path):
+            self.matrix = sp.load_npz(matrix_path).tocsr()
+            self.ids = np.load(ids_path)
+            self.idf = np.load(idf_path)
+            self._split_blocks()
+            return
+
+        started = time.perf_counter()
+        rows = self.index.conn.execute(
+            "SELECT id, COALESCE(subject, '') || ' ' || COALESCE(customer, '') FROM contracts ORDER BY id"
+        ).fetchall()
+        self.ids = np.asarray([row[0] for row in rows], dtype=np.int64)
+        counts = vectorize(row[1] for row in rows)
+
+        # Обратная документная частота признаков
+        document_frequency = np.bincount(counts.indices, minlength=N_FEATURES)
+        self.idf = (np.log((1 + len(rows)) / (1 + document_frequency)) + 1).astype(np.float32)
+        self.matrix = l2_normalize(counts.multiply(self.idf).tocsr())
+
+        # Векторы прошлых версий индекса больше не нужны
+        for old in os.listdir(self.folder):
+            if old.startswith("contracts_"):
+                os.remove(os.path.join(self.folder, old))
+        sp.save_npz(matrix_path, self.matrix, compressed=False)
+        np.save(ids_path, self.ids)
+        np.save(idf_path, self.idf)
+        self._split_blocks()
+        print(f"Векторы {len(rows)} контрактов построены за {time.perf_counter() - started:.1f} с")
+
+    def _split_blocks(self):
+        """Нарезает матрицу на блоки по batch_rows строк; срез CSR копирует данные, поэтому не на каждом запросе"""
+        total = self.matrix.shape[0]
+        if self.workers <= 1 or total <= self.batch_rows:
+            self.blocks = []
+            return
+        self.blocks = [self.matrix[start:start + self.batch_rows] for start in range(0, total, self.batch_rows)]
+
+    def _scores(self, query):
+        """Косинусная близость запроса ко всем контрактам, блоками строк в несколько потоков"""
+        dense = np.zeros(N_FEATURES, dtype=np.float32)
+        dense[query.indices] = query.data
+        if not self.blocks:
+            return self.matrix.dot(dense)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return np.concatenate(list(executor.map(lambda block: block.dot(dense), self.blocks)))
+
+    def match_text(self, text, top_k=10):
+        """Возвращает (контракты по убыванию похожести, время в мс)"""
+        if self.matrix is None:
+            self.load()
+        started = time.perf_counter()
+        if self.matrix.shape[0] == 0:
+            return [], 0.0
+
+        query = l2_normalize(vectorize([text]).multiply(self.idf).tocsr())
+        scores = self._scores(query)
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        results = []
+        for position in best:
+            if scores[position] <= 0:
+                break
+            row = self.index.conn.execute(
+                "SELECT registry_number, subject, customer, price FROM contracts WHERE id = ?",
+                (int(self.ids[position]),)
+            ).fetchone()
+            results.append({
+                "registry_number": row[0],
+                "subject": row[1],
+                "customer": row[2],
+                "price": row[3],
+                "score": float(scores[position]),
+            })
+        return results, elapsed_ms
+
+    def match_file(self, path, top_k=10):
+        """Подбирает контракты для файла ТЗ"""
+        return self.match_text(extract_text(path), top_k)
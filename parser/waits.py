@@ -0,0 +1,176 @@
+import json
+import time
+import threading
+from collections import deque
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+def element_present(by, selector):
+    """Элемент появился в DOM"""
+    return EC.presence_of_element_located((by, selector))
+
+def element_clickable(by, selector):
+    """Элемент видим и доступен для нажатия"""
+    return EC.element_to_be_clickable((by, selector))
+
+def element_stale(element):
+    """Старый элемент исчез со страницы (страница перерисовалась)"""
+    return EC.staleness_of(element)
+
+def input_has_value(by, selector, text):
+    """В поле ввода оказался нужный текст"""
+    return EC.text_to_be_present_in_element_value((by, selector), text)
+
+def new_window(known_handles):
+    """Открылось новое окно; возвращает его дескриптор"""
+    known = set(known_handles)
+
+    def condition(driver):
+        fresh = [h for h in driver.window_handles if h not in known]
+        return fresh[-1] if fresh else False
+    return condition
+
+def any_of(*conditions):
+    """Выполнено хотя бы одно из условий"""
+    return EC.any_of(*conditions)
+
+def results_stable(by, selector, settle=0.5):
+    """Количество блоков результатов не меняется в течение settle секунд"""
+    state = {"count": None, "since": 0.0}
+
+    def condition(driver):
+        if driver.execute_script("return document.readyState") != "complete":
+            return False
+        count = len(driver.find_elements(by, selector))
+        now = time.monotonic()
+        if count != state["count"]:
+            state["count"] = count
+            state["since"] = now
+            return False
+        return now - state["since"] >= settle
+    return condition
+
+# Считаем сеть простаивающей, если список загруженных ресурсов не растет
+# и у jQuery (если он есть на странице) нет активных запросов
+NETWORK_STATE_SCRIPT = """
+return {
+    ready: document.readyState,
+    resources: performance.getEntriesByType('resource').length,
+    ajax: (window.jQuery && window.jQuery.active) || 0
+};
+"""
+
+def network_idle(idle=0.5):
+    """Страница загружена и новых сетевых запросов нет в течение idle секунд"""
+    state = {"resources": None, "since": 0.0}
+
+    def condition(driver):
+        info = driver.execute_script(NETWORK_STATE_SCRIPT)
+        now = time.monotonic()
+        if info["ready"] != "complete" or info["ajax"]:
+            state["resources"] = None
+            return False
+        if info["resources"] != state["resources"]:
+            state["resources"] = info["resources"]
+            state["since"] = now
+            return False
+        return now - state["since"] >= idle
+    return condition
+
+class SearchCancelled(Exception):
+    """Поиск отменен пользователем"""
+
+class WaitStats:
+    """Накопленная статистика длительности шагов ожидания
+
+    Число, сумма, максимум и таймауты копятся целиком, а перцентили считаются
+    по последним max_durations замерам шага, чтобы память не росла со временем.
+    """
+
+    def __init__(self, max_durations=2048):
+        self._lock = threading.Lock()
+        self.max_durations = max_durations
+        self.steps = {}
+
+    def record(self, step, duration, ok):
+        with self._lock:
+            entry = self.steps.get(step)
+            if entry is None:
+                entry = self.steps[step] = {
+                    "count": 0, "sum": 0.0, "max": 0.0, "timeouts": 0,
+                    "durations": deque(maxlen=self.max_durations),
+                }
+            entry["count"] += 1
+            entry["sum"] += duration
+            entry["max"] = max(entry["max"], duration)
+            entry["durations"].append(duration)
+            if not ok:
+                entry["timeouts"] += 1
+
+    def summary(self):
+        """Количество, среднее, перцентили и число таймаутов по каждому шагу"""
+        result = {}
+        with self._lock:
+            for step, entry in self.steps.items():
+                durations = sorted(entry["durations"])
+                result[step] = {
+                    "count": entry["count"],
+                    "mean": entry["sum"] / entry["count"],
+                    "p50": durations[int(0.50 * (len(durations) - 1))],
+                    "p95": durations[int(0.95 * (len(durations) - 1))],
+                    "max": entry["max"],
+                    "timeouts": entry["timeouts"],
+                }
+        return result
+
+    def drain(self):
+        """Возвращает сводку и начинает сбор заново (например, для следующего прогона)"""
+        with self._lock:
+            steps, self.steps = self.steps, {}
+        drained = WaitStats(self.max_durations)
+        drained.steps = steps
+        return drained.summary()
+
+    def save(self, path):
+        """Сохраняет сводку в JSON, чтобы по ней подбирать таймауты"""
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.summary(), file, ensure_ascii=False, indent=2)
+
+# Общая статистика для всех запросов процесса
+wait_stats = WaitStats()
+
+class StepWaiter:
+    """Ожидание шагов сценария по условиям вместо фиксированных пауз"""
+
+    def __init__(self, driver, timeout=30, poll=0.2, stats=None, cancel_event=None):
+        self.driver = driver
+        self.timeout = timeout
+        self.poll = poll
+        self.stats = stats if stats is not None else wait_stats
+        self.cancel_event = cancel_event
+
+    def _cancellable(self, condition):
+        """Прерывает ожидание, как только поиск отменен"""
+        def wrapped(driver):
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                raise SearchCancelled()
+            return condition(driver)
+        return wrapped
+
+    def until(self, step, condition, timeout=None):
+        """Ждет выполнения условия; возвращает его результат или None при таймауте"""
+        started = time.monotonic()
+        try:
+            result = WebDriverWait(
+                self.driver,
+                timeout if timeout is not None else self.timeout,
+                poll_frequency=self.poll
+            ).until(self._cancellable(condition))
+            ok = True
+        except TimeoutException:
+            result = None
+            ok = False
+            print(f"Превышено время ожидания шага: {step}")
+        self.stats.record(step, time.monotonic() - started, ok)
+        return result
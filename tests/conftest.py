@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Модули парсера импортируются по имени файла, как при запуске из папки parser
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "parser"))
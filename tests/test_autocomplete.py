@@ -0,0 +1,56 @@
+import os
+from autocomplete import Autocomplete, write_index, build_autocomplete
+from contract_index import ContractIndex
+
+def test_prefix_and_typo_suggestions(tmp_path):
+    path = str(tmp_path / "autocomplete.idx")
+    terms = [(f"товар {number:04d}", number) for number in range(3000)]
+    terms += [("бумага офисная", 50000), ("бумага для принтера", 40000), ("бумажные полотенца", 30000)]
+    assert write_index(terms, path) == len(terms)
+
+    autocomplete = Autocomplete(path)
+    try:
+        assert autocomplete.suggest("Бумаг", 2) == ["бумага офисная", "бумага для принтера"]
+        # Самые весомые продолжения среди тысяч терминов с общим префиксом
+        assert autocomplete.suggest("товар", 3) == ["товар 2999", "товар 2998", "товар 2997"]
+        assert "бумага офисная" in autocomplete.suggest("бумага офисня", 3)
+        assert autocomplete.suggest("") == []
+    finally:
+        autocomplete.close()
+
+def test_build_from_index_and_install(tmp_path):
+    csv_path = str(tmp_path / "export.csv")
+    with open(csv_path, "w", encoding="utf-8") as file:
+        file.write("Реестровый номер;Объект закупки\n")
+        for number in range(5):
+            file.write(f"{number};Поставка ноутбуков для школы\n")
+    index_path = str(tmp_path / "index.sqlite")
+    index = ContractIndex(index_path)
+    try:
+        index.add_file(csv_path, "ноутбуки")
+    finally:
+        index.close()
+
+    path = str(tmp_path / "autocomplete.idx")
+    autocomplete = Autocomplete(path)
+    try:
+        assert autocomplete.suggest("ноут") == []
+        assert autocomplete.stale(index_path)
+        assert build_autocomplete(path + ".new", index_path) > 0
+        assert autocomplete.install(path + ".new")
+        assert autocomplete.suggest("ноут", 1) == ["ноутбуки"]
+        assert "поставка ноутбуков" in autocomplete.suggest("поставка", 8)
+        assert not os.path.exists(path + ".new")
+        assert not autocomplete.stale(index_path)
+
+        # Новые строки при открытом соединении лежат в -wal, файл индекса может не меняться
+        index = ContractIndex(index_path)
+        try:
+            with open(csv_path, "a", encoding="utf-8") as file:
+                file.write("9;Поставка мониторов\n")
+            index.add_file(csv_path, "мониторы")
+            assert autocomplete.stale(index_path)
+        finally:
+            index.close()
+    finally:
+        autocomplete.close()
@@ -0,0 +1,20 @@
+import os
+import pytest
+from bench_replay import start_server, run_level
+
+@pytest.fixture
+def replay(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server, base_url = start_server(entries=20, export_rows=100, export_latency=0)
+    yield base_url
+    server.shutdown()
+    server.server_close()
+
+def test_levels_report_their_own_steps(replay):
+    first = run_level(replay, "http", queries=3, concurrency=1)
+    second = run_level(replay, "http", queries=2, concurrency=2)
+    assert first["failures"] == 0 and second["failures"] == 0
+    # Шаги каждого уровня считаются отдельно, а не накапливаются за весь прогон
+    assert first["spans"]["запрос"]["count"] == 3
+    assert second["spans"]["запрос"]["count"] == 2
+    assert os.path.isdir(os.path.join("zakupki_downloads", "bench_http_full_2"))
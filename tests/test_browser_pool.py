@@ -0,0 +1,123 @@
+import threading
+import pytest
+from browser_pool import BrowserPool, PooledDriver
+from waits import SearchCancelled
+
+class FakeDriver:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+
+    def quit(self):
+        self.closed = True
+
+class FakePool(BrowserPool):
+    """Пул без Chrome: браузеры - заглушки с порядковым номером"""
+
+    def __init__(self, **kwargs):
+        super().__init__("http://localhost/", lambda: None, **kwargs)
+        self.launched = 0
+
+    def _launch(self):
+        self.launched += 1
+        return PooledDriver(FakeDriver(self.launched))
+
+    def _reset(self, item):
+        pass
+
+def test_waiter_gets_replacement_when_leased_browser_is_recycled():
+    pool = FakePool(size=1, max_uses=1)
+    leased = threading.Event()
+    release = threading.Event()
+    got = []
+
+    def holder():
+        with pool.lease() as driver:
+            got.append(driver.number)
+            leased.set()
+            release.wait(5)
+
+    def waiter():
+        with pool.lease(timeout=5) as driver:
+            got.append(driver.number)
+
+    first = threading.Thread(target=holder)
+    first.start()
+    assert leased.wait(5)
+    second = threading.Thread(target=waiter)
+    second.start()
+    # Второй ждет: пул заполнен, а после возврата браузер будет перезапущен
+    second.join(0.2)
+    assert second.is_alive()
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert not second.is_alive()
+    assert got == [1, 2]
+    report = pool.report()
+    assert report["recycled"] == 2
+    assert report["leases"] == 2
+    pool.close()
+
+def test_waiter_gets_replacement_when_leased_browser_breaks():
+    pool = FakePool(size=1)
+    leased = threading.Event()
+    fail = threading.Event()
+    got = []
+
+    def holder():
+        with pytest.raises(RuntimeError):
+            with pool.lease():
+                leased.set()
+                fail.wait(5)
+                raise RuntimeError("браузер упал")
+
+    def waiter():
+        with pool.lease(timeout=5) as driver:
+            got.append(driver.number)
+
+    first = threading.Thread(target=holder)
+    first.start()
+    assert leased.wait(5)
+    second = threading.Thread(target=waiter)
+    second.start()
+    fail.set()
+    first.join(5)
+    second.join(5)
+    assert got == [2]
+    assert pool.report()["crashed"] == 1
+
+def test_cancelled_search_keeps_browser():
+    pool = FakePool(size=1)
+    with pytest.raises(SearchCancelled):
+        with pool.lease():
+            raise SearchCancelled()
+    with pool.lease() as driver:
+        assert driver.number == 1
+    assert pool.report()["crashed"] == 0
+    pool.close()
+    assert driver.closed
+
+def test_many_threads_share_small_pool():
+    pool = FakePool(size=2, max_uses=3)
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(10):
+                with pool.lease(timeout=5):
+                    pass
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert not errors
+    report = pool.report()
+    assert report["leases"] == 60
+    assert report["hits"] + report["misses"] == 60
+    pool.close()
@@ -0,0 +1,30 @@
+import os
+import shutil
+import browser_profile
+from browser_profile import ProfileManager
+
+def test_release_copies_template_without_holding_lock(tmp_path, monkeypatch):
+    manager = ProfileManager(str(tmp_path / "profiles"), template_max_age=0)
+    profile = manager.acquire()
+    with open(os.path.join(profile, "Cookies"), "w") as file:
+        file.write("session")
+
+    copytree = shutil.copytree
+    during_copy = {}
+
+    def checked_copytree(source, target, **kwargs):
+        # Другие браузеры могут получать профили, пока идет копирование
+        during_copy["lock_free"] = manager._lock.acquire(blocking=False)
+        if during_copy["lock_free"]:
+            manager._lock.release()
+        during_copy["in_use"] = source in manager._in_use
+        return copytree(source, target, **kwargs)
+
+    monkeypatch.setattr(browser_profile.shutil, "copytree", checked_copytree)
+    manager.release(profile)
+
+    assert during_copy == {"lock_free": True, "in_use": True}
+    assert profile not in manager._in_use
+    with open(os.path.join(manager.template, "Cookies")) as file:
+        assert file.read() == "session"
+    assert manager.acquire() == profile
@@ -0,0 +1,63 @@
+import os
+from contract_index import ContractIndex
+
+HEADER = "Реестровый номер;Объект закупки;Цена контракта;Статус;Количество участников\n"
+
+def write_csv(path, numbers):
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(HEADER)
+        for number in numbers:
+            file.write(f"{number};Ноутбуки для школы;1000,00;Исполнение;1\n")
+    # Время изменения должно отличаться, иначе выгрузка считается уже учтенной
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + len(numbers)))
+
+def test_aggregates_without_region_are_merged(tmp_path):
+    path = str(tmp_path / "export.csv")
+    index = ContractIndex(str(tmp_path / "index.sqlite"))
+    try:
+        write_csv(path, range(1, 6))
+        assert index.add_file(path, "ноутбуки") == 5
+        snapshot = index.notification_snapshot()
+        assert list(snapshot) == [("", "ноутбуки")]
+        assert snapshot[("", "ноутбуки")]["total"] == 5
+        assert snapshot[("", "ноутбуки")]["low_competition"] == 5
+
+        # Та же выгрузка, дополненная двумя контрактами: старые строки не считаются повторно
+        write_csv(path, range(1, 8))
+        assert index.add_file(path, "ноутбуки") == 7
+        snapshot = index.notification_snapshot()
+        assert snapshot[("", "ноутбуки")]["total"] == 7
+        assert snapshot[("", "ноутбуки")]["new"] == 7
+
+        # Без изменения файла повторная индексация ничего не делает
+        assert index.add_file(path, "ноутбуки") == 0
+        assert index.notification_snapshot(reset_keys=[(None, "ноутбуки")])[("", "ноутбуки")]["new"] == 0
+    finally:
+        index.close()
+
+def test_null_keys_from_old_index_are_migrated(tmp_path):
+    path = str(tmp_path / "index.sqlite")
+    index = ContractIndex(path)
+    with index.conn:
+        # Схема до исправления: ключ агрегатов допускал NULL и строки размножались
+        index.conn.execute("DROP TABLE aggregates")
+        index.conn.execute(
+            "CREATE TABLE aggregates (region TEXT, query TEXT, total INTEGER NOT NULL DEFAULT 0, "
+            "new_since_check INTEGER NOT NULL DEFAULT 0, low_competition INTEGER NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (region, query))"
+        )
+        for number in range(3):
+            index.conn.execute(
+                "INSERT INTO contracts (registry_number, query, is_actual, participants) VALUES (?, 'бумага', 1, 1)",
+                (str(number),)
+            )
+            index.conn.execute("INSERT INTO aggregates (region, query, total) VALUES (NULL, 'бумага', 1)")
+    index.close()
+
+    index = ContractIndex(path)
+    try:
+        snapshot = index.notification_snapshot()
+    finally:
+        index.close()
+    assert snapshot == {("", "бумага"): {"total": 3, "new": 0, "closing": 0, "low_competition": 3}}
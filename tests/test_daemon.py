@@ -0,0 +1,46 @@
+import time
+import threading
+import pytest
+from daemon import TokenBucket, SearchDefinition, ScrapeDaemon
+
+def test_bucket_rejects_zero_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+    with pytest.raises(ValueError):
+        TokenBucket(1, capacity=0)
+
+def test_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=20, capacity=2)
+    started = time.monotonic()
+    assert bucket.acquire() and bucket.acquire()
+    assert time.monotonic() - started < 0.04
+    # Запас исчерпан: следующий жетон появляется через 1 / rate секунд
+    assert bucket.acquire()
+    assert time.monotonic() - started >= 0.04
+    assert bucket.available() < 1
+
+def test_bucket_wait_stops_on_shutdown():
+    bucket = TokenBucket(rate=0.01)
+    bucket.acquire()
+    stop = threading.Event()
+    stop.set()
+    assert bucket.acquire(stop) is False
+
+def test_ready_searches_are_taken_by_priority(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    definitions = [
+        SearchDefinition("архив", filters={"include_archive": True}),
+        SearchDefinition("обычный"),
+        SearchDefinition("актуальный", filters={"only_actual": True}),
+        SearchDefinition("ручной приоритет", priority="actual"),
+    ]
+    daemon = ScrapeDaemon(definitions, workers=1, rate=1)
+    try:
+        order = [daemon._next().keywords for _ in definitions]
+    finally:
+        daemon.pool.close()
+        daemon.http_exporter.close()
+        daemon.store.close()
+    # Внутри класса раньше тот, кто раньше поставлен в очередь
+    assert order == ["актуальный", "ручной приоритет", "обычный", "архив"]
+    assert daemon.status()["running"] == 4
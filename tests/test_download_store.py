@@ -0,0 +1,41 @@
+import os
+from download_store import DownloadStore, open_stored
+from ingest import iter_contract_rows
+
+CONTENT = ("Реестровый номер;Объект закупки\n" + "".join(f"{n};Бумага офисная\n" for n in range(50))).encode("cp1251")
+
+def write_export(folder, name):
+    path = os.path.join(folder, name)
+    with open(path, "wb") as file:
+        file.write(CONTENT)
+    return path
+
+def test_round_trip_and_deduplication(tmp_path):
+    downloads = tmp_path / "downloads"
+    downloads.mkdir()
+    store = DownloadStore(str(tmp_path / "store"), compression="gzip")
+    try:
+        first = store.put_files([write_export(str(downloads), "first.csv")], "бумага", {"region": "Москва"})
+        second = store.put_files([write_export(str(downloads), "second.csv")], "бумага")
+        # Одинаковое содержимое хранится одним сжатым объектом, исходные файлы убраны
+        assert first == second
+        assert os.listdir(downloads) == []
+        assert store.report()["entries"] == 2 and store.report()["objects"] == 1
+
+        stored = store.latest("бумага")
+        assert stored == first
+        with open_stored(stored[0]) as file:
+            assert file.read() == CONTENT
+        assert [row["registry_number"] for row in iter_contract_rows(stored[0])][:3] == ["0", "1", "2"]
+    finally:
+        store.close()
+
+def test_retention_drops_old_entries(tmp_path):
+    store = DownloadStore(str(tmp_path / "store"), compression="gzip", max_age_days=1)
+    try:
+        path = store.put(write_export(str(tmp_path), "old.csv"), "бумага", stored_at=1.0)
+        assert store.enforce_retention() == 1
+        assert not os.path.exists(path)
+        assert store.latest("бумага") == []
+    finally:
+        store.close()
@@ -0,0 +1,16 @@
+import os
+import download_watcher
+from download_watcher import DownloadWatcher
+
+def test_rejected_file_is_logged_once_and_rechecked_after_change(tmp_path, monkeypatch, capsys):
+    # Режим опроса папки, как на системах без inotify
+    monkeypatch.setattr(download_watcher, "_libc", None)
+    path = tmp_path / "export.csv"
+    with DownloadWatcher(str(tmp_path)) as watcher:
+        path.write_text("мало")
+        assert watcher.wait(timeout=0.5) == []
+        assert capsys.readouterr().out.count("слишком мал") == 1
+
+        path.write_text("Реестровый номер;Объект закупки\n" + "1;бумага\n" * 20, encoding="utf-8")
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+        assert watcher.wait(timeout=2) == [str(path)]
@@ -0,0 +1,87 @@
+import os
+import pytest
+from http.server import ThreadingHTTPServer
+import threading
+from bench_replay import start_server, make_handler
+from http_export import HttpExporter, ExportUnavailable, EXPORT_PATH
+from ingest import iter_contract_chunks
+
+@pytest.fixture
+def replay():
+    server, base_url = start_server(entries=30, export_rows=200, export_latency=0)
+    yield base_url
+    server.shutdown()
+    server.server_close()
+
+def serve(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def test_export_csv_from_replay_server(replay, tmp_path):
+    with HttpExporter(replay) as exporter:
+        files = exporter.export_csv("бумага", str(tmp_path), region="Москва", only_actual=True)
+    assert len(files) == 1 and files[0].endswith(".csv")
+    assert os.listdir(tmp_path) == [os.path.basename(files[0])]
+    records = [record for chunk in iter_contract_chunks(files[0]) for record in chunk]
+    assert len(records) == 200
+    assert records[5]["registry_number"] == "5"
+    assert records[5]["subject"] == "бумага партия 5"
+
+def test_empty_results_are_not_a_failure(replay, tmp_path):
+    with HttpExporter(replay) as exporter:
+        assert "search-results__total" in exporter.fetch_results_page("бумага")
+    server, base_url = start_server(entries=0, export_latency=0)
+    try:
+        # Штатная страница без результатов: браузер запускать незачем
+        with HttpExporter(base_url) as exporter:
+            assert exporter.export_csv("бумага", str(tmp_path)) == []
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert os.listdir(tmp_path) == []
+
+def test_unexpected_page_raises(tmp_path):
+    base = make_handler(None, entries=30, export_rows=10, export_latency=0)
+
+    class ChangedMarkupHandler(base):
+        def do_GET(self):
+            self._send("<html><body>Новая разметка</body></html>".encode("utf-8"), "text/html; charset=utf-8")
+
+    server, base_url = serve(ChangedMarkupHandler)
+    try:
+        with HttpExporter(base_url) as exporter, pytest.raises(ExportUnavailable):
+            exporter.export_csv("бумага", str(tmp_path))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_connection_error_becomes_export_unavailable(tmp_path):
+    with HttpExporter("http://127.0.0.1:9", timeout=2) as exporter, pytest.raises(ExportUnavailable):
+        exporter.export_csv("бумага", str(tmp_path))
+
+def test_interrupted_download_leaves_no_part_file(tmp_path):
+    base = make_handler(None, entries=30, export_rows=10, export_latency=0)
+
+    class TruncatingHandler(base):
+        def do_GET(self):
+            if not self.path.startswith(EXPORT_PATH):
+                return super().do_GET()
+            # Обещаем больше, чем отдаем, и закрываем соединение посреди выгрузки
+            body = ("Реестровый номер;Объект закупки\n" + "1;бумага\n" * 100).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Length", str(len(body) * 10))
+            self.end_headers()
+            self.wfile.write(body)
+            self.wfile.flush()
+            self.close_connection = True
+
+    server, base_url = serve(TruncatingHandler)
+    try:
+        with HttpExporter(base_url, timeout=5) as exporter, pytest.raises(ExportUnavailable):
+            exporter.export_csv("бумага", str(tmp_path))
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert os.listdir(tmp_path) == []
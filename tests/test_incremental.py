@@ -0,0 +1,69 @@
+import os
+import pyarrow.parquet as pq
+from datetime import date
+from incremental import DeltaState
+
+HEADER = "Реестровый номер;Объект закупки;Цена контракта;Дата обновления\n"
+
+def write_csv(path, rows):
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(HEADER)
+        for number, price, updated in rows:
+            file.write(f"{number};Бумага офисная;{price};{updated}\n")
+    return path
+
+def dataset_rows(folder):
+    parts = [os.path.join(root, name) for root, _, names in os.walk(folder) for name in names if name.endswith(".parquet")]
+    return sorted((row["registry_number"], row["price"]) for path in parts for row in pq.read_table(path).to_pylist())
+
+def test_watermarks_are_kept_per_filters(tmp_path):
+    state = DeltaState(str(tmp_path / "state.sqlite"))
+    dataset = str(tmp_path / "dataset")
+    try:
+        first = write_csv(str(tmp_path / "moscow.csv"), [("1", "100,00", "01.03.2024")])
+        state.merge_files([first], "бумага", {"region": "Москва"}, dataset)
+        assert state.watermark("бумага", {"region": "Москва"}) == date(2024, 3, 1)
+        # Обход другого региона начинается с нуля, а не с даты Москвы
+        assert state.watermark("бумага", {"region": "Тверь"}) is None
+        assert "update_date_from" not in state.narrow_filters("бумага", {"region": "Тверь"})
+    finally:
+        state.close()
+
+def test_updated_rows_replace_old_versions(tmp_path):
+    state = DeltaState(str(tmp_path / "state.sqlite"))
+    dataset = str(tmp_path / "dataset")
+    try:
+        first = write_csv(str(tmp_path / "first.csv"), [("1", "100,00", "01.03.2024"), ("2", "200,00", "02.03.2024")])
+        counts = state.merge_files([first], "бумага", None, dataset)
+        assert (counts["new"], counts["updated"], counts["compacted"]) == (2, 0, 0)
+
+        second = write_csv(str(tmp_path / "second.csv"), [("2", "250,00", "05.03.2024"), ("3", "300,00", "05.03.2024")])
+        counts = state.merge_files([second], "бумага", None, dataset)
+        assert (counts["new"], counts["updated"], counts["compacted"]) == (1, 1, 1)
+        assert dataset_rows(dataset) == [("1", 100.0), ("2", 250.0), ("3", 300.0)]
+    finally:
+        state.close()
+
+def test_ingest_and_merge_share_partition_without_duplicates(tmp_path):
+    from ingest import ingest_files, query_folder
+
+    state = DeltaState(str(tmp_path / "state.sqlite"))
+    dataset = str(tmp_path / "dataset")
+    filters = {"region": "Москва"}
+    try:
+        export = write_csv(str(tmp_path / "export.csv"), [("1", "100,00", "01.03.2024"), ("2", "200,00", "02.03.2024")])
+        # Полная выгрузка дважды: повторная загрузка не копит дубли
+        ingest_files([export], "бумага", dataset, filters)
+        ingest_files([export], "бумага", dataset, filters)
+        assert dataset_rows(dataset) == [("1", 100.0), ("2", 200.0)]
+
+        # Инкрементальный обход того же запроса пишет в тот же раздел и тоже сжимает его
+        delta = write_csv(str(tmp_path / "delta.csv"), [("2", "250,00", "05.03.2024"), ("3", "300,00", "05.03.2024")])
+        counts = state.merge_files([delta], "бумага", filters, dataset)
+        assert counts["target"].startswith(query_folder("бумага", filters, dataset))
+        assert dataset_rows(dataset) == [("1", 100.0), ("2", 250.0), ("3", 300.0)]
+
+        # Другие фильтры - отдельный раздел
+        assert query_folder("бумага", {"region": "Тверь"}, dataset) != query_folder("бумага", filters, dataset)
+    finally:
+        state.close()
@@ -0,0 +1,19 @@
+from ingest import detect_format, SAMPLE_SIZE
+
+def write_export(path, encoding):
+    # Первые строки без кириллицы длиннее образца, русский текст начинается дальше
+    lines = ["Registry;Subject;Price\n"] + [f"{n};paper;{n},00\n" for n in range(SAMPLE_SIZE // 10)]
+    lines.append("999999;Бумага офисная;10,00\n")
+    path.write_bytes("".join(lines).encode(encoding))
+
+def test_cp1251_after_ascii_prefix(tmp_path):
+    path = tmp_path / "export.csv"
+    write_export(path, "cp1251")
+    encoding, delimiter = detect_format(str(path))
+    assert (encoding, delimiter) == ("cp1251", ";")
+    assert "Бумага офисная" in path.read_bytes().decode(encoding)
+
+def test_utf8_after_ascii_prefix(tmp_path):
+    path = tmp_path / "export.csv"
+    write_export(path, "utf-8")
+    assert detect_format(str(path))[0] == "utf-8-sig"
@@ -0,0 +1,93 @@
+from job_queue import JobQueue, CircuitBreaker, run_batch, DONE, FAILED, PENDING
+from result_cache import ResultCache
+
+def test_retry_after_ingest_failure_ingests_again(tmp_path):
+    export = tmp_path / "export.csv"
+    export.write_text("Реестровый номер;Объект закупки\n1;Бумага\n", encoding="utf-8")
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), base_delay=0)
+    cache = ResultCache(str(tmp_path / "cache"))
+    ingested = []
+    failures = [OSError("диск переполнен")]
+
+    # Тот же порядок, что в pars.main: разбор внутри fetch, кэш пишется после него
+    def fetch(query, filters):
+        def download_and_ingest():
+            if failures:
+                raise failures.pop()
+            ingested.append(query)
+            return [str(export)]
+        files, _ = cache.get_or_fetch(query, download_and_ingest, **filters)
+        return files
+
+    batch = queue.open_batch("test", ["бумага"])
+    run_batch(queue, batch, fetch, CircuitBreaker(), pause=0)
+
+    state, attempts, files, error = queue.results(batch)["бумага"]
+    assert (state, attempts, error) == (DONE, 2, None)
+    assert ingested == ["бумага"]
+    assert files and cache.get("бумага")
+    cache.close()
+    queue.close()
+
+def test_failed_jobs_stop_after_max_attempts_and_can_be_retried(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    queue = JobQueue(path, max_attempts=3, base_delay=0)
+    batch = queue.open_batch("test", ["бумага", "ручки"])
+    calls = []
+
+    def fetch(query, filters):
+        calls.append(query)
+        return ["file.csv"] if query == "ручки" else False
+
+    run_batch(queue, batch, fetch, CircuitBreaker(threshold=100), pause=0)
+    results = queue.results(batch)
+    assert results["бумага"][:2] == (FAILED, 3)
+    assert results["ручки"][:2] == (DONE, 1)
+    assert calls.count("бумага") == 3
+
+    assert queue.retry_failed(batch) == 1
+    queue.close()
+
+    # Пакет с незавершенными задачами продолжается после перезапуска
+    queue = JobQueue(path, base_delay=0)
+    assert queue.open_batch("test", ["бумага", "ручки"]) == batch
+    assert queue.counts(batch) == {PENDING: 1, DONE: 1}
+    queue.close()
+
+def test_empty_result_completes_without_retries(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), base_delay=0)
+    batch = queue.open_batch("test", ["редкий запрос"])
+    calls = []
+
+    def fetch(query, filters):
+        calls.append(query)
+        return []
+
+    run_batch(queue, batch, fetch, CircuitBreaker(), pause=0)
+    assert queue.results(batch)["редкий запрос"][:3] == (DONE, 1, [])
+    assert calls == ["редкий запрос"]
+    queue.close()
+
+def test_resumed_batch_picks_up_new_queries(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    queue = JobQueue(path, base_delay=0)
+    batch = queue.open_batch("test", ["бумага", "ручки"])
+    # Пакет прерван после первого запроса
+    job = queue.claim(batch)
+    queue.complete(job, ["file.csv"])
+    queue.close()
+
+    # Пакет не завершен: продолжение с расширенным списком добавляет новый запрос
+    queue = JobQueue(path, base_delay=0)
+    assert queue.open_batch("test", ["бумага", "ручки", "скрепки"]) == batch
+    assert queue.counts(batch) == {PENDING: 2, DONE: 1}
+    calls = []
+
+    def fetch(query, filters):
+        calls.append(query)
+        return ["file.csv"]
+
+    run_batch(queue, batch, fetch, CircuitBreaker(), pause=0)
+    assert sorted(calls) == ["ручки", "скрепки"]
+    assert queue.counts(batch) == {DONE: 3}
+    queue.close()
@@ -0,0 +1,53 @@
+import json
+import pytest
+from pars import get_chrome_options
+from network_profile import LEAN_PREFS, collect_usage, NetworkStats
+
+def test_performance_log_only_when_measuring(tmp_path):
+    for network_profile in ("full", "lean"):
+        options = get_chrome_options(str(tmp_path), network_profile)
+        assert "goog:loggingPrefs" not in options.to_capabilities()
+
+    options = get_chrome_options(str(tmp_path), "full", measure_network=True)
+    assert options.to_capabilities()["goog:loggingPrefs"] == {"performance": "ALL"}
+
+def test_lean_profile_blocks_content(tmp_path):
+    full = get_chrome_options(str(tmp_path), "full").experimental_options["prefs"]
+    lean = get_chrome_options(str(tmp_path), "lean").experimental_options["prefs"]
+    assert not set(LEAN_PREFS) & set(full)
+    assert all(lean[key] == 2 for key in LEAN_PREFS)
+    assert lean["download.default_directory"] == str(tmp_path)
+
+    with pytest.raises(ValueError):
+        get_chrome_options(str(tmp_path), "turbo")
+
+class LogDriver:
+    def __init__(self, events):
+        self.events = events
+
+    def get_log(self, log_type):
+        assert log_type == "performance"
+        events, self.events = self.events, []
+        return [{"message": json.dumps({"message": {"method": method, "params": params}})}
+                for method, params in events]
+
+def test_usage_counts_requests_bytes_and_blocked():
+    driver = LogDriver([
+        ("Network.requestWillBeSent", {"requestId": "1", "type": "Document"}),
+        ("Network.loadingFinished", {"requestId": "1", "encodedDataLength": 5000}),
+        ("Network.requestWillBeSent", {"requestId": "2", "type": "Image"}),
+        ("Network.loadingFailed", {"requestId": "2", "blockedReason": "inspector"}),
+    ])
+    usage = collect_usage(driver)
+    assert (usage["requests"], usage["bytes"], usage["blocked"]) == (2, 5000, 1)
+    assert usage["blocked_by_type"] == {"Image": 1}
+    # Журнал прочитан, следующий вызов видит только новый трафик
+    assert collect_usage(driver)["requests"] == 0
+
+    stats = NetworkStats()
+    stats.record("full", {"requests": 3, "bytes": 9000, "blocked": 0,
+                          "bytes_by_type": {"Image": 4000}, "blocked_by_type": {}})
+    stats.record("lean", usage)
+    report = stats.drain()
+    assert report["lean"]["bytes_saved_per_session"] == 4000
+    assert stats.report() == {}
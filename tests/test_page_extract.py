@@ -0,0 +1,92 @@
+import re
+import shutil
+import pytest
+from urllib.parse import urlparse, parse_qs
+from urllib.request import urlopen
+from datetime import date
+from bench_replay import start_server
+from http_export import SEARCH_PATH
+from page_extract import EXTRACT_SCRIPT, iter_search_entries, extract_search
+from tracing import tracer
+
+@pytest.fixture
+def replay():
+    server, base_url = start_server(entries=25, export_rows=0, export_latency=0)
+    yield base_url
+    server.shutdown()
+    server.server_close()
+
+class ReplayDriver:
+    """Вместо браузера: страницы берутся с сервера-заглушки, карточки разбираются по разметке заглушки"""
+
+    def __init__(self):
+        self.urls = []
+        self.html = ""
+
+    def set_script_timeout(self, timeout):
+        pass
+
+    def get(self, url):
+        self.urls.append(url)
+        with urlopen(url) as response:
+            self.html = response.read().decode("utf-8")
+
+    def execute_async_script(self, script, timeout):
+        assert script == EXTRACT_SCRIPT
+        entries = []
+        for line in self.html.splitlines():
+            if "search-registry-entry-block" not in line:
+                continue
+            field = lambda name: re.search(f'{name}">([^<]*)<', line).group(1)
+            pairs = [
+                ["реестровый номер", field("header-mid__number").lstrip("№ ")],
+                ["статус", field("header-mid__title")],
+                ["цена контракта", field("price-block__value")],
+            ]
+            pairs += [list(pair) for pair in re.findall(r'(?:body-title|data-block__title)">([^<]*)</div><div class="[^"]*">([^<]*)<', line)]
+            entries.append(pairs)
+        return {
+            "entries": entries,
+            "has_next": 'paginator-button-next"' in self.html,
+            "total": re.search(r'search-results__total">([^<]*)<', self.html).group(1),
+        }
+
+def test_entries_follow_pages_of_replay_server(replay):
+    driver = ReplayDriver()
+    tracer.drain()
+    records = list(iter_search_entries(driver, "бумага", {"region": "Москва"}, records_per_page=10,
+                                       base_url=replay + SEARCH_PATH))
+
+    # 25 карточек по 10 на странице: три страницы, после последней обход останавливается
+    assert [record["registry_number"] for record in records] == [str(i) for i in range(25)]
+    assert [parse_qs(urlparse(url).query)["pageNumber"] for url in driver.urls] == [["1"], ["2"], ["3"]]
+    assert all(parse_qs(urlparse(url).query)["searchString"] == ["бумага"] for url in driver.urls)
+    assert [span["attrs"]["entries"] for span in tracer.drain()] == [10, 10, 5]
+
+    # Подписи карточки приводятся к тем же полям, что и колонки CSV
+    record = records[3]
+    assert record["price"] == 1003.5
+    assert record["customer"] == "ГБУ №3"
+    assert record["subject"] == "бумага партия 3"
+    assert record["sign_date"] == date(2024, 2, 1)
+    assert record["status"] == "Исполнение"
+
+def test_max_pages_limits_requests(replay):
+    driver = ReplayDriver()
+    records = list(iter_search_entries(driver, "бумага", records_per_page=10, max_pages=1,
+                                       base_url=replay + SEARCH_PATH))
+    assert len(records) == 10 and len(driver.urls) == 1
+
+@pytest.mark.skipif(not (shutil.which("google-chrome") or shutil.which("chromium")),
+                    reason="нет Chrome для прогона скрипта извлечения")
+def test_extract_script_in_browser(replay, tmp_path):
+    from pars import create_browser_pool
+
+    pool = create_browser_pool(size=1, download_folder=str(tmp_path), search_url=replay + SEARCH_PATH)
+    try:
+        records = list(extract_search("бумага", pool, records_per_page=10))
+    finally:
+        pool.close()
+    assert [record["registry_number"] for record in records] == [str(i) for i in range(25)]
+    assert records[3]["subject"] == "бумага партия 3"
+    assert records[3]["price"] == 1003.5
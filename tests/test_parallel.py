@@ -0,0 +1,74 @@
+import os
+import json
+import time
+import multiprocessing
+import parallel
+from parallel import RateLimiter, run_parallel, load_manifest
+
+def _acquire_times(rate_limiter, count, times):
+    for _ in range(count):
+        rate_limiter.acquire()
+        times.put(time.time())
+
+def test_rate_limiter_spaces_starts_across_processes():
+    rate_limiter = RateLimiter(20)
+    times = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_acquire_times, args=(rate_limiter, 3, times)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(10)
+
+    started = sorted(times.get(timeout=5) for _ in range(6))
+    # Интервал 0.05 с общий для обоих процессов, а не свой у каждого
+    assert all(later - earlier >= 0.04 for earlier, later in zip(started, started[1:]))
+    assert started[-1] - started[0] >= 0.2
+
+def _fake_init_worker(rate_limiter, pool_max_uses):
+    folder = os.path.join(os.environ["FAKE_WORKER_DIR"], f"worker_{os.getpid()}")
+    os.makedirs(folder, exist_ok=True)
+    parallel._worker.update({
+        "id": f"worker_{os.getpid()}",
+        "download_folder": folder,
+        "pool": None,
+        "rate_limiter": rate_limiter,
+    })
+
+def _fake_search(query, pool=None, download_folder=None, **kwargs):
+    # Вызовы пишутся в общий файл: счетчики в дочерних процессах тесту не видны
+    with open(os.path.join(os.environ["FAKE_WORKER_DIR"], "calls.txt"), "a", encoding="utf-8") as file:
+        file.write(query + "\n")
+    if query == "сбой":
+        return False
+    path = os.path.join(download_folder, f"{query}.csv")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("Реестровый номер;Объект закупки\n1;Бумага\n")
+    return [path]
+
+def _calls(folder):
+    with open(os.path.join(folder, "calls.txt"), encoding="utf-8") as file:
+        return sorted(file.read().split("\n")[:-1])
+
+def test_manifest_resume_reruns_only_unfinished_queries(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_WORKER_DIR", str(tmp_path))
+    monkeypatch.setattr(parallel, "_init_worker", _fake_init_worker)
+    monkeypatch.setattr(parallel, "perform_optimized_search", _fake_search)
+    manifest_path = str(tmp_path / "manifest.json")
+    queries = ["бумага", "ручки", "сбой"]
+
+    result = run_parallel(queries, max_workers=2, requests_per_second=0, manifest_path=manifest_path)
+    assert {query: entry["status"] for query, entry in result["queries"].items()} == {
+        "бумага": "done", "ручки": "done", "сбой": "failed"
+    }
+    assert os.path.isfile(result["queries"]["бумага"]["files"][0])
+    with open(manifest_path, encoding="utf-8") as file:
+        assert json.load(file)["queries"] == result["queries"]
+    assert _calls(tmp_path) == sorted(queries)
+
+    os.remove(tmp_path / "calls.txt")
+    result = run_parallel(queries + ["скрепки"], max_workers=2, requests_per_second=0, manifest_path=manifest_path)
+    # Выполненные запросы берутся из манифеста, повторяются только сбойный и новый
+    assert _calls(tmp_path) == ["сбой", "скрепки"]
+    assert set(load_manifest(manifest_path)) == {"бумага", "ручки", "сбой", "скрепки"}
+    assert result["queries"]["скрепки"]["status"] == "done"
+    assert result["queries"]["сбой"]["status"] == "failed"
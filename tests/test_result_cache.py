@@ -0,0 +1,116 @@
+import os
+import time
+import threading
+import result_cache
+from result_cache import ResultCache
+
+CSV = "Реестровый номер;Объект закупки;Цена контракта\n1;Бумага;10,00\n2;Ручки;20,00\n"
+
+def make_export(tmp_path, name="export.csv"):
+    path = tmp_path / name
+    path.write_text(CSV, encoding="utf-8")
+    return str(path)
+
+def run_concurrently(count, target):
+    results = [None] * count
+    def worker(number):
+        results[number] = target()
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return results
+
+def test_single_flight_shares_one_fetch(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    export = make_export(tmp_path)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return [export]
+
+    results = run_concurrently(5, lambda: cache.get_or_fetch("Бумага", fetch, only_actual=True))
+    assert len(calls) == 1
+    assert sorted(from_cache for _, from_cache in results) == [False, True, True, True, True]
+    assert cache.report()["misses"] == 1 and cache.report()["shared"] == 4
+
+    # Следующий запрос с тем же ключом (регистр не важен) берется из кэша вместе со строками
+    files, from_cache = cache.get_or_fetch("  бумага ", fetch, only_actual=True)
+    assert from_cache and len(calls) == 1
+    assert [row["registry_number"] for row in cache.iter_rows("бумага", only_actual=True)] == ["1", "2"]
+    cache.close()
+
+def test_failed_fetch_is_not_shared_as_hit(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+
+    def fetch():
+        time.sleep(0.2)
+        return False
+
+    results = run_concurrently(3, lambda: cache.get_or_fetch("бумага", fetch))
+    assert results == [(False, False)] * 3
+    report = cache.report()
+    assert report["shared"] == 0 and report["misses"] == 3
+    assert cache.get("бумага") is None
+    cache.close()
+
+def test_failed_processing_does_not_store_entry(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    export = make_export(tmp_path)
+
+    def fetch():
+        raise OSError("индексация не удалась")
+
+    try:
+        cache.get_or_fetch("бумага", fetch)
+    except OSError:
+        pass
+    assert cache.get("бумага") is None
+    files, from_cache = cache.get_or_fetch("бумага", lambda: [export])
+    assert not from_cache and cache.get("бумага")
+    cache.close()
+
+def test_parsing_does_not_block_other_keys(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / "cache"))
+    cache.get_or_fetch("ручки", lambda: [make_export(tmp_path, "pens.csv")])
+    parsing = threading.Event()
+    original = result_cache.iter_contract_rows
+
+    def slow_rows(path):
+        parsing.set()
+        time.sleep(0.5)
+        yield from original(path)
+
+    monkeypatch.setattr(result_cache, "iter_contract_rows", slow_rows)
+    thread = threading.Thread(target=cache.get_or_fetch, args=("бумага", lambda: [make_export(tmp_path)]))
+    thread.start()
+    assert parsing.wait(5)
+    started = time.monotonic()
+    assert cache.get("ручки")
+    assert time.monotonic() - started < 0.2
+    thread.join(5)
+    assert cache.get("бумага")
+    cache.close()
+
+def test_entries_link_store_objects_instead_of_copying(tmp_path):
+    from download_store import DownloadStore
+
+    store = DownloadStore(str(tmp_path / "store"), compression="gzip")
+    cache = ResultCache(str(tmp_path / "cache"))
+    try:
+        stored = store.put_files([make_export(tmp_path)], "бумага")
+        files, _ = cache.get_or_fetch("бумага", lambda: stored)
+        assert os.stat(files[0]).st_ino == os.stat(stored[0]).st_ino
+        assert [row["registry_number"] for row in cache.iter_rows("бумага")] == ["1", "2"]
+    finally:
+        cache.close()
+        store.close()
+
+def test_make_key_accepts_any_filters():
+    from datetime import date
+
+    assert result_cache.make_key("Бумага", region="Москва") == result_cache.make_key("бумага ", region="Москва", only_actual=False)
+    assert result_cache.make_key("бумага", update_date_from=date(2024, 1, 1)) != result_cache.make_key("бумага")
@@ -0,0 +1,75 @@
+from datetime import date, timedelta
+from sharding import ShardPlanner, estimate_count, stitch
+from ingest import iter_contract_chunks
+
+ENTRY = '<div class="search-registry-entry-block">...</div>'
+
+class FakeExporter:
+    """Страница результатов со счетчиком: по rows_per_day контрактов на каждый день"""
+
+    def __init__(self, rows_per_day, with_counter=True):
+        self.rows_per_day = rows_per_day
+        self.with_counter = with_counter
+        self.requests = 0
+
+    def fetch_results_page(self, search_text, update_date_from, update_date_to, **filters):
+        self.requests += 1
+        total = ((update_date_to - update_date_from).days + 1) * self.rows_per_day
+        if not total:
+            return "<html></html>"
+        counter = f'<div class="search-results__total">{total:,} записей</div>'.replace(",", " ")
+        return (counter if self.with_counter else "") + ENTRY * min(total, 10)
+
+def test_estimate_count():
+    assert estimate_count('<div class="search-results__total">более 1 200 записей</div>' + ENTRY) == 1200
+    assert estimate_count("<html>ничего не найдено</html>") == 0
+    # Без счетчика десять карточек на странице не говорят ничего о полном числе
+    assert estimate_count(ENTRY * 10) is None
+
+def test_plan_splits_until_shards_fit():
+    start = date(2024, 1, 1)
+    planner = ShardPlanner(FakeExporter(rows_per_day=30), limit=500)
+    shards = planner.plan("бумага", start=start, end=start + timedelta(days=59))
+
+    assert all(estimate <= 500 for _, _, estimate in shards)
+    assert sum(estimate for _, _, estimate in shards) == 60 * 30
+    # Шарды покрывают весь диапазон без пропусков и пересечений
+    assert shards[0][0] == start and shards[-1][1] == start + timedelta(days=59)
+    for (_, end, _), (next_start, _, _) in zip(shards, shards[1:]):
+        assert next_start == end + timedelta(days=1)
+    assert not planner.oversized
+
+def test_plan_without_counter_stops_at_unknown_span():
+    start = date(2014, 1, 1)
+    end = date(2024, 12, 31)
+    exporter = FakeExporter(rows_per_day=30, with_counter=False)
+    planner = ShardPlanner(exporter, limit=500, unknown_span_days=365)
+    shards = planner.plan("бумага", start=start, end=end)
+
+    # Без счетчика диапазон не дробится до дней: десяток годовых шардов вместо тысяч
+    assert all((shard_end - shard_start).days + 1 <= 365 for shard_start, shard_end, _ in shards)
+    assert len(shards) <= 16 and exporter.requests < 40
+    assert shards[0][0] == start and shards[-1][1] == end
+    for (_, shard_end, _), (next_start, _, _) in zip(shards, shards[1:]):
+        assert next_start == shard_end + timedelta(days=1)
+    assert planner.oversized == shards
+
+def test_plan_flags_single_day_over_limit():
+    day = date(2024, 1, 1)
+    planner = ShardPlanner(FakeExporter(rows_per_day=800), limit=500)
+    assert planner.plan("бумага", start=day, end=day) == [(day, day, 800)]
+    assert planner.oversized == [(day, day, 800)]
+
+def test_stitch_drops_duplicates(tmp_path):
+    header = "Реестровый номер;Объект закупки;Цена контракта\n"
+    first = tmp_path / "first.csv"
+    second = tmp_path / "second.csv"
+    first.write_text(header + "1;Бумага;10,00\n2;Ручки;20,00\n", encoding="utf-8")
+    second.write_text(header + "2;Ручки;20,00\n3;Скрепки;5,50\n", encoding="utf-8")
+    target = str(tmp_path / "merged.csv")
+
+    assert stitch([str(first), str(second)], target) == 3
+    records = [record for chunk in iter_contract_chunks(target) for record in chunk]
+    assert [record["registry_number"] for record in records] == ["1", "2", "3"]
+    assert records[2]["subject"] == "Скрепки"
+    assert records[2]["price"] == 5.5
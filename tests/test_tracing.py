@@ -0,0 +1,42 @@
+import json
+import pytest
+from tracing import Tracer
+from waits import WaitStats, SearchCancelled
+
+class Cancelled(SearchCancelled):
+    pass
+
+def test_tracer_memory_is_bounded_but_totals_are_kept(tmp_path):
+    tracer = Tracer(max_spans=5, max_durations=3)
+    for _ in range(20):
+        with tracer.span("шаг"):
+            pass
+    assert len(tracer.spans) == 5
+    summary = tracer.summary()["шаг"]
+    assert summary["count"] == 20 and summary["outcomes"] == {"ok": 20}
+
+    path = str(tmp_path / "traces.jsonl")
+    assert tracer.export_jsonl(path) == 5
+    # Уже выгруженные шаги повторно не пишутся
+    assert tracer.export_jsonl(path) == 0
+    with open(path, encoding="utf-8") as file:
+        assert len([json.loads(line) for line in file]) == 5
+    assert tracer.summary()["шаг"]["count"] == 20
+
+def test_cancellation_subclasses_are_not_errors():
+    tracer = Tracer()
+    with pytest.raises(Cancelled):
+        with tracer.span("запрос"):
+            raise Cancelled()
+    with pytest.raises(ValueError):
+        with tracer.span("запрос"):
+            raise ValueError("сбой")
+    assert tracer.summary()["запрос"]["outcomes"] == {"cancelled": 1, "error": 1}
+
+def test_wait_stats_keep_recent_durations_only():
+    stats = WaitStats(max_durations=4)
+    for duration in range(10):
+        stats.record("ожидание", float(duration), ok=duration < 8)
+    assert len(stats.steps["ожидание"]["durations"]) == 4
+    summary = stats.summary()["ожидание"]
+    assert (summary["count"], summary["mean"], summary["max"], summary["timeouts"]) == (10, 4.5, 9.0, 2)
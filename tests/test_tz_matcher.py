@@ -0,0 +1,46 @@
+import os
+from contract_index import ContractIndex
+from tz_matcher import TzMatcher
+
+HEADER = "Реестровый номер;Объект закупки;Цена контракта\n"
+
+def write_csv(path, subjects, shift):
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(HEADER)
+        for number, subject in enumerate(subjects, 1):
+            file.write(f"{number};{subject};1000,00\n")
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + shift))
+
+def test_updated_contracts_rebuild_vectors(tmp_path):
+    path = str(tmp_path / "export.csv")
+    index = ContractIndex(str(tmp_path / "index.sqlite"))
+    try:
+        write_csv(path, ["Поставка ноутбуков", "Ремонт кровли"], 1)
+        index.add_file(path)
+        matcher = TzMatcher(index, folder=str(tmp_path / "vectors"), workers=1)
+        results, _ = matcher.match_text("ноутбуки", top_k=1)
+        assert results[0]["registry_number"] == "1"
+
+        # Те же номера с новым описанием: число контрактов и последний id не меняются
+        write_csv(path, ["Ремонт кровли", "Поставка ноутбуков"], 2)
+        index.add_file(path)
+        matcher.load()
+        results, _ = matcher.match_text("ноутбуки", top_k=1)
+        assert results[0]["registry_number"] == "2"
+    finally:
+        index.close()
+
+def test_blocked_scores_match_single_pass(tmp_path):
+    path = str(tmp_path / "export.csv")
+    index = ContractIndex(str(tmp_path / "index.sqlite"))
+    try:
+        write_csv(path, [f"Поставка товара номер {number}" for number in range(50)] + ["Ремонт кровли"], 1)
+        index.add_file(path)
+        blocked = TzMatcher(index, folder=str(tmp_path / "vectors"), workers=4, batch_rows=8)
+        blocked.load()
+        assert len(blocked.blocks) == 7
+        single = TzMatcher(index, folder=str(tmp_path / "vectors"), workers=1)
+        assert blocked.match_text("кровля ремонт", top_k=3)[0] == single.match_text("кровля ремонт", top_k=3)[0]
+    finally:
+        index.close()